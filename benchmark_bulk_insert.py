@@ -0,0 +1,86 @@
+"""Measure resume result insert throughput, row by row versus bulk.
+
+    python benchmark_bulk_insert.py sqlite mysql mongodb --rows 10000
+
+MySQL and MongoDB use the connection settings from config, so point DB_NAME
+at a scratch database. Rows written by the benchmark are deleted afterwards.
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from migrations import connect, run_migrations
+from repository import Repositories
+
+
+def _rows(count):
+    return [{'filename': f"benchmark_{i}.pdf", 'match_percent': float(i % 100)} for i in range(count)]
+
+
+def _open(backend):
+    if backend == 'sqlite':
+        path = os.path.join(tempfile.mkdtemp(), 'benchmark.db')
+        conn = sqlite3.connect(path, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+    else:
+        from config import get_config
+        conn = connect(get_config(), backend)
+    run_migrations(conn, backend)
+    return conn
+
+
+def _cleanup(backend, conn):
+    if backend == 'mongodb':
+        conn.resumes.delete_many({'filename': {'$regex': '^benchmark_'}})
+    else:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM resumes WHERE filename LIKE 'benchmark_%'")
+        conn.commit()
+        cursor.close()
+
+
+def _row_by_row(backend, repos, rows):
+    if backend == 'mongodb':
+        for row in rows:
+            repos.conn.resumes.insert_one(dict(row))
+    else:
+        for row in rows:
+            repos.resumes._insert('resumes', row)
+
+
+def benchmark(backend, count, chunk_size):
+    """Return rows/sec for row-by-row and bulk inserts on one backend."""
+    conn = _open(backend)
+    repos = Repositories(backend, conn, chunk_size)
+    rows = _rows(count)
+    try:
+        start = time.perf_counter()
+        _row_by_row(backend, repos, rows)
+        single = count / (time.perf_counter() - start)
+        _cleanup(backend, conn)
+
+        start = time.perf_counter()
+        repos.resumes.insert_many(rows)
+        bulk = count / (time.perf_counter() - start)
+        _cleanup(backend, conn)
+    finally:
+        repos.close()
+    return single, bulk
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('backends', nargs='*', default=['sqlite'], choices=['sqlite', 'mysql', 'mongodb'])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{'backend':<10}{'row-by-row rows/s':>20}{'bulk rows/s':>15}{'speedup':>10}")
+    for backend in args.backends:
+        try:
+            single, bulk = benchmark(backend, args.rows, args.chunk_size)
+            print(f"{backend:<10}{single:>20,.0f}{bulk:>15,.0f}{bulk / single:>9.1f}x")
+        except Exception as e:
+            print(f"{backend:<10}❌ {e}")
@@ -0,0 +1,242 @@
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class LocalStore:
+    """In-process LRU store whose entries expire after a TTL.
+
+    Every key carries a generation that delete() bumps, so a fill can be made
+    conditional on no invalidation having happened since the value was read.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _entry(self, key):
+        entry = self.entries.get(key)
+        if entry is not None and entry[2] < time.monotonic():
+            del self.entries[key]
+            return None
+        return entry
+
+    def get(self, key):
+        with self.lock:
+            entry = self._entry(key)
+            if entry is None:
+                return None
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def generation(self, key):
+        with self.lock:
+            entry = self._entry(key)
+            return entry[1] if entry else 0
+
+    def set(self, key, value, ttl, generation=None):
+        """Store value, unless generation is given and the key was invalidated since it was read."""
+        with self.lock:
+            entry = self._entry(key)
+            current = entry[1] if entry else 0
+            if generation is not None and generation != current:
+                return False
+            self._put(key, (value, current, time.monotonic() + ttl))
+            return True
+
+    def delete(self, key, ttl):
+        """Drop the value and bump the key's generation, which is kept for ttl seconds."""
+        with self.lock:
+            entry = self._entry(key)
+            self._put(key, (None, (entry[1] if entry else 0) + 1, time.monotonic() + ttl))
+
+    def _put(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class SqliteStore:
+    """Store shared by every app process on this host through a SQLite file."""
+
+    def __init__(self, path, maxsize=1024):
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.writes = 0
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS cache_entries "
+                          "(key TEXT PRIMARY KEY, value BLOB, generation INTEGER, expires_at REAL)")
+
+    def _generation(self, key, now):
+        row = self.conn.execute("SELECT generation FROM cache_entries WHERE key = ? AND expires_at >= ?",
+                                (key, now)).fetchone()
+        return row[0] if row else 0
+
+    def get(self, key):
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM cache_entries WHERE key = ? AND expires_at >= ?",
+                                    (key, time.time())).fetchone()
+        return pickle.loads(row[0]) if row and row[0] is not None else None
+
+    def generation(self, key):
+        with self.lock:
+            return self._generation(key, time.time())
+
+    def set(self, key, value, ttl, generation=None):
+        """Store value, unless generation is given and the key was invalidated since it was read."""
+        def update(current):
+            if generation is not None and generation != current:
+                return None
+            return pickle.dumps(value), current
+        return self._write(key, update, ttl)
+
+    def delete(self, key, ttl):
+        """Drop the value and bump the key's generation, which is kept for ttl seconds."""
+        self._write(key, lambda current: (None, current + 1), ttl)
+
+    def _write(self, key, update, ttl):
+        now = time.time()
+        with self.lock:
+            # BEGIN IMMEDIATE makes the generation check and the write one step across processes.
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = update(self._generation(key, now))
+                if row is not None:
+                    self.conn.execute("INSERT OR REPLACE INTO cache_entries (key, value, generation, expires_at) "
+                                      "VALUES (?, ?, ?, ?)", (key, row[0], row[1], now + ttl))
+                self.writes += 1
+                if self.writes % 256 == 0:
+                    # Drop expired entries, then the soonest to expire beyond maxsize.
+                    self.conn.execute("DELETE FROM cache_entries WHERE expires_at < ? OR key IN (SELECT key FROM "
+                                      "cache_entries ORDER BY expires_at DESC LIMIT -1 OFFSET ?)", (now, self.maxsize))
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return row is not None
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM cache_entries WHERE value IS NOT NULL").fetchone()[0]
+
+
+class RedisStore:
+    """Store shared by every app process through Redis."""
+
+    # Writes the value only if the key's generation still matches the one read before loading it.
+    SET_IF_GENERATION = """
+    if (redis.call('get', KEYS[2]) or '0') ~= ARGV[1] then return 0 end
+    redis.call('set', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    return 1
+    """
+
+    def __init__(self, url, prefix='ai_resume:'):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.set_if_generation = self.client.register_script(self.SET_IF_GENERATION)
+
+    def get(self, key):
+        data = self.client.get(self.prefix + key)
+        return pickle.loads(data) if data is not None else None
+
+    def generation(self, key):
+        return int(self.client.get(self.prefix + key + ':generation') or 0)
+
+    def set(self, key, value, ttl, generation=None):
+        """Store value, unless generation is given and the key was invalidated since it was read."""
+        if generation is None:
+            self.client.set(self.prefix + key, pickle.dumps(value), ex=max(1, int(ttl)))
+            return True
+        keys = [self.prefix + key, self.prefix + key + ':generation']
+        return bool(self.set_if_generation(keys=keys, args=[generation, pickle.dumps(value), max(1, int(ttl))]))
+
+    def delete(self, key, ttl):
+        """Drop the value and bump the key's generation, which is kept for ttl seconds."""
+        pipeline = self.client.pipeline()
+        pipeline.incr(self.prefix + key + ':generation')
+        pipeline.expire(self.prefix + key + ':generation', max(1, int(ttl)))
+        pipeline.delete(self.prefix + key)
+        pipeline.execute()
+
+    def __len__(self):
+        return 0
+
+
+def make_store(maxsize=1024, redis_url=None, shared_path=None):
+    """Return a Redis store when configured and available, else a store shared by this host's
+    processes through the SQLite file at shared_path when given, else a local LRU store."""
+    if redis_url:
+        try:
+            return RedisStore(redis_url)
+        except Exception as e:
+            print(f"⚠️ Redis cache unavailable: {e}")
+    if shared_path:
+        try:
+            return SqliteStore(shared_path, maxsize)
+        except Exception as e:
+            print(f"⚠️ Shared cache file unavailable: {e}")
+    if redis_url or shared_path:
+        print("⚠️ Using an in-process cache; other app processes will not see its invalidations")
+    return LocalStore(maxsize)
+
+
+class TTLCache:
+    """Read-through cache with hit/miss accounting."""
+
+    def __init__(self, store, ttl=60):
+        self.store = store
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.store.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def generation(self, key):
+        """Return the key's invalidation generation; read it before loading a value to cache."""
+        return self.store.generation(key)
+
+    def set(self, key, value, generation=None):
+        """Cache value, unless generation is given and key was invalidated after it was read."""
+        if value is not None:
+            self.store.set(key, value, self.ttl, generation)
+
+    def invalidate(self, key):
+        self.store.delete(key, self.ttl)
+
+    def get_or_load(self, key, loader):
+        """Return the cached value for key, calling loader() on a miss.
+
+        A write that invalidates key while loader() runs keeps the possibly stale result out of the cache.
+        """
+        value = self.get(key)
+        if value is None:
+            generation = self.generation(key)
+            value = loader()
+            self.set(key, value, generation)
+        return value
+
+    def stats(self):
+        """Return hit/miss counters and the hit ratio."""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'size': len(self.store),
+            'ttl': self.ttl
+        }
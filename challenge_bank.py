@@ -0,0 +1,205 @@
+"""Bank of validated second round challenges, sampled per candidate.
+
+Candidates' sets are drawn from the bank; Gemini is only used to top up
+sections that run low, from the app's background workers or from cron:
+
+    python challenge_bank.py
+
+Items are tagged with section, topic and difficulty and deduplicated by a
+hash of their question text. Items generated for one job requisition are
+tagged with its role topic (see role_topic) and preferred in its candidates'
+sets; the general topics fill whatever a role's pool cannot.
+"""
+import hashlib
+import json
+import os
+import random
+import sys
+
+SECTIONS = ['reasoning', 'aptitude', 'coding']
+
+# Questions of each section in one candidate's set.
+SET_SIZES = {'reasoning': 3, 'aptitude': 3, 'coding': 2}
+
+TOPICS = ['algorithms', 'data structures', 'problem solving', 'system design', 'programming logic']
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+
+# Built-in items, used when the bank cannot fill a set and stored in it on every top-up.
+FALLBACK_CHALLENGES = {
+    'reasoning': [
+        {"question": "If all roses are flowers and some flowers fade quickly, which conclusion is valid?", "options": ["All roses fade quickly", "Some roses may fade quickly", "No roses fade quickly", "All flowers are roses"], "correct_answer": "Some roses may fade quickly"},
+        {"question": "In a sequence 2, 6, 18, 54, what comes next?", "options": ["108", "162", "216", "270"], "correct_answer": "162"},
+        {"question": "If it takes 5 machines 5 minutes to make 5 widgets, how long for 100 machines to make 100 widgets?", "options": ["5 minutes", "20 minutes", "100 minutes", "500 minutes"], "correct_answer": "5 minutes"},
+        {"question": "All programmers drink coffee. John drinks coffee. Is John a programmer?", "options": ["Yes, definitely", "No, definitely not", "Cannot be determined", "Only on weekdays"], "correct_answer": "Cannot be determined"},
+        {"question": "If A > B and B > C, then:", "options": ["A = C", "A < C", "A > C", "Cannot determine"], "correct_answer": "A > C"}
+    ],
+    'aptitude': [
+        {"question": "A train travels 60 km in 40 minutes. What is its speed in km/hr?", "options": ["90 km/hr", "100 km/hr", "120 km/hr", "150 km/hr"], "correct_answer": "90 km/hr"},
+        {"question": "If 20% of a number is 50, what is 75% of that number?", "options": ["150", "187.5", "200", "225"], "correct_answer": "187.5"},
+        {"question": "A rectangle has length 12cm and width 8cm. What is its area?", "options": ["96 sq cm", "40 sq cm", "20 sq cm", "48 sq cm"], "correct_answer": "96 sq cm"},
+        {"question": "If 3x + 5 = 20, what is x?", "options": ["3", "4", "5", "6"], "correct_answer": "5"},
+        {"question": "What is 15% of 200?", "options": ["25", "30", "35", "40"], "correct_answer": "30"}
+    ],
+    'coding': [
+        {"question": "Write a function to find the maximum number in a list", "sample_input": "[3, 7, 2, 9, 1]", "expected_output": "9", "difficulty": "easy"},
+        {"question": "Write a function to check if a string is a palindrome", "sample_input": "'racecar'", "expected_output": "True", "difficulty": "medium"},
+        {"question": "Write a function to count vowels in a string", "sample_input": "'hello'", "expected_output": "2", "difficulty": "easy"},
+        {"question": "Write a function to find factorial of a number", "sample_input": "5", "expected_output": "120", "difficulty": "medium"},
+        {"question": "Write a function to remove duplicates from a list", "sample_input": "[1,2,2,3,3,4]", "expected_output": "[1,2,3,4]", "difficulty": "medium"}
+    ]
+}
+
+
+def role_topic(job_id):
+    """Return the bank topic of the items generated for one job requisition."""
+    return f"job:{job_id}"
+
+
+def challenge_prompt(topic, job_description=''):
+    """Return the Gemini prompt for a fresh batch of challenges on topic."""
+    return f"""
+Create unique assessment questions #{random.randint(1, 1000)} focusing on {topic} for job: {job_description[:300]}
+
+Return valid JSON:
+{{
+  "reasoning": [
+    {{"question": "unique logic question", "options": ["A", "B", "C", "D"], "correct_answer": "A"}},
+    {{"question": "different reasoning question", "options": ["A", "B", "C", "D"], "correct_answer": "B"}},
+    {{"question": "another logic problem", "options": ["A", "B", "C", "D"], "correct_answer": "C"}}
+  ],
+  "aptitude": [
+    {{"question": "math problem 1", "options": ["10", "20", "30", "40"], "correct_answer": "20"}},
+    {{"question": "calculation question", "options": ["5", "15", "25", "35"], "correct_answer": "15"}},
+    {{"question": "numerical reasoning", "options": ["100", "200", "300", "400"], "correct_answer": "200"}}
+  ],
+  "coding": [
+    {{"question": "coding challenge 1", "sample_input": "input1", "expected_output": "output1", "difficulty": "easy"}},
+    {{"question": "programming task", "sample_input": "input2", "expected_output": "output2", "difficulty": "medium"}}
+  ]
+}}
+
+Coding sample inputs must be Python literals passed to the solution function, and expected outputs the literal it returns.
+Make questions different from previous assessments.
+"""
+
+
+def parse_challenges(text):
+    """Return the {section: items} object in an LLM response, or None."""
+    text = text.replace('```json', '').replace('```', '').strip()
+    start = text.find('{')
+    end = text.rfind('}') + 1
+    if start < 0 or end <= start:
+        return None
+    try:
+        challenges = json.loads(text[start:end])
+    except json.JSONDecodeError:
+        return None
+    return challenges if isinstance(challenges, dict) else None
+
+
+def validate_item(section, item):
+    """Return a cleaned copy of a challenge item, or None if it cannot be used as is."""
+    if not isinstance(item, dict) or not isinstance(item.get('question'), str) or not item['question'].strip():
+        return None
+    if section == 'coding':
+        sample_input, expected_output = item.get('sample_input'), item.get('expected_output')
+        if not all(isinstance(v, str) and v.strip() for v in (sample_input, expected_output)):
+            return None
+        difficulty = item.get('difficulty') if item.get('difficulty') in DIFFICULTIES else 'medium'
+        return {'question': item['question'].strip(), 'sample_input': sample_input,
+                'expected_output': expected_output, 'difficulty': difficulty}
+    options = item.get('options')
+    if (not isinstance(options, list) or len(options) != 4 or len(set(map(str, options))) != 4
+            or item.get('correct_answer') not in options):
+        return None
+    return {'question': item['question'].strip(), 'options': [str(o) for o in options],
+            'correct_answer': str(item['correct_answer'])}
+
+
+def item_hash(section, item):
+    """Return the key that deduplicates items whose questions differ only in case or whitespace."""
+    text = ' '.join(item['question'].lower().split())
+    return hashlib.sha256(f"{section}\0{text}".encode('utf-8')).hexdigest()
+
+
+def bank_records(challenges, topic):
+    """Return the bank records for the valid items of a generated challenge set."""
+    records = {}
+    for section in SECTIONS:
+        for item in challenges.get(section) or []:
+            item = validate_item(section, item)
+            if item is not None:
+                digest = item_hash(section, item)
+                records[digest] = {'item_hash': digest, 'section': section, 'topic': topic,
+                                   'difficulty': item.get('difficulty', 'medium'), 'item': item}
+    return list(records.values())
+
+
+def assemble_challenges(bank, sizes=SET_SIZES, topic=None):
+    """Sample one candidate's set from the bank; return None if any section has too few items.
+
+    With a topic, its items come first and any section it cannot fill is completed from the whole bank.
+    """
+    challenges = {}
+    for section, size in sizes.items():
+        items = bank.sample(section, size, topic) if topic else []
+        if len(items) < size:
+            seen = {item_hash(section, item) for item in items}
+            items += [item for item in bank.sample(section, size) if item_hash(section, item) not in seen][:size - len(items)]
+        if len(items) < size:
+            return None
+        challenges[section] = items
+    return challenges
+
+
+def thin_sections(bank, minimum, topic=None):
+    """Return the sections holding fewer than minimum items (of topic, if given)."""
+    counts = bank.counts(SECTIONS, topic)
+    return [section for section in SECTIONS if counts.get(section, 0) < minimum]
+
+
+def top_up(bank, generate, minimum, max_calls=10, topic=None):
+    """Fill sections below minimum items, calling generate(topic) for new challenge sets.
+
+    Without a topic the general topics are rotated; with one (e.g. a role_topic) only its pool
+    is filled. generate returns an LLM response (or None). Returns the number of new items stored.
+    """
+    added = 0 if topic else bank.insert_many(bank_records(FALLBACK_CHALLENGES, 'general'))
+    for call in range(max_calls):
+        if not thin_sections(bank, minimum, topic):
+            break
+        topic_of_call = topic or TOPICS[call % len(TOPICS)]
+        text = generate(topic_of_call)
+        challenges = parse_challenges(text) if text else None
+        if challenges is None:
+            print(f"⚠️ No usable challenges generated for {topic_of_call}")
+            continue
+        added += bank.insert_many(bank_records(challenges, topic_of_call))
+    return added
+
+
+if __name__ == "__main__":
+    from config import get_config
+    from migrations import connect
+    from repository import Repositories
+    from llm import LLMClient, GeminiProvider
+    from stub_llm import StubProvider
+
+    config = get_config()
+    try:
+        if os.getenv('LLM_PROVIDER', 'gemini') == 'stub':
+            provider = StubProvider(latency_ms=0)
+        else:
+            import google.generativeai as genai
+            genai.configure(api_key=getattr(config, 'GEMINI_API_KEY', None) or os.getenv('GEMINI_API_KEY'))
+            provider = GeminiProvider(getattr(config, 'GEMINI_MODEL', None) or os.getenv('GEMINI_MODEL', 'gemini-2.5-flash'))
+        llm = LLMClient(provider, timeout=60)
+        repos = Repositories(config.DB_TYPE, connect(config))
+        added = top_up(repos.challenge_bank, lambda topic: llm.generate(challenge_prompt(topic)),
+                       int(os.getenv('CHALLENGE_BANK_MIN_ITEMS', 50)), int(os.getenv('CHALLENGE_BANK_MAX_CALLS', 10)))
+        print(f"✓ {added} challenges added; bank holds {repos.challenge_bank.counts(SECTIONS)}")
+        repos.close()
+    except Exception as e:
+        print(f"❌ Challenge bank top-up failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,2 @@
+# These test_*.py files are the app, a template, a .env template and manual scripts, not pytest modules.
+collect_ignore = ['test_app.py', 'test_client.py', 'test_concurrent_submissions.py', 'test_gemini.py', 'smtp_test.py']
@@ -0,0 +1,99 @@
+import base64
+import json
+
+ROUND_NAMES = {
+    'test_invited': 'Test Invited',
+    'test_completed': 'First Round Completed',
+    'second_round_invited': 'Second Round Invited',
+    'second_round_completed': 'Second Round Completed',
+    'hr_round_invited': 'HR Round Invited'
+}
+
+
+def encode_dashboard_cursor(statuses, job_id, candidate):
+    """Encode the position after candidate in a dashboard group as an opaque cursor."""
+    payload = {'statuses': statuses, 'job_id': job_id, 'after': [candidate.get('test_score') or 0, candidate['id']]}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_dashboard_cursor(cursor):
+    """Decode a dashboard cursor into (statuses, job_id, after)."""
+    payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return payload['statuses'], payload['job_id'], tuple(payload['after'])
+
+
+def job_labels(jobs):
+    """Return a distinct dashboard heading for each job requisition id."""
+    labels = {}
+    for job in jobs:
+        label = (job.get('title') or 'Untitled') + '...'
+        # Requisitions whose descriptions start alike still get their own group.
+        if label in labels.values():
+            label = f"{label} (#{job['id']})"
+        labels[job['id']] = label
+    return labels
+
+
+def dashboard_candidate(candidate):
+    """Return the fields the dashboard shows for one candidate."""
+    return {
+        'id': candidate['id'],
+        'name': candidate.get('name', ''),
+        'email': candidate.get('email', ''),
+        'match_percent': candidate.get('match_percent', 0),
+        'test_score': candidate.get('test_score', 0),
+        'second_round_score': candidate.get('second_round_score', 0) or 0
+    }
+
+
+def dashboard_groups(repos, limit, jobs_per_page, before=None):
+    """Return (rounds_data, rounds_meta, next_before) for one page of job requisitions, newest first.
+
+    rounds_data holds the best limit candidates of each round and requisition, rounds_meta each
+    group's total and cursor to its next page, and next_before the requisition id that starts the
+    following page, or None on the last one. Candidates linked to no requisition are on the first page.
+    """
+    rounds_data = {name: {} for name in ROUND_NAMES.values()}
+    rounds_meta = {name: {} for name in ROUND_NAMES.values()}
+
+    # Only this page's requisitions are counted, and only the top of each of their groups is fetched,
+    # so the cost follows the page size rather than the number of requisitions ever created.
+    requisitions = repos.jobs.list_page(jobs_per_page + 1, before)
+    next_before = requisitions[jobs_per_page - 1]['id'] if len(requisitions) > jobs_per_page else None
+    requisitions = requisitions[:jobs_per_page]
+    groups = repos.candidates.group_counts([job['id'] for job in requisitions] + ([None] if before is None else []))
+    labels = job_labels(requisitions)
+    for group in groups:
+        round_key = ROUND_NAMES.get(group['status'], 'Test Invited')
+        job_desc = labels.get(group['job_id'], 'General')
+        meta = rounds_meta[round_key].setdefault(job_desc, {'total': 0, 'statuses': [], 'job_id': group['job_id']})
+        meta['total'] += group['total']
+        meta['statuses'].append(group['status'])
+
+    top = repos.candidates.top_per_group([(g['status'], g['job_id']) for g in groups], limit)
+    # Same order as list_group's ORDER BY test_score DESC, id DESC, so the cursor taken from the
+    # last candidate shown continues right after it. Ids compare natively: numbers on SQL, and
+    # fixed-width ObjectId hex strings on MongoDB.
+    for candidate in sorted(top, key=lambda c: (c.get('test_score') or 0, c['id']), reverse=True):
+        round_key = ROUND_NAMES.get(candidate.get('status'), 'Test Invited')
+        job_desc = labels.get(candidate.get('job_id'), 'General')
+        group_candidates = rounds_data[round_key].setdefault(job_desc, [])
+        # Statuses sharing a round are merged, so keep the best `limit` across them.
+        if len(group_candidates) < limit:
+            group_candidates.append(candidate)
+
+    for round_key, jobs in rounds_data.items():
+        for job_desc, group_candidates in jobs.items():
+            meta = rounds_meta[round_key][job_desc]
+            meta['next_cursor'] = (encode_dashboard_cursor(meta['statuses'], meta['job_id'], group_candidates[-1])
+                                   if meta['total'] > len(group_candidates) else None)
+            jobs[job_desc] = [dashboard_candidate(c) for c in group_candidates]
+    return rounds_data, rounds_meta, next_before
+
+
+def dashboard_page(repos, cursor, limit):
+    """Return the next limit candidates of a dashboard group and the cursor to the page after them."""
+    statuses, job_id, after = decode_dashboard_cursor(cursor)
+    page = repos.candidates.list_group(statuses, job_id, limit + 1, after)
+    next_cursor = encode_dashboard_cursor(statuses, job_id, page[limit - 1]) if len(page) > limit else None
+    return [dashboard_candidate(c) for c in page[:limit]], next_cursor
@@ -0,0 +1,85 @@
+import json
+import queue
+import threading
+import time
+
+from werkzeug.wrappers import Response
+
+
+class NotificationBroker:
+    """In-process pub/sub that fans HR notification events out to SSE subscribers."""
+
+    def __init__(self, max_pending=100):
+        self.max_pending = max_pending
+        self.subscribers = set()
+        self.lock = threading.Lock()
+
+    def subscribe(self):
+        """Return a queue that receives every event published from now on."""
+        subscriber = queue.Queue(self.max_pending)
+        with self.lock:
+            self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def publish(self, event):
+        """Send event to every subscriber."""
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                # A stalled client only misses events; it resyncs from /api/notifications.
+                pass
+
+
+def sse_stream(broker, heartbeat=15):
+    """Yield Server-Sent Events for a subscriber until the client disconnects."""
+    subscriber = broker.subscribe()
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                event = subscriber.get(timeout=heartbeat)
+            except queue.Empty:
+                # Comment lines keep proxies from closing an idle stream.
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: {event.get('type', 'message')}\ndata: {json.dumps(event, default=str)}\n\n"
+    finally:
+        broker.unsubscribe(subscriber)
+
+
+def watch_mongo_notifications(collection, broker, to_event):
+    """Publish every notification inserted by any app process, via a MongoDB change stream.
+
+    Runs forever in a daemon thread. Requires a replica set or sharded cluster.
+    """
+    def run():
+        while True:
+            try:
+                with collection.watch([{'$match': {'operationType': 'insert'}}]) as stream:
+                    print("✓ Watching HR notifications change stream")
+                    for change in stream:
+                        broker.publish(to_event(change['fullDocument']))
+            except Exception as e:
+                print(f"❌ Notification change stream error: {e}")
+                time.sleep(5)
+
+    thread = threading.Thread(target=run, name='notification-change-stream', daemon=True)
+    thread.start()
+    return thread
+
+
+def conditional_response(request, version, build):
+    """Return build()'s response with a weak ETag of version, or an empty 304 without calling
+    build() when the client's If-None-Match already holds that ETag."""
+    # if_none_match holds unquoted tags, so compare the version itself, not the quoted header value.
+    response = Response(status=304) if request.if_none_match.contains_weak(version) else build()
+    response.set_etag(version, weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,247 @@
+"""Fail when any query the app issues would need a full table scan.
+
+Runs EXPLAIN on every repository query against the configured database:
+
+    python explain_queries.py
+
+Run it against a migrated database with representative data, since the
+MySQL optimizer may prefer a scan on near-empty tables. test_query_plans.py
+runs the same checks against a fresh SQLite database under pytest.
+"""
+import sys
+import types
+
+from repository import Repositories, CandidateRepo, NotificationRepo, TestResultRepo, ChallengeRepo, JobRepo, QuestionSetRepo, ChallengeBankRepo, ResumeRepo, ArchiveRepo, AdminRepo
+
+# Repository calls that issue reads or updates, with sample arguments.
+SQL_CHECKS = [
+    ('candidates', 'get', (1,)),
+    ('candidates', 'get_many', ([1, 2],)),
+    ('candidates', 'find_by_name', ('Sample Candidate',)),
+    ('candidates', 'update', (1, {'status': 'pending'})),
+    ('candidates', 'group_counts', ([1, 2, None],)),
+    ('candidates', 'top_per_group', ([('test_completed', 1), ('pending', None)], 10)),
+    ('candidates', 'list_group', (['test_invited', 'pending', None], 1, 10, (50.0, 100))),
+    ('candidates', 'export_batches', (1, ['test_completed'], '2024-01-01 00:00:00', '2024-02-01 00:00:00')),
+    ('notifications', 'insert_for_candidate', ({'candidate_id': '1', 'candidate_name': 'Sample Candidate'},)),
+    ('notifications', 'list_recent', (20,)),
+    ('notifications', 'mark_seen', (1,)),
+    ('notifications', 'mark_seen_many', ([1, 2],)),
+    ('notifications', 'mark_seen_before', ('2024-01-01 00:00:00',)),
+    ('notifications', 'unseen_count', ()),
+    ('notifications', 'version', ()),
+    ('test_results', 'latest_for_candidate', ('1',)),
+    ('test_results', 'has_submission', ('sample',)),
+    ('test_results', 'get_second_round', ('1',)),
+    ('challenges', 'get_for_candidate', ('1',)),
+    ('jobs', 'get_or_create', ('Sample job description',)),
+    ('jobs', 'get', (1,)),
+    ('jobs', 'get_many', ([1, 2],)),
+    ('jobs', 'list_page', (10,)),
+    ('jobs', 'list_page', (10, 5)),
+    ('question_sets', 'get', ('sample', 0)),
+    ('challenge_bank', 'sample', ('coding', 2)),
+    ('challenge_bank', 'sample', ('coding', 2, 'algorithms')),
+    ('challenge_bank', 'counts', (['reasoning', 'aptitude', 'coding'],)),
+    ('challenge_bank', 'counts', (['reasoning', 'aptitude', 'coding'], 'job:1')),
+    # A cutoff before any row keeps the check from archiving real data.
+    ('archive', 'archive_before', ('hr_notifications', '1970-01-01 00:00:00', 500)),
+    ('archive', 'archive_before', ('test_results', '1970-01-01 00:00:00', 500)),
+    ('archive', 'archive_before', ('second_round_results', '1970-01-01 00:00:00', 500)),
+    ('archive', 'archive_before', ('resumes', '1970-01-01 00:00:00', 500)),
+    ('archive', 'restore_candidate', ('1',)),
+    ('admins', 'count', ()),
+    ('admins', 'authenticate', ('admin', 'secret')),
+]
+
+# Methods that only insert rows and have no plan to check.
+WRITE_ONLY = {'insert', 'insert_many', 'insert_second_round', 'put'}
+
+# Queries that read a whole table by design, with the reason.
+ALLOWED_SCANS = {
+    'candidates.export_batches': 'exports stream every matching candidate in id order',
+    'jobs.list_page': 'the first page reads the newest requisitions in primary key order and stops at the limit',
+}
+
+REPOSITORIES = {
+    'candidates': CandidateRepo,
+    'notifications': NotificationRepo,
+    'test_results': TestResultRepo,
+    'challenges': ChallengeRepo,
+    'jobs': JobRepo,
+    'question_sets': QuestionSetRepo,
+    'challenge_bank': ChallengeBankRepo,
+    'resumes': ResumeRepo,
+    'archive': ArchiveRepo,
+    'admins': AdminRepo,
+}
+
+# MongoDB query shapes issued by the Mongo repositories: (collection, filter, sort).
+MONGO_CHECKS = [
+    ('candidates.get', 'candidates', {'_id': 'sample'}, None),
+    ('candidates.find_by_name', 'candidates', {'name': 'Sample Candidate'}, None),
+    ('candidates.list_group', 'candidates', {'status': {'$in': ['test_completed']}, 'job_id': 'sample'},
+     [('test_score', -1), ('_id', -1)]),
+    ('candidates.group_counts', 'candidates', {'job_id': {'$in': ['sample', None]}}, None),
+    ('notifications.list_recent', 'hr_notifications', {'candidate_id': {'$ne': None}}, [('sent_on', -1)]),
+    ('notifications.unseen_count', 'hr_notifications', {'seen': False, 'candidate_id': {'$ne': None}}, None),
+    ('notifications.mark_seen_before', 'hr_notifications', {'seen': False, 'sent_on': {'$lte': 'sample'}}, None),
+    ('test_results.latest_for_candidate', 'test_results', {'candidate_id': '1'}, [('created_on', -1)]),
+    ('test_results.has_submission', 'test_results', {'submission_id': 'sample'}, None),
+    ('test_results.get_second_round', 'second_round_results', {'candidate_id': '1'}, None),
+    ('challenges.get_for_candidate', 'second_round_challenges', {'candidate_id': '1'}, [('created_on', -1)]),
+    ('jobs.get_or_create', 'job_requisitions', {'description_hash': 'sample'}, None),
+    ('jobs.list_page', 'job_requisitions', {'_id': {'$lt': 'sample'}}, [('_id', -1)]),
+    ('question_sets.get', 'question_sets', {'set_hash': 'sample', 'variant': 0}, None),
+    ('challenge_bank.sample', 'challenge_bank', {'section': 'coding', 'topic': 'algorithms'}, None),
+    ('challenge_bank.counts', 'challenge_bank', {'section': 'coding'}, None),
+    ('archive.archive_before', 'hr_notifications', {'sent_on': {'$lt': 'sample'}}, [('sent_on', 1)]),
+    ('archive.archive_before', 'test_results', {'created_on': {'$lt': 'sample'}}, [('created_on', 1)]),
+    ('archive.archive_before', 'second_round_results', {'submitted_on': {'$lt': 'sample'}}, [('submitted_on', 1)]),
+    ('archive.archive_before', 'resumes', {'uploaded_on': {'$lt': 'sample'}}, [('uploaded_on', 1)]),
+    ('archive.restore_candidate', 'archived_records', {'candidate_id': '1'}, None),
+    ('admins.authenticate', 'admin_users', {'username': 'admin', 'password': 'secret'}, None),
+]
+
+
+class _ExplainingCursor:
+    """Cursor wrapper that records the plan of every read or update statement."""
+
+    def __init__(self, owner, cursor):
+        self.owner = owner
+        self.cursor = cursor
+        self.skipped = False
+
+    def execute(self, sql, params=()):
+        statement = sql.strip().split(None, 1)[0].upper()
+        if statement in ('SELECT', 'UPDATE', 'DELETE') or (statement == 'INSERT' and ' SELECT ' in sql):
+            self.owner.explain(sql, params)
+        # Plans are all we need from writes; reads run so callers get real rows back.
+        self.skipped = statement != 'SELECT'
+        if not self.skipped:
+            self.cursor.execute(sql, params)
+
+    def fetchone(self):
+        return None if self.skipped else self.cursor.fetchone()
+
+    def fetchall(self):
+        return [] if self.skipped else self.cursor.fetchall()
+
+    def fetchmany(self, size):
+        return [] if self.skipped else self.cursor.fetchmany(size)
+
+    @property
+    def description(self):
+        return None if self.skipped else self.cursor.description
+
+    @property
+    def rowcount(self):
+        return 0 if self.skipped else self.cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return None
+
+    def close(self):
+        self.cursor.close()
+
+
+class _ExplainingConnection:
+    """Connection wrapper that EXPLAINs statements instead of trusting them."""
+
+    def __init__(self, conn, dialect):
+        self.conn = conn
+        self.dialect = dialect
+        self.current = None
+        self.plans = []
+
+    def cursor(self, **kwargs):
+        return _ExplainingCursor(self, self.conn.cursor(**kwargs))
+
+    def explain(self, sql, params):
+        cursor = self.conn.cursor()
+        # Scans of derived tables (bounded subquery results) are not table scans.
+        if self.dialect == 'sqlite':
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            details = [row[-1] for row in cursor.fetchall()]
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+            tables = {row[0] for row in cursor.fetchall()}
+            scans = [d for d in details if d.startswith('SCAN ') and ' USING ' not in d and d.split()[1] in tables]
+        else:
+            cursor.execute("EXPLAIN " + sql, params)
+            columns = [c[0] for c in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            scans = [f"full scan of {row['table']}" for row in rows
+                     if row.get('type') == 'ALL' and not str(row.get('table')).startswith('<')]
+        cursor.close()
+        self.plans.append((self.current, sql.strip(), scans))
+
+
+def _check_coverage():
+    """Return repository methods that have no plan check."""
+    covered = {(repo, method) for repo, method, _ in SQL_CHECKS}
+    missing = []
+    for repo, interface in REPOSITORIES.items():
+        for method in vars(interface):
+            if not method.startswith('_') and method not in WRITE_ONLY and (repo, method) not in covered:
+                missing.append(f"{repo}.{method}")
+    return missing
+
+
+def check_sql(conn, dialect):
+    """EXPLAIN every repository query and return a list of failures."""
+    failures = [f"{name}: no EXPLAIN check registered" for name in _check_coverage()]
+    explaining = _ExplainingConnection(conn, dialect)
+    repos = Repositories(dialect, explaining)
+    for repo, method, args in SQL_CHECKS:
+        explaining.current = f"{repo}.{method}"
+        result = getattr(getattr(repos, repo), method)(*args)
+        if isinstance(result, types.GeneratorType):
+            # Streaming methods only run their query once iterated.
+            list(result)
+    for name, sql, scans in explaining.plans:
+        if scans and name not in ALLOWED_SCANS:
+            failures.append(f"{name}: {', '.join(scans)} in: {' '.join(sql.split())}")
+    return failures
+
+
+def _has_collscan(plan):
+    if isinstance(plan, dict):
+        return plan.get('stage') == 'COLLSCAN' or any(_has_collscan(v) for v in plan.values())
+    if isinstance(plan, list):
+        return any(_has_collscan(v) for v in plan)
+    return False
+
+
+def check_mongo(db):
+    """Explain every MongoDB query shape and return a list of failures."""
+    failures = []
+    for name, collection, query, sort in MONGO_CHECKS:
+        cursor = db[collection].find(query).limit(1)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = cursor.explain().get('queryPlanner', {}).get('winningPlan', {})
+        if _has_collscan(plan) and name not in ALLOWED_SCANS:
+            failures.append(f"{name}: COLLSCAN on {collection}")
+    return failures
+
+
+def check_query_plans(conn, backend):
+    """Return a list of queries that would scan a full table."""
+    backend = backend.lower()
+    if backend == 'mongodb':
+        return check_mongo(conn)
+    return check_sql(conn, 'sqlite' if backend == 'sqlite' else 'mysql')
+
+
+if __name__ == "__main__":
+    from config import get_config
+    from migrations import connect
+
+    config = get_config()
+    failures = check_query_plans(connect(config), config.DB_TYPE)
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    print("✓ Every query is served by an index")
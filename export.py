@@ -0,0 +1,88 @@
+import csv
+import io
+from datetime import datetime
+
+EXPORT_COLUMNS = ['id', 'name', 'email', 'job_id', 'job_title', 'status', 'match_percent',
+                  'test_score', 'second_round_score', 'created_on', 'filename']
+
+
+def _csv_cell(value):
+    """Return a CSV cell value that spreadsheets will not evaluate as a formula."""
+    if isinstance(value, str) and value[:1] in ('=', '+', '-', '@'):
+        return "'" + value
+    return value
+
+
+def csv_stream(batches, columns=EXPORT_COLUMNS):
+    """Yield a CSV document one chunk per batch of records."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_cell(record.get(column)) for column in columns] for record in batch)
+        yield buffer.getvalue()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands written bytes back to a streaming response."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _timestamp(value):
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def parquet_stream(batches):
+    """Return a generator of Parquet bytes, one row group per batch of records.
+
+    Raises ImportError up front when pyarrow is not installed.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('id', pa.string()), ('name', pa.string()), ('email', pa.string()),
+        ('job_id', pa.string()), ('job_title', pa.string()), ('status', pa.string()),
+        ('match_percent', pa.float64()), ('test_score', pa.float64()), ('second_round_score', pa.float64()),
+        ('created_on', pa.timestamp('us')), ('filename', pa.string())
+    ])
+
+    def generate():
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(sink, schema)
+        for batch in batches:
+            rows = [dict(record,
+                         id=str(record['id']),
+                         job_id=str(record['job_id']) if record.get('job_id') is not None else None,
+                         created_on=_timestamp(record.get('created_on')))
+                    for record in batch]
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+            yield sink.drain()
+        writer.close()
+        yield sink.drain()
+
+    return generate()
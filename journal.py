@@ -0,0 +1,148 @@
+import json
+import sqlite3
+import threading
+import time
+
+JOURNAL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    submission_id TEXT UNIQUE,
+    payload TEXT,
+    received_on REAL,
+    claimed_until REAL DEFAULT 0,
+    attempts INTEGER DEFAULT 0,
+    last_error TEXT,
+    flushed_on REAL,
+    parked_on REAL
+)
+"""
+
+
+class SubmissionJournal:
+    """Local append-only SQLite journal of test submissions not yet written to the main database."""
+
+    def __init__(self, path, lease_seconds=60):
+        self.lease_seconds = lease_seconds
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # Acknowledged submissions must survive a power loss, not just a process crash.
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.execute(JOURNAL_SCHEMA)
+        # Journals created before submissions could be parked lack the column.
+        if 'parked_on' not in [row[1] for row in self.conn.execute("PRAGMA table_info(submissions)")]:
+            self.conn.execute("ALTER TABLE submissions ADD COLUMN parked_on REAL")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_submissions_pending ON submissions (flushed_on, claimed_until)")
+
+    def append(self, submission_id, payload):
+        """Durably record a submission; a repeated submission_id is ignored. Returns True if it was new."""
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO submissions (submission_id, payload, received_on) VALUES (?, ?, ?)",
+                (submission_id, json.dumps(payload, default=str), time.time()))
+            return cursor.rowcount == 1
+
+    def claim(self, limit):
+        """Lease up to limit unflushed submissions, oldest first, and return them as (id, payload) pairs.
+
+        A lease that is not marked flushed in time (e.g. the process died) expires and
+        the submission is claimed again, by this or another process sharing the file.
+        """
+        now = time.time()
+        with self.lock:
+            rows = self.conn.execute(
+                "UPDATE submissions SET claimed_until = ?, attempts = attempts + 1 WHERE id IN ("
+                "SELECT id FROM submissions WHERE flushed_on IS NULL AND claimed_until < ? AND parked_on IS NULL ORDER BY id LIMIT ?"
+                ") RETURNING id, payload", (now + self.lease_seconds, now, int(limit))).fetchall()
+        return sorted((row_id, json.loads(payload)) for row_id, payload in rows)
+
+    def mark_flushed(self, ids):
+        if not ids:
+            return
+        with self.lock:
+            self.conn.execute(f"UPDATE submissions SET flushed_on = ? WHERE id IN ({', '.join(['?'] * len(ids))})",
+                              (time.time(), *ids))
+
+    def mark_failed(self, row_id, error, retry_after, max_attempts):
+        """Release a submission for another attempt after retry_after seconds, or park it after max_attempts.
+
+        Return True if it was parked. Parked submissions stay in the journal but are no longer retried.
+        """
+        now = time.time()
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE submissions SET claimed_until = ?, last_error = ?, "
+                "parked_on = CASE WHEN attempts >= ? THEN ? END WHERE id = ? RETURNING parked_on",
+                (now + retry_after, str(error)[:500], max_attempts, now, row_id))
+            row = cursor.fetchone()
+        return bool(row and row[0] is not None)
+
+    def requeue_parked(self):
+        """Give every parked submission a fresh set of attempts (e.g. once its cause is fixed); return how many."""
+        with self.lock:
+            return self.conn.execute("UPDATE submissions SET parked_on = NULL, attempts = 0, claimed_until = 0 "
+                                     "WHERE parked_on IS NOT NULL AND flushed_on IS NULL").rowcount
+
+    def purge_flushed(self, older_than_seconds):
+        with self.lock:
+            self.conn.execute("DELETE FROM submissions WHERE flushed_on < ?", (time.time() - older_than_seconds,))
+
+    def pending_count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM submissions WHERE flushed_on IS NULL AND parked_on IS NULL").fetchone()[0]
+
+    def parked_count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM submissions WHERE parked_on IS NOT NULL AND flushed_on IS NULL").fetchone()[0]
+
+
+class JournalFlusher:
+    """Background thread that applies journaled submissions to the main database in batches."""
+
+    def __init__(self, journal, apply_batch, batch_size=100, interval=2, retry_after=30, keep_seconds=86400,
+                 max_attempts=10):
+        self.journal = journal
+        self.max_attempts = max_attempts
+        self.apply_batch = apply_batch
+        self.batch_size = batch_size
+        self.interval = interval
+        self.retry_after = retry_after
+        self.keep_seconds = keep_seconds
+        self.wakeup = threading.Event()
+
+    def wake(self):
+        """Flush now instead of at the next interval."""
+        self.wakeup.set()
+
+    def flush_once(self):
+        """Apply one batch and return how many submissions were flushed."""
+        batch = self.journal.claim(self.batch_size)
+        if not batch:
+            return 0
+        # apply_batch returns {row id: error} for the submissions it could not apply.
+        failures = self.apply_batch(batch)
+        for row_id, error in failures.items():
+            if self.journal.mark_failed(row_id, error, self.retry_after, self.max_attempts):
+                print(f"❌ Submission {row_id} parked after {self.max_attempts} attempts: {error}")
+            else:
+                print(f"❌ Submission {row_id} not flushed, will retry: {error}")
+        flushed = [row_id for row_id, _ in batch if row_id not in failures]
+        self.journal.mark_flushed(flushed)
+        return len(flushed)
+
+    def run(self):
+        # Anything left unflushed by a previous run is replayed first.
+        while True:
+            self.wakeup.clear()
+            try:
+                if self.flush_once() >= self.batch_size:
+                    continue
+                self.journal.purge_flushed(self.keep_seconds)
+            except Exception as e:
+                print(f"❌ Submission journal flush error: {e}")
+            self.wakeup.wait(self.interval)
+
+    def start(self):
+        thread = threading.Thread(target=self.run, name='submission-journal-flusher', daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,383 @@
+import json
+import random
+import sqlite3
+import threading
+import time
+
+
+class LLMUnavailable(Exception):
+    """The LLM could not answer in time; callers should use their fallback content."""
+
+
+class LLMProvider:
+    """An LLM backend the client can call."""
+
+    name = 'provider'
+
+    def generate(self, prompt, timeout):
+        """Return the response text for prompt, giving up after timeout seconds."""
+        raise NotImplementedError
+
+    def stream(self, prompt, timeout):
+        """Yield the response text in chunks as it is produced."""
+        yield self.generate(prompt, timeout)
+
+    def generate_with_usage(self, prompt, timeout):
+        """Return (text, {'prompt_tokens', 'response_tokens'}), or (text, None) if usage is not reported."""
+        return self.generate(prompt, timeout), None
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini through google-generativeai (configured by the app with its API key)."""
+
+    name = 'gemini'
+
+    def __init__(self, model):
+        import google.generativeai as genai
+        self.model = genai.GenerativeModel(model)
+
+    def generate(self, prompt, timeout):
+        return self.generate_with_usage(prompt, timeout)[0]
+
+    def generate_with_usage(self, prompt, timeout):
+        response = self.model.generate_content(prompt, request_options={'timeout': timeout})
+        metadata = getattr(response, 'usage_metadata', None)
+        usage = {'prompt_tokens': metadata.prompt_token_count,
+                 'response_tokens': metadata.candidates_token_count} if metadata else None
+        return response.text, usage
+
+    def stream(self, prompt, timeout):
+        for chunk in self.model.generate_content(prompt, stream=True, request_options={'timeout': timeout}):
+            yield chunk.text
+
+
+class CircuitBreaker:
+    """Stops calling a failing service for reset_timeout seconds after threshold consecutive failures."""
+
+    def __init__(self, threshold=5, reset_timeout=60):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """Return True if a call may go ahead; once the timeout passes, one trial call is let through."""
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout or self.trial_running:
+                return False
+            self.trial_running = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial_running or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self.trial_running = False
+
+    def state(self):
+        with self.lock:
+            if self.opened_at is None:
+                return 'closed'
+            return 'half-open' if time.monotonic() - self.opened_at >= self.reset_timeout else 'open'
+
+
+class TokenBucket:
+    """Rate limiter allowing rate calls per second on average with bursts of up to capacity.
+
+    With a path, the bucket lives in a SQLite file so every app process on the host
+    draws from the same budget; without one it is local to this process.
+    """
+
+    def __init__(self, rate, capacity, path=None, name='llm'):
+        self.rate = rate
+        self.capacity = capacity
+        self.name = name
+        self.lock = threading.Lock()
+        self.tokens = float(capacity)
+        self.updated = time.time()
+        self.waits = 0
+        self.conn = None
+        if path:
+            self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS token_buckets (name TEXT PRIMARY KEY, tokens REAL, updated REAL)")
+
+    def _take(self, now):
+        """Take a token if one is available; otherwise return the seconds until one will be."""
+        with self.lock:
+            if self.conn is None:
+                self.tokens, self.updated, wait = self._refill(self.tokens, self.updated, now)
+                return wait
+            # BEGIN IMMEDIATE serialises the read-modify-write across processes.
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute("SELECT tokens, updated FROM token_buckets WHERE name = ?", (self.name,)).fetchone()
+                tokens, updated, wait = self._refill(*(row or (self.capacity, now)), now)
+                self.conn.execute("INSERT INTO token_buckets (name, tokens, updated) VALUES (?, ?, ?) "
+                                  "ON CONFLICT(name) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                                  (self.name, tokens, updated))
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            return wait
+
+    def _refill(self, tokens, updated, now):
+        tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+        if tokens >= 1:
+            return tokens - 1, now, 0
+        return tokens, now, (1 - tokens) / self.rate
+
+    def acquire(self, timeout):
+        """Wait up to timeout seconds for a token and return True if one was taken."""
+        deadline = time.monotonic() + timeout
+        while True:
+            wait = self._take(time.time())
+            if not wait:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            self.waits += 1
+            time.sleep(wait)
+
+    def stats(self):
+        return {'rate_per_second': self.rate, 'capacity': self.capacity, 'waits': self.waits,
+                'shared': self.conn is not None}
+
+
+class SingleFlight:
+    """Runs one call per key at a time; concurrent callers with the same key share its result."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def begin(self, key):
+        """Claim the call for key; return a handle to pass to finish(), or None if one is in flight."""
+        with self.lock:
+            if key in self.calls:
+                return None
+            call = self.calls[key] = {'done': threading.Event(), 'result': None, 'error': None}
+            self.leaders += 1
+            return call
+
+    def finish(self, key, call, result=None, error=None):
+        """Hand the result (or exception) of a claimed call to everyone waiting on it."""
+        call['result'] = result
+        call['error'] = error
+        with self.lock:
+            del self.calls[key]
+        call['done'].set()
+
+    def do(self, key, fn):
+        """Return fn(), or the result of the identical call already in flight (its exception is re-raised)."""
+        while True:
+            call = self.begin(key)
+            if call is not None:
+                break
+            with self.lock:
+                waiting = self.calls.get(key)
+                if waiting is not None:
+                    self.coalesced += 1
+            if waiting is not None:
+                waiting['done'].wait()
+                if waiting['error'] is not None:
+                    raise waiting['error']
+                return waiting['result']
+        try:
+            result = fn()
+        except Exception as e:
+            self.finish(key, call, error=e)
+            raise
+        self.finish(key, call, result)
+        return result
+
+    def in_flight(self, key):
+        """Return True if a call for key is running."""
+        with self.lock:
+            return key in self.calls
+
+    def stats(self):
+        return {'in_flight': len(self.calls), 'calls': self.leaders, 'coalesced': self.coalesced}
+
+
+class LLMClient:
+    """Shared wrapper around an LLM provider with a deadline, jittered retries, a concurrency cap and a circuit breaker.
+
+    provider is an LLMProvider or any call(prompt, timeout) returning the response text.
+    With metrics (an LLMMetrics), every call is recorded under the call site it names.
+    """
+
+    def __init__(self, provider, timeout=20, retries=2, backoff=0.5, max_concurrency=4, breaker=None, limiter=None,
+                 metrics=None):
+        self.provider = provider
+        if isinstance(provider, LLMProvider):
+            self.call = provider.generate_with_usage
+        else:
+            self.call = lambda prompt, timeout: (provider(prompt, timeout), None)
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.breaker = breaker or CircuitBreaker()
+        self.limiter = limiter
+        self.metrics = metrics
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+
+    def _reject(self, site, reason):
+        self.rejected += 1
+        if self.metrics is not None:
+            self.metrics.rejected(site)
+        return LLMUnavailable(reason)
+
+    def _admit(self, site, deadline, error=None):
+        """Take a rate-limit token and a slot and pass the circuit breaker, or raise LLMUnavailable.
+
+        The slot must be released by the caller once the call is made.
+        """
+        # Fail fast while the circuit is open instead of waiting for a token or slot first.
+        if self.breaker.state() == 'open':
+            raise self._reject(site, 'circuit open')
+        # Every attempt, retries included, spends a token from the API quota.
+        if self.limiter is not None and not self.limiter.acquire(max(0.0, deadline - time.monotonic())):
+            raise self._reject(site, 'rate limit: no token before the deadline')
+        remaining = deadline - time.monotonic()
+        # Waiting for a free slot counts against the same deadline as the call itself.
+        if remaining <= 0 or not self.slots.acquire(timeout=remaining):
+            raise self._reject(site, f'deadline exceeded: {error}' if error else 'no free slot before the deadline')
+        # Asked last, so a half-open trial that is granted always reaches the LLM and reports back.
+        if not self.breaker.allow():
+            self.slots.release()
+            raise self._reject(site, 'circuit open')
+
+    def _record(self, site, started, prompt, response=None, usage=None, error=None, tag=None):
+        if self.metrics is not None:
+            self.metrics.record(site, time.monotonic() - started, prompt, response, usage, error, tag)
+
+    def generate(self, prompt, timeout=None, site='llm', tag=None):
+        """Return the LLM's text for prompt, or raise LLMUnavailable within timeout seconds.
+
+        site names the caller in the metrics; tag attributes the call's cost (e.g. to a requisition).
+        """
+        deadline = time.monotonic() + (timeout or self.timeout)
+        error = None
+        for attempt in range(self.retries + 1):
+            self._admit(site, deadline, error)
+            started = time.monotonic()
+            try:
+                self.calls += 1
+                text, usage = self.call(prompt, max(1.0, deadline - time.monotonic()))
+                self.breaker.record_success()
+                self._record(site, started, prompt, text, usage, tag=tag)
+                return text
+            except Exception as e:
+                error = e
+                self.failures += 1
+                self.breaker.record_failure()
+                self._record(site, started, prompt, error=e, tag=tag)
+                print(f"⚠️ LLM call failed (attempt {attempt + 1}/{self.retries + 1}): {e}")
+            finally:
+                self.slots.release()
+            # Full jitter spreads retries from many threads instead of retrying in lockstep.
+            delay = random.uniform(0, self.backoff * 2 ** attempt)
+            if time.monotonic() + delay >= deadline:
+                break
+            time.sleep(delay)
+        raise LLMUnavailable(str(error))
+
+    def stream(self, prompt, timeout=None, site='llm', tag=None):
+        """Yield the LLM's text for prompt in chunks as it is generated.
+
+        Raises LLMUnavailable if the call cannot start or fails part way. Streams are not
+        retried, since chunks already handed to the caller cannot be taken back.
+        """
+        deadline = time.monotonic() + (timeout or self.timeout)
+        self._admit(site, deadline)
+        call = self.provider.stream if isinstance(self.provider, LLMProvider) else lambda p, t: iter([self.call(p, t)[0]])
+        started = time.monotonic()
+        chunks = []
+        try:
+            self.calls += 1
+            for chunk in call(prompt, max(1.0, deadline - time.monotonic())):
+                chunks.append(chunk)
+                yield chunk
+            self.breaker.record_success()
+            self._record(site, started, prompt, ''.join(chunks), tag=tag)
+        except GeneratorExit:
+            # The caller stopped reading (e.g. it has all it needs); the call itself worked.
+            self.breaker.record_success()
+            self._record(site, started, prompt, ''.join(chunks), tag=tag)
+            raise
+        except Exception as e:
+            self.failures += 1
+            self.breaker.record_failure()
+            self._record(site, started, prompt, ''.join(chunks), error=e, tag=tag)
+            print(f"⚠️ LLM stream failed: {e}")
+            raise LLMUnavailable(str(e))
+        finally:
+            self.slots.release()
+
+    def stats(self):
+        """Return call counters and the circuit breaker state."""
+        return {
+            'provider': getattr(self.provider, 'name', 'custom'),
+            'calls': self.calls,
+            'failures': self.failures,
+            'rejected': self.rejected,
+            'max_concurrency': self.max_concurrency,
+            'circuit': self.breaker.state(),
+            'rate_limit': self.limiter.stats() if self.limiter is not None else None
+        }
+
+
+def iter_json_objects(chunks):
+    """Yield each complete top-level {...} object in streamed JSON text (e.g. the items of an array).
+
+    Text outside objects, such as brackets, commas or Markdown fences, is skipped,
+    as are objects that fail to parse.
+    """
+    depth = 0
+    in_string = escaped = False
+    buffer = []
+    for chunk in chunks:
+        for ch in chunk:
+            if depth == 0:
+                if ch == '{':
+                    depth = 1
+                    buffer = [ch]
+                continue
+            buffer.append(ch)
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif ch == '\\':
+                    escaped = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch == '{':
+                depth += 1
+            elif ch == '}':
+                depth -= 1
+                if depth == 0:
+                    try:
+                        yield json.loads(''.join(buffer))
+                    except ValueError:
+                        pass
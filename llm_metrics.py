@@ -0,0 +1,91 @@
+import threading
+from collections import OrderedDict, defaultdict, deque
+
+
+def percentile(values, pct):
+    """Return the nearest-rank percentile of values, or None if there are none."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))]
+
+
+class LLMMetrics:
+    """In-process latency, size, token, cost and fallback statistics of LLM calls, per call site.
+
+    Latency percentiles are computed over the last window calls of each site; counters
+    cover the life of the process. Cost is also totalled per tag (e.g. a requisition).
+    """
+
+    def __init__(self, window=1000, input_cost_per_1k=0.0, output_cost_per_1k=0.0, max_tags=1000):
+        self.window = window
+        self.input_cost_per_1k = input_cost_per_1k
+        self.output_cost_per_1k = output_cost_per_1k
+        self.max_tags = max_tags
+        self.lock = threading.Lock()
+        self.sites = defaultdict(self._new_site)
+        self.tag_costs = OrderedDict()
+
+    def _new_site(self):
+        return {'latencies': deque(maxlen=self.window), 'calls': 0, 'errors': 0, 'rejected': 0,
+                'prompt_chars': 0, 'response_chars': 0, 'prompt_tokens': 0, 'response_tokens': 0,
+                'estimated_tokens': 0, 'parse_failures': 0, 'fallbacks': defaultdict(int), 'cost': 0.0}
+
+    def record(self, site, latency, prompt, response=None, usage=None, error=None, tag=None):
+        """Record one call; usage is {'prompt_tokens', 'response_tokens'}, estimated from sizes when absent."""
+        response = response or ''
+        estimated = usage is None
+        if estimated:
+            # Roughly four characters per token for English text.
+            usage = {'prompt_tokens': len(prompt) // 4, 'response_tokens': len(response) // 4}
+        cost = (usage['prompt_tokens'] * self.input_cost_per_1k + usage['response_tokens'] * self.output_cost_per_1k) / 1000
+        with self.lock:
+            stats = self.sites[site]
+            stats['latencies'].append(latency)
+            stats['calls'] += 1
+            stats['errors'] += error is not None
+            stats['prompt_chars'] += len(prompt)
+            stats['response_chars'] += len(response)
+            stats['prompt_tokens'] += usage['prompt_tokens']
+            stats['response_tokens'] += usage['response_tokens']
+            stats['estimated_tokens'] += estimated
+            stats['cost'] += cost
+            if tag is not None:
+                self.tag_costs[tag] = self.tag_costs.pop(tag, 0.0) + cost
+                while len(self.tag_costs) > self.max_tags:
+                    self.tag_costs.popitem(last=False)
+
+    def rejected(self, site):
+        """Count a call refused before reaching the LLM (open circuit, rate limit, no free slot)."""
+        with self.lock:
+            self.sites[site]['rejected'] += 1
+
+    def parse_failure(self, site, count=1):
+        """Count LLM responses (or items in them) that could not be used."""
+        with self.lock:
+            self.sites[site]['parse_failures'] += count
+
+    def fallback(self, site, reason):
+        """Count a time the caller used its canned content instead of the LLM's."""
+        with self.lock:
+            self.sites[site]['fallbacks'][reason] += 1
+
+    def summary(self):
+        """Return per-site statistics with latency percentiles in milliseconds."""
+        with self.lock:
+            sites = {name: dict(stats, latencies=list(stats['latencies']), fallbacks=dict(stats['fallbacks']))
+                     for name, stats in self.sites.items()}
+            tag_costs = dict(self.tag_costs)
+        report = {}
+        for name, stats in sites.items():
+            latencies = stats.pop('latencies')
+            calls = stats['calls']
+            report[name] = dict(
+                stats,
+                cost=round(stats['cost'], 6),
+                error_rate=round(stats['errors'] / calls, 4) if calls else 0.0,
+                avg_prompt_chars=round(stats['prompt_chars'] / calls) if calls else 0,
+                avg_response_chars=round(stats['response_chars'] / calls) if calls else 0,
+                latency_ms={label: round(percentile(latencies, pct) * 1000) if latencies else None
+                            for label, pct in (('p50', 50), ('p90', 90), ('p99', 99), ('max', 100))})
+        return {'sites': report, 'cost_by_tag': {tag: round(cost, 6) for tag, cost in tag_costs.items()}}
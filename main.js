@@ -1,6 +1,7 @@
 from mysql.connector import connect, Error
 import sys
 import os
+from migrations import run_migrations, LATEST_VERSION
 
 def create_database_if_not_exists():
     """Create the database if it doesn't exist."""
@@ -24,54 +25,18 @@ def create_database_if_not_exists():
             connection.close()
 
 def init_db():
-    """Initialize database tables."""
+    """Initialize database tables by applying pending schema migrations."""
+    connection = None
     try:
         connection = connect(
             host="localhost",
             user="root",
             password="",
-            database="ai_resume_db"
+            database="ai_resume_db",
+            autocommit=True
         )
-
-        cursor = connection.cursor()
-
-        # Create tables with proper structure
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS resumes (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            filename VARCHAR(255) NOT NULL,
-            match_percent FLOAT NOT NULL,
-            uploaded_on TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """)
-
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS candidates (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            name VARCHAR(255) NOT NULL,
-            email VARCHAR(255) NOT NULL UNIQUE,
-            match_percent FLOAT NOT NULL,
-            test_score FLOAT DEFAULT 0,
-            status VARCHAR(50) DEFAULT 'pending',
-            created_on TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """)
-
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS test_results (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            candidate_name VARCHAR(255) NOT NULL,
-            candidate_email VARCHAR(255) NOT NULL,
-            job_description LONGTEXT,
-            score FLOAT NOT NULL,
-            total_questions INT NOT NULL,
-            status VARCHAR(50) NOT NULL,
-            created_on TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """)
-
-        connection.commit()
-        print("✓ Database tables initialized successfully.")
+        version = run_migrations(connection, 'mysql')
+        print(f"✓ Database schema at version {version} (latest {LATEST_VERSION}).")
 
     except Error as e:
         print(f"❌ Error initializing database tables: {e}")
@@ -79,7 +44,6 @@ def init_db():
 
     finally:
         if connection:
-            cursor.close()
             connection.close()
     return True
 
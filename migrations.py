@@ -0,0 +1,641 @@
+import os
+import sqlite3
+import sys
+from datetime import datetime
+
+from repository import description_hash
+
+
+# ---------- Schema Helpers ----------
+def _column_exists(cursor, dialect, table, column):
+    """Check whether a column exists on a table."""
+    if dialect == 'sqlite':
+        cursor.execute(f"PRAGMA table_info({table})")
+        return any(row[1] == column for row in cursor.fetchall())
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s",
+        (table, column))
+    return cursor.fetchone()[0] > 0
+
+
+def add_column(table, column, definition):
+    """Migration step that adds a column only if an older schema lacks it."""
+    def step(cursor, dialect):
+        if not _column_exists(cursor, dialect, table, column):
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    return step
+
+
+def mysql_only(statement):
+    """Migration step that is skipped on SQLite (e.g. MODIFY COLUMN)."""
+    def step(cursor, dialect):
+        if dialect == 'mysql':
+            cursor.execute(statement)
+    return step
+
+
+def _to_sqlite(statement):
+    """Translate MySQL DDL into the SQLite dialect."""
+    return statement.replace('INT AUTO_INCREMENT PRIMARY KEY', 'INTEGER PRIMARY KEY AUTOINCREMENT')
+
+
+def _index_exists(cursor, dialect, table, name):
+    """Check whether a named index exists on a table."""
+    if dialect == 'sqlite':
+        cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND name = ?", (table, name))
+        return cursor.fetchone()[0] > 0
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s",
+        (table, name))
+    return cursor.fetchone()[0] > 0
+
+
+def create_indexes(indexes, unique=False):
+    """Migration step that creates SQL indexes from an index spec, skipping ones that already exist."""
+    def step(cursor, dialect):
+        for table, name, columns, _ in indexes:
+            if not _index_exists(cursor, dialect, table, name):
+                cursor.execute(f"CREATE {'UNIQUE ' if unique else ''}INDEX {name} ON {table} ({', '.join(columns)})")
+    return step
+
+
+def drop_indexes(indexes):
+    """Migration step that drops SQL indexes from an index spec, skipping ones already gone."""
+    def step(cursor, dialect):
+        for table, name, _, _ in indexes:
+            if _index_exists(cursor, dialect, table, name):
+                cursor.execute(f"DROP INDEX {name}" if dialect == 'sqlite' else f"DROP INDEX {name} ON {table}")
+    return step
+
+
+def create_mongo_indexes(indexes):
+    """MongoDB step that creates the same index spec (idempotent, default names)."""
+    def step(db):
+        for table, _, columns, mongo_columns in indexes:
+            db[table].create_index([(column, 1) for column in (mongo_columns or columns)])
+    return step
+
+
+def drop_mongo_indexes(indexes):
+    """MongoDB step that drops the same index spec, skipping indexes already gone."""
+    def step(db):
+        for table, _, columns, mongo_columns in indexes:
+            keys = [(column, 1) for column in (mongo_columns or columns)]
+            if any(index['key'] == keys for index in db[table].index_information().values()):
+                db[table].drop_index(keys)
+    return step
+
+
+# ---------- Managed Indexes ----------
+# (table, SQL index name, columns, MongoDB columns if they differ)
+QUERY_INDEXES = [
+    ('candidates', 'idx_candidates_name', ['name'], None),
+    ('candidates', 'idx_candidates_test_score', ['test_score'], None),
+    ('test_results', 'idx_test_results_candidate', ['candidate_name', 'created_on'], None),
+    ('hr_notifications', 'idx_notifications_sent_on', ['sent_on'], None),
+    ('second_round_challenges', 'idx_challenges_candidate', ['candidate_id'], ['candidate_id', 'created_on']),
+    ('second_round_results', 'idx_second_round_results_candidate', ['candidate_id'], None)
+]
+
+
+# Serves the /top-3-results group counts and the per-group top-N / pagination reads.
+DASHBOARD_INDEXES = [
+    ('candidates', 'idx_candidates_dashboard', ['status', 'job_key', 'test_score', 'id'],
+     ['status', 'job_key', 'test_score', '_id'])
+]
+
+
+# From version 14 the dashboard pages through job requisitions: counting the groups of a page's
+# requisitions reads one range per requisition, and each group's top-N / pagination reads follow on.
+JOB_GROUP_INDEXES = [
+    ('candidates', 'idx_candidates_job_groups', ['job_id', 'status', 'test_score', 'id'],
+     ['job_id', 'status', 'test_score', '_id'])
+]
+
+
+# Serves the unseen-notification count and "mark all seen up to" updates.
+UNSEEN_INDEXES = [
+    ('hr_notifications', 'idx_notifications_unseen', ['seen', 'sent_on', 'candidate_id'], None)
+]
+
+
+# Test results are looked up by candidate id instead of name from version 6.
+TEST_RESULT_INDEXES = [
+    ('test_results', 'idx_test_results_candidate_id', ['candidate_id', 'created_on'], None)
+]
+TEST_RESULT_NAME_INDEXES = [entry for entry in QUERY_INDEXES if entry[1] == 'idx_test_results_candidate']
+
+
+# From version 7 the dashboard groups by job requisition instead of job_key.
+JOB_INDEXES = [
+    ('candidates', 'idx_candidates_job_dashboard', ['status', 'job_id', 'test_score', 'id'],
+     ['status', 'job_id', 'test_score', '_id'])
+]
+
+
+# Test submissions are saved at most once per submission id from version 9.
+SUBMISSION_INDEXES = [
+    ('test_results', 'idx_test_results_submission', ['submission_id'], None)
+]
+
+
+# Per-section pools of the challenge bank; the id sampling query reads only this index.
+CHALLENGE_BANK_INDEXES = [
+    ('challenge_bank', 'idx_challenge_bank_pool', ['section', 'topic', 'difficulty'], None)
+]
+
+
+# Bulk-inserted candidates are tagged with a batch key so their ids can be read back in one query.
+INSERT_BATCH_INDEXES = [
+    ('candidates', 'idx_candidates_insert_batch', ['insert_batch'], None)
+]
+
+
+# Serve the oldest-first batches of the retention job and on-demand restores.
+RETENTION_INDEXES = [
+    ('test_results', 'idx_test_results_created_on', ['created_on'], None),
+    ('second_round_results', 'idx_second_round_results_submitted_on', ['submitted_on'], None),
+    ('resumes', 'idx_resumes_uploaded_on', ['uploaded_on'], None),
+    ('archived_records', 'idx_archived_records_candidate', ['candidate_id'], None)
+]
+
+
+def backfill_job_requisitions(tables):
+    """Migration step that moves distinct job descriptions into job_requisitions and links rows by job_id."""
+    def step(cursor, dialect):
+        placeholder = '?' if dialect == 'sqlite' else '%s'
+        ignore = 'INSERT OR IGNORE' if dialect == 'sqlite' else 'INSERT IGNORE'
+        for table in tables:
+            cursor.execute(f"SELECT DISTINCT job_description FROM {table} "
+                           f"WHERE job_id IS NULL AND job_description IS NOT NULL AND job_description <> ''")
+            for (description,) in cursor.fetchall():
+                digest = description_hash(description)
+                cursor.execute(f"{ignore} INTO job_requisitions (title, description, description_hash) "
+                               f"VALUES ({placeholder}, {placeholder}, {placeholder})", (description[:40], description, digest))
+                cursor.execute(f"SELECT id FROM job_requisitions WHERE description_hash = {placeholder}", (digest,))
+                job_id = cursor.fetchone()[0]
+                cursor.execute(f"UPDATE {table} SET job_id = {placeholder} WHERE job_id IS NULL AND job_description = {placeholder}",
+                               (job_id, description))
+    return step
+
+
+# ---------- MongoDB Steps ----------
+def _mongo_initial_indexes(db):
+    db.candidates.create_index("email")
+    db.candidates.create_index("name")
+    db.hr_notifications.create_index("candidate_id")
+    db.test_results.create_index("candidate_email")
+    db.admin_users.create_index("username", unique=True)
+
+
+def _mongo_backfill_job_key(db):
+    db.candidates.update_many({'job_key': {'$exists': False}}, [{'$set': {'job_key': {'$cond': [
+        {'$gt': [{'$strLenCP': {'$ifNull': ['$job_description', '']}}, 0]},
+        {'$substrCP': ['$job_description', 0, 40]},
+        None
+    ]}}}])
+    create_mongo_indexes(DASHBOARD_INDEXES)(db)
+
+
+def _mongo_unseen_notifications(db):
+    db.hr_notifications.update_many({'seen': {'$ne': True}}, {'$set': {'seen': False}})
+    create_mongo_indexes(UNSEEN_INDEXES)(db)
+
+
+def _mongo_test_result_candidate_ids(db):
+    # Link existing results to the candidate with the same name, as the old lookup did.
+    db.test_results.aggregate([
+        {'$match': {'candidate_id': {'$exists': False}}},
+        {'$lookup': {'from': 'candidates', 'localField': 'candidate_name', 'foreignField': 'name', 'as': 'candidate'}},
+        {'$match': {'candidate.0': {'$exists': True}}},
+        {'$project': {'candidate_id': {'$toString': {'$arrayElemAt': ['$candidate._id', 0]}}}},
+        {'$merge': {'into': 'test_results', 'on': '_id', 'whenMatched': 'merge', 'whenNotMatched': 'discard'}}
+    ])
+    create_mongo_indexes(TEST_RESULT_INDEXES)(db)
+    if 'candidate_name_1_created_on_1' in db.test_results.index_information():
+        db.test_results.drop_index([('candidate_name', 1), ('created_on', 1)])
+
+
+def _mongo_job_requisitions(db):
+    db.job_requisitions.create_index("description_hash", unique=True)
+    for table in ('candidates', 'test_results'):
+        for description in db[table].distinct('job_description', {'job_id': {'$exists': False}}):
+            if not description:
+                continue
+            job = db.job_requisitions.find_one_and_update(
+                {'description_hash': description_hash(description)},
+                {'$setOnInsert': {'title': description[:40], 'description': description, 'created_on': datetime.now()}},
+                upsert=True, return_document=True)
+            db[table].update_many({'job_id': {'$exists': False}, 'job_description': description},
+                                  {'$set': {'job_id': str(job['_id'])}})
+    create_mongo_indexes(JOB_INDEXES)(db)
+    drop_mongo_indexes(DASHBOARD_INDEXES)(db)
+
+
+def _mongo_submission_ids(db):
+    # Results saved before version 9 have no submission id, so only string ids must be unique.
+    db.test_results.create_index('submission_id', unique=True,
+                                 partialFilterExpression={'submission_id': {'$type': 'string'}})
+
+
+def _mongo_question_sets(db):
+    db.question_sets.create_index([('set_hash', 1), ('variant', 1)], unique=True)
+
+
+def _mongo_challenge_bank(db):
+    db.challenge_bank.create_index('item_hash', unique=True)
+    create_mongo_indexes(CHALLENGE_BANK_INDEXES)(db)
+
+
+def _mongo_default_test_scores(db):
+    db.candidates.update_many({'test_score': None}, {'$set': {'test_score': 0}})
+
+
+def _mongo_job_group_indexes(db):
+    create_mongo_indexes(JOB_GROUP_INDEXES)(db)
+    drop_mongo_indexes(JOB_INDEXES)(db)
+
+
+# ---------- Migrations ----------
+# Each migration runs once per database and is recorded in schema_version.
+# "sql" steps are MySQL statements (translated for SQLite) or callables taking (cursor, dialect).
+# MySQL migrations are not transactional: DDL commits implicitly, so a migration that fails
+# part way keeps the steps before the failure. Every step must therefore be safe to rerun.
+MIGRATIONS = [
+    {
+        'version': 1,
+        'description': 'Initial schema',
+        'sql': [
+            """
+            CREATE TABLE IF NOT EXISTS resumes (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                filename VARCHAR(255),
+                match_percent FLOAT,
+                uploaded_on TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS candidates (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                name VARCHAR(255),
+                email VARCHAR(255),
+                match_percent FLOAT,
+                test_score FLOAT DEFAULT 0,
+                second_round_score FLOAT DEFAULT 0,
+                status VARCHAR(50) DEFAULT 'pending',
+                job_description LONGTEXT,
+                filename VARCHAR(255),
+                created_on TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS test_results (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                candidate_name VARCHAR(255),
+                candidate_email VARCHAR(255),
+                job_description LONGTEXT,
+                score FLOAT,
+                total_questions INT,
+                status VARCHAR(50),
+                created_on TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS hr_notifications (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                candidate_id VARCHAR(255),
+                candidate_name VARCHAR(255),
+                candidate_email VARCHAR(255),
+                test_score FLOAT,
+                match_percent FLOAT,
+                status VARCHAR(50) DEFAULT 'pending',
+                seen BOOLEAN DEFAULT FALSE,
+                combined_score FLOAT DEFAULT NULL,
+                sent_on TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS second_round_challenges (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                candidate_id VARCHAR(255),
+                challenges LONGTEXT,
+                created_on TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                status VARCHAR(50) DEFAULT 'pending'
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS second_round_results (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                candidate_id VARCHAR(255),
+                reasoning_score INT,
+                aptitude_score INT,
+                coding_score FLOAT,
+                total_score FLOAT,
+                percentage FLOAT,
+                answers LONGTEXT,
+                submitted_on TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS admin_users (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                username VARCHAR(100) UNIQUE,
+                password VARCHAR(255),
+                created_on TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        ],
+        'mongodb': _mongo_initial_indexes
+    },
+    {
+        'version': 2,
+        'description': 'Backfill columns missing from tables created by older releases',
+        'sql': [
+            add_column('candidates', 'job_description', 'LONGTEXT'),
+            add_column('candidates', 'filename', 'VARCHAR(255)'),
+            add_column('candidates', 'second_round_score', 'FLOAT DEFAULT 0'),
+            add_column('hr_notifications', 'combined_score', 'FLOAT DEFAULT NULL'),
+            mysql_only("ALTER TABLE hr_notifications MODIFY candidate_id VARCHAR(255)")
+        ]
+    },
+    {
+        'version': 3,
+        'description': 'Indexes for dashboard and submission queries',
+        'sql': [create_indexes(QUERY_INDEXES)],
+        'mongodb': create_mongo_indexes(QUERY_INDEXES)
+    },
+    {
+        'version': 4,
+        'description': 'Dashboard grouping key and index for /top-3-results',
+        'sql': [
+            add_column('candidates', 'job_key', 'VARCHAR(40)'),
+            "UPDATE candidates SET job_key = NULLIF(SUBSTR(job_description, 1, 40), '')",
+            create_indexes(DASHBOARD_INDEXES)
+        ],
+        'mongodb': _mongo_backfill_job_key
+    },
+    {
+        'version': 5,
+        'description': 'Indexed unseen-notification count',
+        'sql': [
+            # seen is only ever TRUE or FALSE from here on, so "unseen" is a single index range.
+            "UPDATE hr_notifications SET seen = FALSE WHERE seen IS NULL",
+            create_indexes(UNSEEN_INDEXES)
+        ],
+        'mongodb': _mongo_unseen_notifications
+    },
+    {
+        'version': 6,
+        'description': 'Link test results to candidates by id',
+        'sql': [
+            add_column('test_results', 'candidate_id', 'VARCHAR(255)'),
+            """
+            UPDATE test_results SET candidate_id = (
+                SELECT MIN(candidates.id) FROM candidates WHERE candidates.name = test_results.candidate_name
+            ) WHERE candidate_id IS NULL
+            """,
+            create_indexes(TEST_RESULT_INDEXES),
+            drop_indexes(TEST_RESULT_NAME_INDEXES)
+        ],
+        'mongodb': _mongo_test_result_candidate_ids
+    },
+    {
+        'version': 7,
+        'description': 'Job requisitions referenced by job_id',
+        'sql': [
+            """
+            CREATE TABLE IF NOT EXISTS job_requisitions (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                title VARCHAR(255),
+                description LONGTEXT,
+                description_hash CHAR(64) UNIQUE,
+                created_on TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            add_column('candidates', 'job_id', 'INT'),
+            add_column('test_results', 'job_id', 'INT'),
+            add_column('second_round_challenges', 'job_id', 'INT'),
+            backfill_job_requisitions(['candidates', 'test_results']),
+            create_indexes(JOB_INDEXES),
+            drop_indexes(DASHBOARD_INDEXES)
+        ],
+        'mongodb': _mongo_job_requisitions
+    },
+    {
+        'version': 8,
+        'description': 'Archive table for retention',
+        'sql': [
+            """
+            CREATE TABLE IF NOT EXISTS archived_records (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                source_table VARCHAR(64),
+                record_id VARCHAR(64),
+                candidate_id VARCHAR(255),
+                payload LONGBLOB,
+                archived_on TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            create_indexes(RETENTION_INDEXES)
+        ],
+        'mongodb': create_mongo_indexes(RETENTION_INDEXES)
+    },
+    {
+        'version': 9,
+        'description': 'Idempotent test submissions',
+        'sql': [
+            add_column('test_results', 'submission_id', 'VARCHAR(64)'),
+            create_indexes(SUBMISSION_INDEXES, unique=True)
+        ],
+        'mongodb': _mongo_submission_ids
+    },
+    {
+        'version': 10,
+        'description': 'Generated question sets per job description',
+        'sql': [
+            """
+            CREATE TABLE IF NOT EXISTS question_sets (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                set_hash CHAR(64),
+                variant INT,
+                questions LONGTEXT,
+                created_on TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (set_hash, variant)
+            )
+            """
+        ],
+        'mongodb': _mongo_question_sets
+    },
+    {
+        'version': 11,
+        'description': 'Challenge bank for second round sets',
+        'sql': [
+            """
+            CREATE TABLE IF NOT EXISTS challenge_bank (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                item_hash CHAR(64) UNIQUE,
+                section VARCHAR(20),
+                topic VARCHAR(64),
+                difficulty VARCHAR(16),
+                item LONGTEXT,
+                created_on TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            create_indexes(CHALLENGE_BANK_INDEXES)
+        ],
+        'mongodb': _mongo_challenge_bank
+    },
+    {
+        'version': 12,
+        'description': 'Batch key for reading back bulk-inserted candidate ids',
+        'sql': [
+            add_column('candidates', 'insert_batch', 'CHAR(32)'),
+            create_indexes(INSERT_BATCH_INDEXES)
+        ]
+    },
+    {
+        'version': 13,
+        'description': 'Score untested candidates 0 so dashboard pages reach them',
+        'sql': ["UPDATE candidates SET test_score = 0 WHERE test_score IS NULL"],
+        'mongodb': _mongo_default_test_scores
+    },
+    {
+        'version': 14,
+        'description': 'Dashboard index led by job_id for paging through job requisitions',
+        'sql': [
+            create_indexes(JOB_GROUP_INDEXES),
+            drop_indexes(JOB_INDEXES)
+        ],
+        'mongodb': _mongo_job_group_indexes
+    }
+]
+
+LATEST_VERSION = MIGRATIONS[-1]['version']
+
+
+# ---------- Runner ----------
+SCHEMA_VERSION_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INT PRIMARY KEY,
+    description VARCHAR(255),
+    applied_on TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+def _run_sql_migrations(conn, dialect):
+    cursor = conn.cursor()
+    if dialect == 'mysql':
+        # Serialize concurrent deploys; the lock is released when the session ends.
+        cursor.execute("SELECT GET_LOCK('ai_resume_schema_migrations', 60)")
+        cursor.fetchall()
+    try:
+        cursor.execute(_to_sqlite(SCHEMA_VERSION_TABLE) if dialect == 'sqlite' else SCHEMA_VERSION_TABLE)
+        cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+        current = cursor.fetchone()[0]
+        placeholder = '?' if dialect == 'sqlite' else '%s'
+
+        for migration in MIGRATIONS:
+            if migration['version'] <= current:
+                continue
+            print(f"🔄 Applying migration {migration['version']}: {migration['description']}")
+            if dialect == 'sqlite':
+                # SQLite DDL is transactional, so a failed migration leaves no partial schema.
+                # On MySQL the rollback below only undoes data changes; the rerun skips finished DDL.
+                cursor.execute("BEGIN")
+            try:
+                for step in migration.get('sql', []):
+                    if callable(step):
+                        step(cursor, dialect)
+                    else:
+                        cursor.execute(_to_sqlite(step) if dialect == 'sqlite' else step)
+                cursor.execute(f"INSERT INTO schema_version (version, description) VALUES ({placeholder}, {placeholder})",
+                               (migration['version'], migration['description']))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            current = migration['version']
+        return current
+    finally:
+        if dialect == 'mysql':
+            cursor.execute("SELECT RELEASE_LOCK('ai_resume_schema_migrations')")
+            cursor.fetchall()
+        cursor.close()
+
+
+def _run_mongo_migrations(db):
+    applied = db.schema_version.find_one(sort=[('_id', -1)])
+    current = applied['_id'] if applied else 0
+    for migration in MIGRATIONS:
+        if migration['version'] <= current:
+            continue
+        print(f"🔄 Applying migration {migration['version']}: {migration['description']}")
+        if 'mongodb' in migration:
+            migration['mongodb'](db)
+        db.schema_version.insert_one({
+            '_id': migration['version'],
+            'description': migration['description'],
+            'applied_on': datetime.now()
+        })
+        current = migration['version']
+    return current
+
+
+def run_migrations(conn, backend):
+    """Apply pending migrations and return the resulting schema version."""
+    backend = backend.lower()
+    if backend == 'mongodb':
+        return _run_mongo_migrations(conn)
+    return _run_sql_migrations(conn, 'sqlite' if backend == 'sqlite' else 'mysql')
+
+
+# Store timestamps as ISO text and read TIMESTAMP columns back as datetimes, as MySQL returns them.
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_converter('TIMESTAMP', lambda value: datetime.fromisoformat(value.decode()))
+
+
+def connect_sqlite(path):
+    """Open an autocommit SQLite connection in WAL mode.
+
+    Connections belong to the thread that opened them; keeping one open per
+    thread lets its prepared-statement cache serve every later query.
+    """
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None, detect_types=sqlite3.PARSE_DECLTYPES,
+                           cached_statements=256)
+    # WAL lets readers proceed while one writer commits.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def connect(config, backend=None):
+    """Open a connection for the configured (or given) backend."""
+    backend = (backend or config.DB_TYPE).lower()
+    if backend == 'mongodb':
+        from pymongo import MongoClient
+        return MongoClient(config.MONGO_URI)[config.DB_NAME]
+    if backend == 'sqlite':
+        return connect_sqlite(getattr(config, 'SQLITE_PATH', None) or os.getenv('SQLITE_PATH', 'ai_resume.db'))
+    import mysql.connector
+    return mysql.connector.connect(
+        host=config.DB_HOST,
+        user=config.DB_USER,
+        password=config.DB_PASSWORD,
+        database=config.DB_NAME,
+        port=config.DB_PORT,
+        charset='latin1',
+        autocommit=True
+    )
+
+
+if __name__ == "__main__":
+    from config import get_config
+
+    config = get_config()
+    try:
+        conn = connect(config)
+        version = run_migrations(conn, config.DB_TYPE)
+        print(f"✓ Database schema at version {version} (latest {LATEST_VERSION})")
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        sys.exit(1)
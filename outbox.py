@@ -0,0 +1,199 @@
+import smtplib
+import sqlite3
+import threading
+import time
+
+OUTBOX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    batch_id TEXT,
+    recipient TEXT,
+    subject TEXT,
+    body TEXT,
+    html TEXT,
+    status TEXT DEFAULT 'queued',
+    attempts INTEGER DEFAULT 0,
+    claimed_until REAL DEFAULT 0,
+    last_error TEXT,
+    created_on REAL,
+    sent_on REAL
+)
+"""
+
+# Errors after which the SMTP session cannot be used for the rest of the batch.
+# SMTPException subclasses OSError, so refused recipients are not matched by catching OSError.
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+class MailOutbox:
+    """Local SQLite outbox of emails waiting to be sent, grouped into batches."""
+
+    def __init__(self, path, lease_seconds=300):
+        self.lease_seconds = lease_seconds
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(OUTBOX_SCHEMA)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_queued ON outbox (status, claimed_until)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_batch ON outbox (batch_id)")
+
+    def enqueue(self, batch_id, messages):
+        """Durably queue messages ({'recipient', 'subject', 'body', 'html'}) under batch_id."""
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                self.conn.executemany(
+                    "INSERT INTO outbox (batch_id, recipient, subject, body, html, created_on) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(batch_id, m['recipient'], m['subject'], m.get('body'), m.get('html'), now) for m in messages])
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def claim(self, limit):
+        """Lease up to limit queued messages, oldest first; an expired lease makes a message claimable again."""
+        now = time.time()
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE outbox SET status = 'sending', claimed_until = ?, attempts = attempts + 1 WHERE id IN ("
+                "SELECT id FROM outbox WHERE status IN ('queued', 'sending') AND claimed_until < ? ORDER BY id LIMIT ?"
+                ") RETURNING id, recipient, subject, body, html", (now + self.lease_seconds, now, int(limit)))
+            columns = [c[0] for c in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        return sorted(rows, key=lambda row: row['id'])
+
+    def mark_sent(self, row_id):
+        with self.lock:
+            self.conn.execute("UPDATE outbox SET status = 'sent', sent_on = ?, last_error = NULL WHERE id = ?",
+                              (time.time(), row_id))
+
+    def mark_failed(self, row_id, error, retry_after, max_attempts):
+        """Queue a message for another attempt after retry_after seconds, or fail it after max_attempts."""
+        with self.lock:
+            self.conn.execute(
+                "UPDATE outbox SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, "
+                "claimed_until = ?, last_error = ? WHERE id = ? AND status = 'sending'",
+                (max_attempts, time.time() + retry_after, str(error)[:500], row_id))
+
+    def release(self, row_ids):
+        """Return claimed messages that were not tried to the queue without counting an attempt."""
+        if not row_ids:
+            return
+        with self.lock:
+            self.conn.execute(f"UPDATE outbox SET status = 'queued', claimed_until = 0, attempts = attempts - 1 "
+                              f"WHERE id IN ({', '.join(['?'] * len(row_ids))})", tuple(row_ids))
+
+    def batch_status(self, batch_id):
+        """Return per-recipient delivery status and counts for a batch, or None if it is unknown."""
+        with self.lock:
+            rows = self.conn.execute("SELECT recipient, status, attempts, last_error FROM outbox WHERE batch_id = ? ORDER BY id",
+                                     (batch_id,)).fetchall()
+        if not rows:
+            return None
+        counts = {}
+        for _, status, _, _ in rows:
+            counts[status] = counts.get(status, 0) + 1
+        return {
+            'batch_id': batch_id,
+            'counts': counts,
+            'done': not counts.get('queued') and not counts.get('sending'),
+            'recipients': [{'email': recipient, 'status': status, 'attempts': attempts, 'error': error}
+                           for recipient, status, attempts, error in rows]
+        }
+
+    def purge_sent(self, older_than_seconds):
+        with self.lock:
+            self.conn.execute("DELETE FROM outbox WHERE status = 'sent' AND sent_on < ?", (time.time() - older_than_seconds,))
+
+    def pending_count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM outbox WHERE status IN ('queued', 'sending')").fetchone()[0]
+
+
+class OutboxSender:
+    """Worker threads that send queued emails, each over one SMTP session per run of batches."""
+
+    def __init__(self, outbox, connect, build_message, context=None, workers=2, batch_size=50, interval=5,
+                 retry_after=60, max_attempts=5, keep_seconds=7 * 86400):
+        self.outbox = outbox
+        self.connect = connect
+        self.build_message = build_message
+        self.context = context
+        self.workers = workers
+        self.batch_size = batch_size
+        self.interval = interval
+        self.retry_after = retry_after
+        self.max_attempts = max_attempts
+        self.keep_seconds = keep_seconds
+        self.wakeup = threading.Event()
+        self.sent = 0
+        self.errors = 0
+
+    def wake(self):
+        """Send now instead of at the next interval."""
+        self.wakeup.set()
+
+    def _send(self, connection, batch):
+        """Send a claimed batch; return False if the SMTP session broke and must be reopened."""
+        for index, row in enumerate(batch):
+            try:
+                connection.send(self.build_message(row))
+                self.outbox.mark_sent(row['id'])
+                self.sent += 1
+            except CONNECTION_ERRORS as e:
+                print(f"❌ SMTP session lost sending to {row['recipient']}: {e}")
+                self.errors += 1
+                self.outbox.mark_failed(row['id'], e, self.retry_after, self.max_attempts)
+                self.outbox.release([r['id'] for r in batch[index + 1:]])
+                return False
+            except Exception as e:
+                print(f"❌ Email to {row['recipient']} failed, will retry: {e}")
+                self.errors += 1
+                self.outbox.mark_failed(row['id'], e, self.retry_after, self.max_attempts)
+        return True
+
+    def send_pending(self):
+        """Send queued emails until none are claimable and return how many batches were sent."""
+        batches = 0
+        batch = self.outbox.claim(self.batch_size)
+        while batch:
+            try:
+                # One SMTP login serves every batch claimed while the queue stays non-empty.
+                with self.connect() as connection:
+                    while batch:
+                        batches += 1
+                        if not self._send(connection, batch):
+                            break
+                        batch = self.outbox.claim(self.batch_size)
+                    else:
+                        return batches
+            except Exception as e:
+                print(f"❌ Could not open SMTP session: {e}")
+                for row in batch:
+                    self.outbox.mark_failed(row['id'], e, self.retry_after, self.max_attempts)
+                return batches
+            batch = self.outbox.claim(self.batch_size)
+        return batches
+
+    def run(self):
+        # Emails queued before a restart are sent first.
+        while True:
+            self.wakeup.clear()
+            try:
+                if self.context is not None:
+                    with self.context():
+                        self.send_pending()
+                else:
+                    self.send_pending()
+                self.outbox.purge_sent(self.keep_seconds)
+            except Exception as e:
+                print(f"❌ Outbox error: {e}")
+            self.wakeup.wait(self.interval)
+
+    def start(self):
+        for i in range(self.workers):
+            threading.Thread(target=self.run, name=f"mail-outbox-{i}", daemon=True).start()
+
+    def stats(self):
+        return {'workers': self.workers, 'pending': self.outbox.pending_count(), 'sent': self.sent, 'errors': self.errors}
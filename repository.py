@@ -0,0 +1,1103 @@
+import hashlib
+import json
+import random
+import uuid
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+
+from bson import ObjectId, decode as bson_decode, encode as bson_encode
+from pymongo import ReplaceOne, ReturnDocument, UpdateOne
+
+
+def to_object_id(value):
+    """Convert an id to a MongoDB ObjectId, or return it unchanged if it is not one."""
+    try:
+        return ObjectId(value)
+    except Exception:
+        return value
+
+
+def _chunks(items, size):
+    """Yield successive slices of at most size items."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def description_hash(description):
+    """Return the key that deduplicates job requisitions with identical descriptions."""
+    return hashlib.sha256(description.encode('utf-8')).hexdigest()
+
+
+# Tables whose old rows are moved to archived_records: table -> (age column, candidate id column).
+ARCHIVE_TABLES = {
+    'hr_notifications': ('sent_on', 'candidate_id'),
+    'test_results': ('created_on', 'candidate_id'),
+    'second_round_results': ('submitted_on', 'candidate_id'),
+    'resumes': ('uploaded_on', None)
+}
+
+
+def question_set_hash(description):
+    """Return the key shared by job descriptions that differ only in case or whitespace."""
+    return description_hash(' '.join(description.lower().split()))
+
+
+def _from_document(doc):
+    """Convert a MongoDB document into a plain record with a string id."""
+    if doc is None:
+        return None
+    record = dict(doc)
+    record['id'] = str(record.pop('_id'))
+    return record
+
+
+# ---------- Repository Interfaces ----------
+class CandidateRepo:
+    """Storage operations for candidates."""
+
+    def insert(self, candidate):
+        """Insert one candidate and return its id."""
+        raise NotImplementedError
+
+    def insert_many(self, candidates):
+        """Insert many candidates in one batch and return their ids in order."""
+        raise NotImplementedError
+
+    def get(self, candidate_id):
+        """Return one candidate record, or None."""
+        raise NotImplementedError
+
+    def get_many(self, candidate_ids):
+        """Return the candidate records for several ids in one round trip."""
+        raise NotImplementedError
+
+    def find_by_name(self, name):
+        """Return the first candidate with the given name, or None."""
+        raise NotImplementedError
+
+    def update(self, candidate_id, fields):
+        """Apply fields to one candidate in a single primary-key write; nothing is read back."""
+        raise NotImplementedError
+
+    def group_counts(self, job_ids):
+        """Return the number of candidates per (status, job_id) group of the given requisitions;
+        a None job id counts the candidates linked to none."""
+        raise NotImplementedError
+
+    def top_per_group(self, groups, limit):
+        """Return the best limit candidates by test score in each (status, job_id) group."""
+        raise NotImplementedError
+
+    def list_group(self, statuses, job_id, limit, after=None):
+        """Return the next limit candidates in a group, best first, after a (test_score, id) position."""
+        raise NotImplementedError
+
+    def export_batches(self, job_id=None, statuses=None, since=None, until=None, batch_size=1000):
+        """Yield lists of up to batch_size matching candidates in id order, each with its requisition's job_title,
+        streamed from a server-side cursor."""
+        raise NotImplementedError
+
+
+class NotificationRepo:
+    """Storage operations for HR notifications."""
+
+    def insert(self, notification):
+        """Insert one notification and return its id."""
+        raise NotImplementedError
+
+    def insert_for_candidate(self, notification):
+        """Insert a notification with its candidate's match_percent filled in by the same write;
+        return its id, or None if the candidate does not exist."""
+        raise NotImplementedError
+
+    def list_recent(self, limit=20):
+        """Return the latest notifications, newest first."""
+        raise NotImplementedError
+
+    def mark_seen(self, notification_id):
+        """Mark one notification as seen."""
+        raise NotImplementedError
+
+    def mark_seen_many(self, notification_ids):
+        """Mark several notifications as seen in one statement and return how many changed."""
+        raise NotImplementedError
+
+    def mark_seen_before(self, timestamp):
+        """Mark every notification sent up to timestamp as seen and return how many changed."""
+        raise NotImplementedError
+
+    def unseen_count(self):
+        """Return the number of unseen notifications."""
+        raise NotImplementedError
+
+    def version(self):
+        """Return a string that changes whenever a notification is added or marked seen, in any process."""
+        raise NotImplementedError
+
+
+class TestResultRepo:
+    """Storage operations for first and second round results."""
+
+    def insert(self, result):
+        """Insert one first round test result."""
+        raise NotImplementedError
+
+    def latest_for_candidate(self, candidate_id):
+        """Return the latest first round result for a candidate, or None."""
+        raise NotImplementedError
+
+    def has_submission(self, submission_id):
+        """Return True if a result for this test submission is already stored."""
+        raise NotImplementedError
+
+    def insert_second_round(self, result):
+        """Insert one second round result."""
+        raise NotImplementedError
+
+    def get_second_round(self, candidate_id):
+        """Return the second round result for a candidate, or None."""
+        raise NotImplementedError
+
+
+class ChallengeRepo:
+    """Storage operations for second round challenges."""
+
+    def insert(self, candidate_id, challenges, job_id=None):
+        """Store the challenge set generated for a candidate."""
+        raise NotImplementedError
+
+    def get_for_candidate(self, candidate_id):
+        """Return the latest challenge set for a candidate, or None."""
+        raise NotImplementedError
+
+
+class JobRepo:
+    """Storage operations for job requisitions."""
+
+    def get_or_create(self, description):
+        """Return the id of the requisition with this description, creating it if needed."""
+        raise NotImplementedError
+
+    def get(self, job_id):
+        """Return one requisition, or None."""
+        raise NotImplementedError
+
+    def get_many(self, job_ids):
+        """Return the requisitions for several ids in one round trip."""
+        raise NotImplementedError
+
+    def list_page(self, limit, before=None):
+        """Return the id and title of up to limit requisitions, newest first, older than the before id."""
+        raise NotImplementedError
+
+
+class QuestionSetRepo:
+    """Storage for generated test question sets, per job description and variant."""
+
+    def get(self, set_hash, variant):
+        """Return {'questions', 'created_on'} for a stored variant, or None."""
+        raise NotImplementedError
+
+    def put(self, set_hash, variant, questions):
+        """Store (or replace) the questions of one variant."""
+        raise NotImplementedError
+
+
+class ChallengeBankRepo:
+    """Validated second round challenge items, tagged by section, topic and difficulty."""
+
+    def insert_many(self, records):
+        """Store records whose item_hash is not in the bank yet and return how many were new."""
+        raise NotImplementedError
+
+    def sample(self, section, count, topic=None):
+        """Return up to count random items of a section, optionally of one topic."""
+        raise NotImplementedError
+
+    def counts(self, sections, topic=None):
+        """Return the number of items in each section, optionally of one topic."""
+        raise NotImplementedError
+
+
+class ResumeRepo:
+    """Storage operations for resume match results."""
+
+    def insert_many(self, resumes):
+        """Insert many resume results in one batch and return how many were saved."""
+        raise NotImplementedError
+
+
+class ArchiveRepo:
+    """Moves old records into compressed archive rows and back."""
+
+    def archive_before(self, table, cutoff, limit):
+        """Archive up to limit rows of table older than cutoff, oldest first, and return how many moved."""
+        raise NotImplementedError
+
+    def restore_candidate(self, candidate_id):
+        """Move a candidate's archived records back into their tables and return the count per table."""
+        raise NotImplementedError
+
+
+class AdminRepo:
+    """Storage operations for admin users."""
+
+    def count(self):
+        """Return the number of admin users."""
+        raise NotImplementedError
+
+    def insert(self, username, password):
+        """Create an admin user."""
+        raise NotImplementedError
+
+    def authenticate(self, username, password):
+        """Return True if the credentials match an admin user."""
+        raise NotImplementedError
+
+
+# ---------- MongoDB Implementations ----------
+class MongoCandidateRepo(CandidateRepo):
+    def __init__(self, db, chunk_size=1000):
+        self.db = db
+        self.chunk_size = chunk_size
+
+    @staticmethod
+    def _new_document(candidate, now):
+        # Untested candidates score 0, as the SQL column defaults, so dashboard cursors can page past them.
+        doc = dict(candidate, created_on=now)
+        if doc.get('test_score') is None:
+            doc['test_score'] = 0
+        return doc
+
+    def insert(self, candidate):
+        doc = self._new_document(candidate, datetime.now())
+        return str(self.db.candidates.insert_one(doc).inserted_id)
+
+    def insert_many(self, candidates):
+        now = datetime.now()
+        ids = []
+        for chunk in _chunks(candidates, self.chunk_size):
+            result = self.db.candidates.insert_many([self._new_document(c, now) for c in chunk])
+            ids.extend(str(i) for i in result.inserted_ids)
+        return ids
+
+    def get(self, candidate_id):
+        return _from_document(self.db.candidates.find_one({'_id': to_object_id(candidate_id)}))
+
+    def get_many(self, candidate_ids):
+        ids = [to_object_id(i) for i in candidate_ids]
+        return [_from_document(d) for d in self.db.candidates.find({'_id': {'$in': ids}})]
+
+    def find_by_name(self, name):
+        return _from_document(self.db.candidates.find_one({'name': name}))
+
+    def update(self, candidate_id, fields):
+        self.db.candidates.update_one({'_id': to_object_id(candidate_id)}, {'$set': fields})
+
+    def group_counts(self, job_ids):
+        pipeline = [
+            # $in matches None against a missing job_id too; the counts are read from the dashboard index.
+            {'$match': {'job_id': {'$in': list(job_ids)}}},
+            {'$project': {'_id': 0, 'status': 1, 'job_id': 1}},
+            {'$group': {'_id': {'status': '$status', 'job_id': '$job_id'}, 'total': {'$sum': 1}}}
+        ]
+        return [{'status': g['_id'].get('status'), 'job_id': g['_id'].get('job_id'), 'total': g['total']}
+                for g in self.db.candidates.aggregate(pipeline)]
+
+    def top_per_group(self, groups, limit):
+        candidates = []
+        for status, job_id in groups:
+            candidates.extend(self.list_group([status], job_id, limit))
+        return candidates
+
+    def list_group(self, statuses, job_id, limit, after=None):
+        query = {'status': {'$in': list(statuses)}, 'job_id': job_id}
+        if after is not None:
+            score, last_id = after
+            query['$or'] = [{'test_score': {'$lt': score}}, {'test_score': score, '_id': {'$lt': to_object_id(last_id)}}]
+        cursor = self.db.candidates.find(query).sort([('test_score', -1), ('_id', -1)]).limit(limit)
+        return [_from_document(d) for d in cursor]
+
+    def export_batches(self, job_id=None, statuses=None, since=None, until=None, batch_size=1000):
+        query = {}
+        if job_id is not None:
+            query['job_id'] = job_id
+        if statuses:
+            query['status'] = {'$in': list(statuses)}
+        if since or until:
+            query['created_on'] = {key: value for key, value in (('$gte', since), ('$lt', until)) if value}
+        cursor = self.db.candidates.find(query, {'job_description': 0}).sort('_id', 1).batch_size(batch_size)
+        titles = {}
+        batch = []
+        for doc in cursor:
+            batch.append(_from_document(doc))
+            if len(batch) == batch_size:
+                yield self._with_job_titles(batch, titles)
+                batch = []
+        if batch:
+            yield self._with_job_titles(batch, titles)
+
+    def _with_job_titles(self, batch, titles):
+        """Add job_title to a batch, looking up each requisition once per export."""
+        missing = {str(c['job_id']) for c in batch if c.get('job_id') is not None} - titles.keys()
+        if missing:
+            for job in self.db.job_requisitions.find({'_id': {'$in': [to_object_id(i) for i in missing]}}, {'title': 1}):
+                titles[str(job['_id'])] = job.get('title')
+        return [dict(c, job_title=titles.get(str(c.get('job_id')))) for c in batch]
+
+
+class MongoNotificationRepo(NotificationRepo):
+    def __init__(self, db):
+        self.db = db
+
+    def insert(self, notification):
+        doc = dict(notification, seen=False, sent_on=datetime.now())
+        doc.setdefault('status', 'pending')
+        return str(self.db.hr_notifications.insert_one(doc).inserted_id)
+
+    def insert_for_candidate(self, notification):
+        candidate = self.db.candidates.find_one({'_id': to_object_id(notification['candidate_id'])}, {'match_percent': 1})
+        if candidate is None:
+            return None
+        return self.insert(dict(notification, match_percent=candidate.get('match_percent') or 0))
+
+    def list_recent(self, limit=20):
+        docs = self.db.hr_notifications.find({'candidate_id': {'$ne': None}}).sort('sent_on', -1).limit(limit)
+        return [_from_document(d) for d in docs]
+
+    def mark_seen(self, notification_id):
+        self.db.hr_notifications.update_one({'_id': to_object_id(notification_id)}, {'$set': {'seen': True}})
+
+    def mark_seen_many(self, notification_ids):
+        ids = [to_object_id(i) for i in notification_ids]
+        return self.db.hr_notifications.update_many({'_id': {'$in': ids}, 'seen': False}, {'$set': {'seen': True}}).modified_count
+
+    def mark_seen_before(self, timestamp):
+        result = self.db.hr_notifications.update_many({'seen': False, 'sent_on': {'$lte': timestamp}}, {'$set': {'seen': True}})
+        return result.modified_count
+
+    def unseen_count(self):
+        return self.db.hr_notifications.count_documents({'seen': False, 'candidate_id': {'$ne': None}})
+
+    def version(self):
+        latest = self.db.hr_notifications.find_one({}, {'_id': 1}, sort=[('_id', -1)])
+        return f"{latest['_id'] if latest else 0}-{self.unseen_count()}"
+
+
+class MongoTestResultRepo(TestResultRepo):
+    def __init__(self, db):
+        self.db = db
+
+    def insert(self, result):
+        self.db.test_results.insert_one(dict(result, created_on=datetime.now()))
+
+    def latest_for_candidate(self, candidate_id):
+        doc = self.db.test_results.find_one({'candidate_id': str(candidate_id)}, sort=[('created_on', -1)])
+        return _from_document(doc)
+
+    def has_submission(self, submission_id):
+        return self.db.test_results.find_one({'submission_id': submission_id}, {'_id': 1}) is not None
+
+    def insert_second_round(self, result):
+        self.db.second_round_results.insert_one(dict(result, submitted_on=datetime.now()))
+
+    def get_second_round(self, candidate_id):
+        return _from_document(self.db.second_round_results.find_one({'candidate_id': candidate_id}))
+
+
+class MongoChallengeRepo(ChallengeRepo):
+    def __init__(self, db):
+        self.db = db
+
+    def insert(self, candidate_id, challenges, job_id=None):
+        self.db.second_round_challenges.insert_one({
+            'candidate_id': candidate_id,
+            'job_id': job_id,
+            'challenges': challenges,
+            'created_on': datetime.now(),
+            'status': 'pending'
+        })
+
+    def get_for_candidate(self, candidate_id):
+        doc = self.db.second_round_challenges.find_one({'candidate_id': candidate_id}, sort=[('created_on', -1)])
+        return doc.get('challenges') if doc else None
+
+
+class MongoJobRepo(JobRepo):
+    def __init__(self, db):
+        self.db = db
+
+    def get_or_create(self, description):
+        doc = self.db.job_requisitions.find_one_and_update(
+            {'description_hash': description_hash(description)},
+            {'$setOnInsert': {'title': description[:40], 'description': description, 'created_on': datetime.now()}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return str(doc['_id'])
+
+    def get(self, job_id):
+        return _from_document(self.db.job_requisitions.find_one({'_id': to_object_id(job_id)}))
+
+    def get_many(self, job_ids):
+        ids = [to_object_id(i) for i in job_ids]
+        return [_from_document(d) for d in self.db.job_requisitions.find({'_id': {'$in': ids}})]
+
+    def list_page(self, limit, before=None):
+        query = {} if before is None else {'_id': {'$lt': to_object_id(before)}}
+        cursor = self.db.job_requisitions.find(query, {'title': 1}).sort('_id', -1).limit(limit)
+        return [_from_document(d) for d in cursor]
+
+
+class MongoQuestionSetRepo(QuestionSetRepo):
+    def __init__(self, db):
+        self.db = db
+
+    def get(self, set_hash, variant):
+        return self.db.question_sets.find_one({'set_hash': set_hash, 'variant': variant},
+                                              {'_id': 0, 'questions': 1, 'created_on': 1})
+
+    def put(self, set_hash, variant, questions):
+        self.db.question_sets.update_one({'set_hash': set_hash, 'variant': variant},
+                                         {'$set': {'questions': questions, 'created_on': datetime.now()}}, upsert=True)
+
+
+class MongoChallengeBankRepo(ChallengeBankRepo):
+    def __init__(self, db):
+        self.db = db
+
+    def insert_many(self, records):
+        if not records:
+            return 0
+        now = datetime.now()
+        result = self.db.challenge_bank.bulk_write(
+            [UpdateOne({'item_hash': r['item_hash']}, {'$setOnInsert': dict(r, created_on=now)}, upsert=True)
+             for r in records], ordered=False)
+        return result.upserted_count
+
+    def sample(self, section, count, topic=None):
+        match = {'section': section}
+        if topic is not None:
+            match['topic'] = topic
+        return [doc['item'] for doc in self.db.challenge_bank.aggregate(
+            [{'$match': match}, {'$sample': {'size': count}}, {'$project': {'_id': 0, 'item': 1}}])]
+
+    def counts(self, sections, topic=None):
+        return {section: self.db.challenge_bank.count_documents({'section': section, **({'topic': topic} if topic else {})})
+                for section in sections}
+
+
+class MongoResumeRepo(ResumeRepo):
+    def __init__(self, db, chunk_size=1000):
+        self.db = db
+        self.chunk_size = chunk_size
+
+    def insert_many(self, resumes):
+        now = datetime.now()
+        saved = 0
+        for chunk in _chunks(resumes, self.chunk_size):
+            # Unordered batches let the server apply each chunk without per-document round trips.
+            result = self.db.resumes.insert_many([dict(r, uploaded_on=now) for r in chunk], ordered=False)
+            saved += len(result.inserted_ids)
+        return saved
+
+
+class MongoArchiveRepo(ArchiveRepo):
+    def __init__(self, db):
+        self.db = db
+
+    def archive_before(self, table, cutoff, limit):
+        date_column, candidate_column = ARCHIVE_TABLES[table]
+        docs = list(self.db[table].find({date_column: {'$lt': cutoff}}).sort(date_column, 1).limit(limit))
+        if not docs:
+            return 0
+        now = datetime.now()
+        self.db.archived_records.insert_many([{
+            'source_table': table,
+            'record_id': str(doc['_id']),
+            'candidate_id': str(doc[candidate_column]) if candidate_column and doc.get(candidate_column) is not None else None,
+            'payload': zlib.compress(bson_encode(doc)),
+            'archived_on': now
+        } for doc in docs])
+        # Archived before deleting: an interrupted run leaves a duplicate archive entry, never a lost record.
+        self.db[table].delete_many({'_id': {'$in': [doc['_id'] for doc in docs]}})
+        return len(docs)
+
+    def restore_candidate(self, candidate_id):
+        archived = list(self.db.archived_records.find({'candidate_id': str(candidate_id)}))
+        writes = {}
+        for entry in archived:
+            doc = bson_decode(zlib.decompress(entry['payload']))
+            # Replacing by _id keeps restores idempotent when an entry was archived twice.
+            writes.setdefault(entry['source_table'], {})[doc['_id']] = ReplaceOne({'_id': doc['_id']}, doc, upsert=True)
+        for table, operations in writes.items():
+            self.db[table].bulk_write(list(operations.values()), ordered=False)
+        self.db.archived_records.delete_many({'_id': {'$in': [entry['_id'] for entry in archived]}})
+        return {table: len(operations) for table, operations in writes.items()}
+
+
+class MongoAdminRepo(AdminRepo):
+    def __init__(self, db):
+        self.db = db
+
+    def count(self):
+        return self.db.admin_users.count_documents({})
+
+    def insert(self, username, password):
+        self.db.admin_users.insert_one({'username': username, 'password': password, 'created_on': datetime.now()})
+
+    def authenticate(self, username, password):
+        return self.db.admin_users.find_one({'username': username, 'password': password}) is not None
+
+
+# ---------- SQL Implementations (MySQL and SQLite) ----------
+class SqlRepo:
+    """Shared helpers for repositories backed by MySQL or SQLite."""
+
+    def __init__(self, conn, dialect='mysql', chunk_size=1000):
+        self.conn = conn
+        self.dialect = dialect
+        self.chunk_size = chunk_size
+
+    def _sql(self, sql):
+        return sql.replace('%s', '?') if self.dialect == 'sqlite' else sql
+
+    def _cursor(self):
+        return self.conn.cursor() if self.dialect == 'sqlite' else self.conn.cursor(buffered=True)
+
+    def _execute(self, sql, params=()):
+        cursor = self._cursor()
+        cursor.execute(self._sql(sql), tuple(params))
+        return cursor
+
+    def _fetchone(self, sql, params=()):
+        cursor = self._execute(sql, params)
+        row = cursor.fetchone()
+        columns = [c[0] for c in cursor.description] if cursor.description else []
+        cursor.close()
+        return dict(zip(columns, row)) if row else None
+
+    def _fetchall(self, sql, params=()):
+        cursor = self._execute(sql, params)
+        columns = [c[0] for c in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        cursor.close()
+        return rows
+
+    def _insert(self, table, record):
+        columns = ', '.join(record)
+        placeholders = ', '.join(['%s'] * len(record))
+        cursor = self._execute(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", record.values())
+        row_id = cursor.lastrowid
+        cursor.close()
+        return row_id
+
+    @contextmanager
+    def transaction(self):
+        """Run the enclosed statements in a single transaction."""
+        if self.dialect == 'sqlite':
+            self.conn.execute("BEGIN")
+        else:
+            self.conn.start_transaction()
+        try:
+            yield
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+    def _executemany(self, cursor, table, records):
+        """Insert records through cursor in chunked multi-row statements."""
+        columns = list(records[0])
+        sql = self._sql(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})")
+        for chunk in _chunks(records, self.chunk_size):
+            cursor.executemany(sql, [tuple(r[c] for c in columns) for r in chunk])
+
+    def _insert_many(self, table, records):
+        """Insert records in chunked multi-row statements inside one transaction and return their ids in order.
+
+        MySQL's interleaved auto-increment lock mode (the default in 8.0) gives a multi-row INSERT
+        increasing but not consecutive ids under concurrent inserts, so every row is tagged with a
+        batch key and the ids are read back with one indexed SELECT on it.
+        """
+        if not records:
+            return []
+        batch = uuid.uuid4().hex
+        with self.transaction():
+            cursor = self._cursor()
+            self._executemany(cursor, table, [dict(r, insert_batch=batch) for r in records])
+            cursor.execute(self._sql(f"SELECT id FROM {table} WHERE insert_batch = %s ORDER BY id"), (batch,))
+            ids = [row[0] for row in cursor.fetchall()]
+            cursor.close()
+        return ids
+
+    def _bulk_insert(self, table, records):
+        """Insert records in chunked multi-row statements inside one transaction; return the row count.
+
+        For callers that do not need the new ids.
+        """
+        if not records:
+            return 0
+        with self.transaction():
+            cursor = self._cursor()
+            self._executemany(cursor, table, records)
+            cursor.close()
+        return len(records)
+
+
+class SqlCandidateRepo(SqlRepo, CandidateRepo):
+    COLUMNS = "id, name, email, match_percent, test_score, status, created_on, filename, job_id, COALESCE(second_round_score, 0) AS second_round_score"
+    EXPORT_COLUMNS = ("c.id, c.name, c.email, c.match_percent, c.test_score, c.status, c.created_on, c.filename, c.job_id, "
+                      "COALESCE(c.second_round_score, 0) AS second_round_score, j.title AS job_title")
+
+    def insert(self, candidate):
+        return self._insert('candidates', candidate)
+
+    def insert_many(self, candidates):
+        return self._insert_many('candidates', candidates)
+
+    def get(self, candidate_id):
+        return self._fetchone(f"SELECT {self.COLUMNS} FROM candidates WHERE id = %s", (candidate_id,))
+
+    def get_many(self, candidate_ids):
+        if not candidate_ids:
+            return []
+        placeholders = ', '.join(['%s'] * len(candidate_ids))
+        return self._fetchall(f"SELECT {self.COLUMNS} FROM candidates WHERE id IN ({placeholders})", candidate_ids)
+
+    def find_by_name(self, name):
+        return self._fetchone(f"SELECT {self.COLUMNS} FROM candidates WHERE name = %s LIMIT 1", (name,))
+
+    def update(self, candidate_id, fields):
+        assignments = ', '.join(f"{column} = %s" for column in fields)
+        self._execute(f"UPDATE candidates SET {assignments} WHERE id = %s", (*fields.values(), candidate_id)).close()
+
+    @staticmethod
+    def _group_filter(statuses, job_id):
+        """Return the WHERE clause and params selecting one dashboard group."""
+        known = [s for s in statuses if s is not None]
+        status_clauses = [f"status IN ({', '.join(['%s'] * len(known))})"] if known else []
+        if None in statuses:
+            status_clauses.append("status IS NULL")
+        job_clause = "job_id IS NULL" if job_id is None else "job_id = %s"
+        clause = f"({' OR '.join(status_clauses) or '1 = 0'}) AND {job_clause}"
+        return clause, known + ([] if job_id is None else [job_id])
+
+    def group_counts(self, job_ids):
+        known = [i for i in job_ids if i is not None]
+        clauses = [f"job_id IN ({', '.join(['%s'] * len(known))})"] if known else []
+        if None in job_ids:
+            clauses.append("job_id IS NULL")
+        if not clauses:
+            return []
+        # Reads only the given requisitions' range of the dashboard index.
+        return self._fetchall(f"SELECT status, job_id, COUNT(*) AS total FROM candidates "
+                              f"WHERE {' OR '.join(clauses)} GROUP BY job_id, status", known)
+
+    def top_per_group(self, groups, limit):
+        if not groups:
+            return []
+        # One round trip: each branch reads the top of its group straight off the dashboard index.
+        selects = []
+        params = []
+        for i, (status, job_id) in enumerate(groups):
+            clause, clause_params = self._group_filter([status], job_id)
+            selects.append(f"SELECT * FROM (SELECT {self.COLUMNS} FROM candidates WHERE {clause} "
+                           f"ORDER BY test_score DESC, id DESC LIMIT %s) AS group_{i}")
+            params.extend(clause_params + [limit])
+        return self._fetchall(" UNION ALL ".join(selects), params)
+
+    def list_group(self, statuses, job_id, limit, after=None):
+        clause, params = self._group_filter(statuses, job_id)
+        if after is not None:
+            score, last_id = after
+            clause += " AND (test_score < %s OR (test_score = %s AND id < %s))"
+            params += [score, score, last_id]
+        return self._fetchall(f"SELECT {self.COLUMNS} FROM candidates WHERE {clause} "
+                              f"ORDER BY test_score DESC, id DESC LIMIT %s", params + [limit])
+
+    def export_batches(self, job_id=None, statuses=None, since=None, until=None, batch_size=1000):
+        clauses = []
+        params = []
+        if job_id is not None:
+            clauses.append("c.job_id = %s")
+            params.append(job_id)
+        if statuses:
+            clauses.append(f"c.status IN ({', '.join(['%s'] * len(statuses))})")
+            params.extend(statuses)
+        if since:
+            clauses.append("c.created_on >= %s")
+            params.append(since)
+        if until:
+            clauses.append("c.created_on < %s")
+            params.append(until)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        # Unbuffered on MySQL, so rows arrive from the server as they are fetched instead of all at once.
+        cursor = self.conn.cursor() if self.dialect == 'sqlite' else self.conn.cursor(buffered=False)
+        try:
+            # Titles are joined in: the cursor holds the connection until drained, so no other query may run meanwhile.
+            cursor.execute(self._sql(f"SELECT {self.EXPORT_COLUMNS} FROM candidates c "
+                                     f"LEFT JOIN job_requisitions j ON j.id = c.job_id{where} ORDER BY c.id"), tuple(params))
+            columns = [c[0] for c in cursor.description]
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [dict(zip(columns, row)) for row in rows]
+        finally:
+            try:
+                cursor.close()
+            except Exception as e:
+                # An abandoned download leaves unread rows; the request's connection is closed at teardown.
+                print(f"⚠️ Export cursor not drained: {e}")
+
+
+class SqlNotificationRepo(SqlRepo, NotificationRepo):
+    def insert(self, notification):
+        return self._insert('hr_notifications', notification)
+
+    def insert_for_candidate(self, notification):
+        # INSERT ... SELECT copies match_percent by primary key and inserts nothing for an unknown candidate.
+        columns = ', '.join(notification)
+        placeholders = ', '.join(['%s'] * len(notification))
+        cursor = self._execute(f"INSERT INTO hr_notifications ({columns}, match_percent) "
+                               f"SELECT {placeholders}, COALESCE(match_percent, 0) FROM candidates WHERE id = %s",
+                               (*notification.values(), notification['candidate_id']))
+        row_id = cursor.lastrowid if cursor.rowcount else None
+        cursor.close()
+        return row_id
+
+    def list_recent(self, limit=20):
+        return self._fetchall(
+            "SELECT id, candidate_name, test_score, COALESCE(combined_score, 0) AS combined_score, sent_on, candidate_id, COALESCE(seen, 0) AS seen "
+            "FROM hr_notifications WHERE candidate_id IS NOT NULL ORDER BY sent_on DESC LIMIT %s", (int(limit),))
+
+    def mark_seen(self, notification_id):
+        self._execute("UPDATE hr_notifications SET seen = TRUE WHERE id = %s", (notification_id,)).close()
+
+    def _update_count(self, sql, params):
+        cursor = self._execute(sql, params)
+        count = cursor.rowcount
+        cursor.close()
+        return count
+
+    def mark_seen_many(self, notification_ids):
+        if not notification_ids:
+            return 0
+        placeholders = ', '.join(['%s'] * len(notification_ids))
+        return self._update_count(f"UPDATE hr_notifications SET seen = TRUE WHERE id IN ({placeholders}) AND seen = FALSE",
+                                  notification_ids)
+
+    def mark_seen_before(self, timestamp):
+        return self._update_count("UPDATE hr_notifications SET seen = TRUE WHERE seen = FALSE AND sent_on <= %s", (timestamp,))
+
+    def unseen_count(self):
+        # Counted from the (seen, sent_on, candidate_id) index alone.
+        row = self._fetchone("SELECT COUNT(*) AS total FROM hr_notifications WHERE seen = FALSE AND candidate_id IS NOT NULL")
+        return row['total']
+
+    def version(self):
+        # The newest id changes on insert and the unseen count on mark-seen; both come from indexes.
+        row = self._fetchone("SELECT (SELECT MAX(id) FROM hr_notifications) AS latest, "
+                             "(SELECT COUNT(*) FROM hr_notifications WHERE seen = FALSE AND candidate_id IS NOT NULL) AS unseen")
+        return f"{row['latest'] or 0}-{row['unseen']}"
+
+
+class SqlTestResultRepo(SqlRepo, TestResultRepo):
+    def insert(self, result):
+        self._insert('test_results', result)
+
+    def latest_for_candidate(self, candidate_id):
+        return self._fetchone(
+            "SELECT score, total_questions, created_on FROM test_results WHERE candidate_id = %s ORDER BY created_on DESC LIMIT 1",
+            (str(candidate_id),))
+
+    def has_submission(self, submission_id):
+        return self._fetchone("SELECT id FROM test_results WHERE submission_id = %s", (submission_id,)) is not None
+
+    def insert_second_round(self, result):
+        self._insert('second_round_results', dict(result, answers=json.dumps(result.get('answers', {}))))
+
+    def get_second_round(self, candidate_id):
+        return self._fetchone(
+            "SELECT reasoning_score, aptitude_score, coding_score, total_score, percentage FROM second_round_results WHERE candidate_id = %s LIMIT 1",
+            (candidate_id,))
+
+
+class SqlChallengeRepo(SqlRepo, ChallengeRepo):
+    def insert(self, candidate_id, challenges, job_id=None):
+        self._insert('second_round_challenges', {'candidate_id': candidate_id, 'job_id': job_id, 'challenges': json.dumps(challenges)})
+
+    def get_for_candidate(self, candidate_id):
+        row = self._fetchone(
+            "SELECT challenges FROM second_round_challenges WHERE candidate_id = %s ORDER BY id DESC LIMIT 1", (candidate_id,))
+        return json.loads(row['challenges']) if row else None
+
+
+class SqlJobRepo(SqlRepo, JobRepo):
+    COLUMNS = "id, title, description, created_on"
+
+    def get_or_create(self, description):
+        digest = description_hash(description)
+        row = self._fetchone("SELECT id FROM job_requisitions WHERE description_hash = %s", (digest,))
+        if row is None:
+            # Concurrent uploads of the same description race on the unique hash; the loser reuses the winner's row.
+            ignore = "INSERT OR IGNORE" if self.dialect == 'sqlite' else "INSERT IGNORE"
+            self._execute(f"{ignore} INTO job_requisitions (title, description, description_hash) VALUES (%s, %s, %s)",
+                          (description[:40], description, digest)).close()
+            row = self._fetchone("SELECT id FROM job_requisitions WHERE description_hash = %s", (digest,))
+        return row['id'] if row else None
+
+    def get(self, job_id):
+        return self._fetchone(f"SELECT {self.COLUMNS} FROM job_requisitions WHERE id = %s", (job_id,))
+
+    def get_many(self, job_ids):
+        if not job_ids:
+            return []
+        placeholders = ', '.join(['%s'] * len(job_ids))
+        return self._fetchall(f"SELECT {self.COLUMNS} FROM job_requisitions WHERE id IN ({placeholders})", job_ids)
+
+    def list_page(self, limit, before=None):
+        if before is None:
+            return self._fetchall("SELECT id, title FROM job_requisitions ORDER BY id DESC LIMIT %s", (limit,))
+        return self._fetchall("SELECT id, title FROM job_requisitions WHERE id < %s ORDER BY id DESC LIMIT %s",
+                              (before, limit))
+
+
+class SqlQuestionSetRepo(SqlRepo, QuestionSetRepo):
+    def get(self, set_hash, variant):
+        row = self._fetchone("SELECT questions, created_on FROM question_sets WHERE set_hash = %s AND variant = %s",
+                             (set_hash, variant))
+        return dict(row, questions=json.loads(row['questions'])) if row else None
+
+    def put(self, set_hash, variant, questions):
+        if self.dialect == 'sqlite':
+            upsert = "ON CONFLICT (set_hash, variant) DO UPDATE SET questions = excluded.questions, created_on = excluded.created_on"
+        else:
+            upsert = "ON DUPLICATE KEY UPDATE questions = VALUES(questions), created_on = VALUES(created_on)"
+        self._execute(f"INSERT INTO question_sets (set_hash, variant, questions, created_on) VALUES (%s, %s, %s, %s) {upsert}",
+                      (set_hash, variant, json.dumps(questions), datetime.now())).close()
+
+
+class SqlChallengeBankRepo(SqlRepo, ChallengeBankRepo):
+    def insert_many(self, records):
+        if not records:
+            return 0
+        ignore = "INSERT OR IGNORE" if self.dialect == 'sqlite' else "INSERT IGNORE"
+        sql = self._sql(f"{ignore} INTO challenge_bank (item_hash, section, topic, difficulty, item) VALUES (%s, %s, %s, %s, %s)")
+        added = 0
+        with self.transaction():
+            cursor = self._cursor()
+            for r in records:
+                cursor.execute(sql, (r['item_hash'], r['section'], r['topic'], r['difficulty'], json.dumps(r['item'])))
+                added += cursor.rowcount
+            cursor.close()
+        return added
+
+    def sample(self, section, count, topic=None):
+        # Ids come from the (section, topic) index alone; only the sampled rows are read.
+        if topic is None:
+            rows = self._fetchall("SELECT id FROM challenge_bank WHERE section = %s", (section,))
+        else:
+            rows = self._fetchall("SELECT id FROM challenge_bank WHERE section = %s AND topic = %s", (section, topic))
+        ids = random.sample([row['id'] for row in rows], min(count, len(rows)))
+        if not ids:
+            return []
+        placeholders = ', '.join(['%s'] * len(ids))
+        items = self._fetchall(f"SELECT item FROM challenge_bank WHERE id IN ({placeholders})", ids)
+        random.shuffle(items)
+        return [json.loads(row['item']) for row in items]
+
+    def counts(self, sections, topic=None):
+        if topic:
+            return {section: self._fetchone("SELECT COUNT(*) AS n FROM challenge_bank WHERE section = %s AND topic = %s",
+                                            (section, topic))['n'] for section in sections}
+        return {section: self._fetchone("SELECT COUNT(*) AS n FROM challenge_bank WHERE section = %s", (section,))['n']
+                for section in sections}
+
+
+class SqlResumeRepo(SqlRepo, ResumeRepo):
+    def insert_many(self, resumes):
+        return self._bulk_insert('resumes', resumes)
+
+
+class SqlArchiveRepo(SqlRepo, ArchiveRepo):
+    def archive_before(self, table, cutoff, limit):
+        date_column, candidate_column = ARCHIVE_TABLES[table]
+        rows = self._fetchall(f"SELECT * FROM {table} WHERE {date_column} < %s ORDER BY {date_column} LIMIT %s",
+                              (cutoff, int(limit)))
+        if not rows:
+            return 0
+        archived = [(table, str(row['id']),
+                     str(row[candidate_column]) if candidate_column and row.get(candidate_column) is not None else None,
+                     zlib.compress(json.dumps(row, default=str).encode('utf-8')))
+                    for row in rows]
+        ids = [row['id'] for row in rows]
+        # Copy and delete in one short transaction per batch, so locks are held only briefly.
+        with self.transaction():
+            cursor = self._cursor()
+            cursor.executemany(self._sql("INSERT INTO archived_records (source_table, record_id, candidate_id, payload) "
+                                         "VALUES (%s, %s, %s, %s)"), archived)
+            cursor.execute(self._sql(f"DELETE FROM {table} WHERE id IN ({', '.join(['%s'] * len(ids))})"), ids)
+            cursor.close()
+        return len(rows)
+
+    def restore_candidate(self, candidate_id):
+        rows = self._fetchall("SELECT id, source_table, payload FROM archived_records WHERE candidate_id = %s ORDER BY id",
+                              (str(candidate_id),))
+        if not rows:
+            return {}
+        restored = {}
+        with self.transaction():
+            cursor = self._cursor()
+            for row in rows:
+                table = row['source_table']
+                if table not in ARCHIVE_TABLES:
+                    raise ValueError(f"Unknown archived table: {table}")
+                record = json.loads(zlib.decompress(row['payload']))
+                columns = ', '.join(record)
+                placeholders = ', '.join(['%s'] * len(record))
+                cursor.execute(self._sql(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})"), tuple(record.values()))
+                restored[table] = restored.get(table, 0) + 1
+            cursor.execute(self._sql(f"DELETE FROM archived_records WHERE id IN ({', '.join(['%s'] * len(rows))})"),
+                           [row['id'] for row in rows])
+            cursor.close()
+        return restored
+
+
+class SqlAdminRepo(SqlRepo, AdminRepo):
+    def count(self):
+        return self._fetchone("SELECT COUNT(*) AS total FROM admin_users")['total']
+
+    def insert(self, username, password):
+        self._insert('admin_users', {'username': username, 'password': password})
+
+    def authenticate(self, username, password):
+        return self._fetchone("SELECT username FROM admin_users WHERE username = %s AND password = %s",
+                              (username, password)) is not None
+
+
+# ---------- Read-Through Caching ----------
+class CachedCandidateRepo(CandidateRepo):
+    """Candidate repository that serves id lookups from a cache.
+
+    Every write goes through this wrapper, so status and score updates
+    invalidate the cached record before returning. Fills are conditional on
+    the record's cache generation, so a read that raced a write cannot put
+    the old record back after the invalidation.
+    """
+
+    def __init__(self, inner, cache):
+        self.inner = inner
+        self.cache = cache
+
+    @staticmethod
+    def _key(candidate_id):
+        return f"candidate:{candidate_id}"
+
+    def insert(self, candidate):
+        return self.inner.insert(candidate)
+
+    def insert_many(self, candidates):
+        return self.inner.insert_many(candidates)
+
+    def get(self, candidate_id):
+        record = self.cache.get_or_load(self._key(candidate_id), lambda: self.inner.get(candidate_id))
+        return dict(record) if record else None
+
+    def get_many(self, candidate_ids):
+        records = {}
+        missing = []
+        for candidate_id in candidate_ids:
+            record = self.cache.get(self._key(candidate_id))
+            if record is None:
+                missing.append(candidate_id)
+            else:
+                records[str(candidate_id)] = dict(record)
+        generations = {str(i): self.cache.generation(self._key(i)) for i in missing}
+        for record in self.inner.get_many(missing) if missing else []:
+            self.cache.set(self._key(record['id']), record, generations[str(record['id'])])
+            records[str(record['id'])] = dict(record)
+        return [records[str(i)] for i in candidate_ids if str(i) in records]
+
+    def find_by_name(self, name):
+        return self.inner.find_by_name(name)
+
+    def update(self, candidate_id, fields):
+        self.cache.invalidate(self._key(candidate_id))
+        self.inner.update(candidate_id, fields)
+        self.cache.invalidate(self._key(candidate_id))
+
+    def group_counts(self, job_ids):
+        return self.inner.group_counts(job_ids)
+
+    def top_per_group(self, groups, limit):
+        return self.inner.top_per_group(groups, limit)
+
+    def list_group(self, statuses, job_id, limit, after=None):
+        return self.inner.list_group(statuses, job_id, limit, after)
+
+    def export_batches(self, job_id=None, statuses=None, since=None, until=None, batch_size=1000):
+        return self.inner.export_batches(job_id, statuses, since, until, batch_size)
+
+
+class CachedChallengeRepo(ChallengeRepo):
+    """Challenge repository that serves per-candidate lookups from a cache."""
+
+    def __init__(self, inner, cache):
+        self.inner = inner
+        self.cache = cache
+
+    @staticmethod
+    def _key(candidate_id):
+        return f"challenges:{candidate_id}"
+
+    def insert(self, candidate_id, challenges, job_id=None):
+        self.inner.insert(candidate_id, challenges, job_id)
+        self.cache.invalidate(self._key(candidate_id))
+
+    def get_for_candidate(self, candidate_id):
+        return self.cache.get_or_load(self._key(candidate_id), lambda: self.inner.get_for_candidate(candidate_id))
+
+
+# ---------- Repository Bundle ----------
+class Repositories:
+    """All repositories for one backend, sharing a single connection."""
+
+    def __init__(self, backend, conn, chunk_size=1000, candidate_cache=None, challenge_cache=None):
+        self.backend = backend.lower()
+        self.conn = conn
+        if self.backend == 'mongodb':
+            self.candidates = MongoCandidateRepo(conn, chunk_size)
+            self.notifications = MongoNotificationRepo(conn)
+            self.test_results = MongoTestResultRepo(conn)
+            self.challenges = MongoChallengeRepo(conn)
+            self.jobs = MongoJobRepo(conn)
+            self.resumes = MongoResumeRepo(conn, chunk_size)
+            self.question_sets = MongoQuestionSetRepo(conn)
+            self.challenge_bank = MongoChallengeBankRepo(conn)
+            self.archive = MongoArchiveRepo(conn)
+            self.admins = MongoAdminRepo(conn)
+        else:
+            dialect = 'sqlite' if self.backend == 'sqlite' else 'mysql'
+            self.candidates = SqlCandidateRepo(conn, dialect, chunk_size)
+            self.notifications = SqlNotificationRepo(conn, dialect)
+            self.test_results = SqlTestResultRepo(conn, dialect)
+            self.challenges = SqlChallengeRepo(conn, dialect)
+            self.jobs = SqlJobRepo(conn, dialect)
+            self.resumes = SqlResumeRepo(conn, dialect, chunk_size)
+            self.question_sets = SqlQuestionSetRepo(conn, dialect)
+            self.challenge_bank = SqlChallengeBankRepo(conn, dialect)
+            self.archive = SqlArchiveRepo(conn, dialect)
+            self.admins = SqlAdminRepo(conn, dialect)
+        if candidate_cache is not None:
+            self.candidates = CachedCandidateRepo(self.candidates, candidate_cache)
+        if challenge_cache is not None:
+            self.challenges = CachedChallengeRepo(self.challenges, challenge_cache)
+
+    def close(self):
+        """Release the underlying connection."""
+        # MongoDB clients pool their own connections; SQLite connections are kept for reuse by their thread.
+        if self.backend not in ('mongodb', 'sqlite'):
+            self.conn.close()
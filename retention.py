@@ -0,0 +1,77 @@
+"""Archive or expire notifications, results and resumes past their retention period.
+
+Run it from cron, e.g. nightly:
+
+    python retention.py
+
+Old rows are moved in small batches into archived_records as compressed
+payloads, so the live tables stay small and each batch holds locks briefly.
+MySQL, SQLite and MongoDB all archive the same way.
+A candidate's archived history is restored with POST /restore-archive/<candidate_id>.
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+from repository import ARCHIVE_TABLES
+
+# table -> (setting, default days); 0 keeps rows forever.
+RETENTION_SETTINGS = {
+    'hr_notifications': ('NOTIFICATION_RETENTION_DAYS', 90),
+    'test_results': ('RESULT_RETENTION_DAYS', 365),
+    'second_round_results': ('RESULT_RETENTION_DAYS', 365),
+    'resumes': ('RESUME_RETENTION_DAYS', 180)
+}
+
+def retention_days():
+    """Return the configured retention period per table, in days."""
+    return {table: int(os.getenv(setting, default)) for table, (setting, default) in RETENTION_SETTINGS.items()}
+
+
+def remove_mongo_ttl(db, table, column):
+    """Turn a TTL index on column back into a plain one, so documents are archived rather than deleted.
+
+    Earlier builds expired MongoDB notifications through a TTL index, which left nothing to restore.
+    """
+    name = f"{column}_1"
+    index = db[table].index_information().get(name)
+    if index and 'expireAfterSeconds' in index:
+        db[table].drop_index(name)
+        db[table].create_index(column)
+
+
+def apply_retention(repos, days_by_table, batch_size=500, now=None):
+    """Archive every table's rows older than its retention period and return the number archived per table."""
+    now = now or datetime.now()
+    results = {}
+    for table, days in days_by_table.items():
+        if repos.backend == 'mongodb':
+            remove_mongo_ttl(repos.conn, table, ARCHIVE_TABLES[table][0])
+        if days <= 0:
+            continue
+        cutoff = now - timedelta(days=days)
+        moved = 0
+        while True:
+            batch = repos.archive.archive_before(table, cutoff, batch_size)
+            moved += batch
+            if batch < batch_size:
+                break
+        results[table] = moved
+    return results
+
+
+if __name__ == "__main__":
+    from config import get_config
+    from migrations import connect
+    from repository import Repositories
+
+    config = get_config()
+    try:
+        repos = Repositories(config.DB_TYPE, connect(config))
+        results = apply_retention(repos, retention_days(), int(os.getenv('ARCHIVE_BATCH_SIZE', 500)))
+        for table, outcome in results.items():
+            print(f"✓ {table}: {outcome} rows archived")
+        repos.close()
+    except Exception as e:
+        print(f"❌ Retention failed: {e}")
+        sys.exit(1)
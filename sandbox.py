@@ -0,0 +1,153 @@
+import ast
+import json
+import secrets
+import signal
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows: runs are limited by the wall-clock timeout only
+    resource = None
+
+# Runs inside the sandbox: calls the candidate's function with the test input (or feeds it
+# to stdin for scripts) and reports what it returned or printed after a per-run marker line.
+# It never sees the expected output; the parent parses the report and judges it.
+HARNESS = r"""
+import ast, contextlib, io, json, sys
+
+# Makes casual network and subprocess use fail loudly. Code in this interpreter can undo it;
+# the limits and namespaces applied by LAUNCHER are what contain a run.
+BLOCKED = ['socket', '_socket', 'ssl', '_ssl', 'ctypes', '_ctypes', 'subprocess', '_posixsubprocess',
+           'multiprocessing', 'asyncio', 'urllib', 'http', 'ftplib', 'smtplib', 'pty']
+for name in BLOCKED:
+    sys.modules[name] = None
+import os
+for name in ('system', 'popen', 'fork', 'forkpty', 'execv', 'execve', 'execvp', 'spawnv', 'spawnve', 'kill'):
+    if hasattr(os, name):
+        delattr(os, name)
+
+def run():
+    case = json.loads(sys.stdin.readline())
+    out = sys.stdout
+    marker = case['marker']
+    sys.stdin = io.StringIO(case['input'])
+    namespace = {'__name__': '__candidate__'}
+    printed = io.StringIO()
+    report = {}
+    with contextlib.redirect_stdout(printed):
+        exec(compile(case['code'], '<candidate>', 'exec'), namespace)
+        functions = [v for v in namespace.values() if callable(v) and getattr(v, '__module__', None) == '__candidate__']
+        if functions:
+            # The last function defined is the solution; tuple inputs are passed as separate arguments.
+            try:
+                argument = ast.literal_eval(case['input'])
+            except Exception:
+                argument = case['input']
+            actual = functions[-1](*argument) if isinstance(argument, tuple) else functions[-1](argument)
+            if actual is not None:
+                report['value'] = repr(actual)[:10000]
+    if 'value' not in report:
+        report['printed'] = printed.getvalue()[:10000]
+    out.write('\n' + marker + json.dumps(report) + '\n')
+    out.flush()
+
+run()
+"""
+
+# Applies the resource limits, then replaces itself with the harness interpreter. Limits set
+# here survive exec, so the app never forks with preexec_fn from its worker threads.
+LAUNCHER = r"""
+import os, resource, sys
+cpu_seconds, memory = int(sys.argv[1]), int(sys.argv[2]) * 1024 * 1024
+for limit, value in ((resource.RLIMIT_CPU, cpu_seconds), (resource.RLIMIT_AS, memory),
+                     (resource.RLIMIT_FSIZE, 1024 * 1024), (resource.RLIMIT_NOFILE, 64), (resource.RLIMIT_CORE, 0)):
+    resource.setrlimit(limit, (value, value))
+if hasattr(os, 'unshare'):
+    try:
+        os.unshare(os.CLONE_NEWUSER | os.CLONE_NEWNET)
+    except OSError:
+        pass  # Unprivileged namespaces disabled; the limits still apply.
+os.execv(sys.executable, [sys.executable, '-I', '-S', '-c', sys.argv[3]])
+"""
+
+
+def parse_literal(text):
+    try:
+        return ast.literal_eval(text)
+    except Exception:
+        return text
+
+
+def output_matches(report, expected):
+    """Judge a harness report against the expected output, as plain values parsed in this process."""
+    wanted = parse_literal(expected)
+    if 'value' in report:
+        actual = parse_literal(str(report['value']))
+    else:
+        actual = str(report.get('printed', '')).strip()
+    if isinstance(actual, str) and not isinstance(wanted, str):
+        actual = parse_literal(actual.strip())
+    return actual == wanted or str(actual).strip() == expected.strip()
+
+
+class SandboxRunner:
+    """Worker pool that grades code against test cases in parallel, one subprocess per test case.
+
+    Each run gets a fresh interpreter in an empty temp directory with no environment and CPU,
+    memory and file limits and, where the kernel allows, an empty network namespace. The code
+    only reports its output; passing is decided here. Run the app in a container if it must
+    withstand hostile code.
+    """
+
+    def __init__(self, workers=4, cpu_seconds=2, memory_mb=256, timeout=5):
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.timeout = timeout
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sandbox')
+
+    def command(self):
+        if resource is None:
+            return [sys.executable, '-I', '-S', '-c', HARNESS]
+        return [sys.executable, '-I', '-S', '-c', LAUNCHER, str(self.cpu_seconds), str(self.memory_mb), HARNESS]
+
+    def run(self, code, test_input, expected):
+        """Run code on one test case and return {'passed', 'output'} or {'passed': False, 'error'}."""
+        marker = secrets.token_hex(16)
+        case = json.dumps({'code': code, 'input': str(test_input), 'marker': marker})
+        with tempfile.TemporaryDirectory() as workdir:
+            try:
+                process = subprocess.run(self.command(), input=case + '\n', capture_output=True, text=True,
+                                         cwd=workdir, env={}, timeout=self.timeout, start_new_session=True)
+            except subprocess.TimeoutExpired:
+                return {'passed': False, 'error': 'time limit exceeded'}
+        if process.returncode in (-signal.SIGKILL, -getattr(signal, 'SIGXCPU', signal.SIGTERM)):
+            return {'passed': False, 'error': 'time or memory limit exceeded'}
+        if process.returncode != 0:
+            error = process.stderr.strip().splitlines()
+            return {'passed': False, 'error': error[-1][:200] if error else f'exit code {process.returncode}'}
+        reports = [line[len(marker):] for line in process.stdout.splitlines() if line.startswith(marker)]
+        try:
+            report = json.loads(reports[-1])
+        except (IndexError, ValueError):
+            return {'passed': False, 'error': 'no result'}
+        if not isinstance(report, dict):
+            return {'passed': False, 'error': 'no result'}
+        return {'passed': output_matches(report, str(expected)),
+                'output': str(report.get('value', report.get('printed', '')))[:200]}
+
+    def grade_many(self, submissions):
+        """Grade several (code, cases) pairs concurrently and return the fraction of cases each passes.
+
+        Submissions without cases score None.
+        """
+        # Every test case is its own job, so one slow submission does not hold up the others.
+        futures = [[self.pool.submit(self.run, code, test_input, expected) for test_input, expected in cases]
+                   for code, cases in submissions]
+        return [sum(1 for f in runs if f.result().get('passed')) / len(runs) if runs else None for runs in futures]
+
+    def grade(self, code, cases):
+        """Return the fraction of (input, expected) cases the code passes."""
+        return self.grade_many([(code, cases)])[0]
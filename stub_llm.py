@@ -0,0 +1,87 @@
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+
+from llm import LLMProvider
+
+STUB_CODING_TASKS = [
+    {"question": "Write a function to find the maximum number in a list", "sample_input": "[3, 7, 2, 9, 1]", "expected_output": "9"},
+    {"question": "Write a function to reverse a string", "sample_input": "'hello'", "expected_output": "'olleh'"},
+    {"question": "Write a function to check if a string is a palindrome", "sample_input": "'racecar'", "expected_output": "True"},
+    {"question": "Write a function to sum the even numbers in a list", "sample_input": "[1, 2, 3, 4, 6]", "expected_output": "12"},
+    {"question": "Write a function to count the vowels in a string", "sample_input": "'interview'", "expected_output": "4"},
+    {"question": "Write a function to remove duplicates from a list, keeping order", "sample_input": "[1, 2, 2, 3, 1]", "expected_output": "[1, 2, 3]"}
+]
+
+
+class StubProvider(LLMProvider):
+    """Offline stand-in for Gemini for load and regression tests.
+
+    Recognises the app's prompts and answers with schema-valid JSON that depends only on
+    the prompt, after a latency drawn from a log-normal distribution (median latency_ms,
+    spread sigma; sigma 0 gives a fixed delay). A seeded generator decides latencies and
+    which calls fail, so a run with the same seed and request order is reproducible.
+    """
+
+    name = 'stub'
+
+    def __init__(self, latency_ms=800, sigma=0.5, failure_rate=0.0, seed=0):
+        self.latency_ms = latency_ms
+        self.sigma = sigma
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def _draw(self):
+        with self.lock:
+            latency = self.latency_ms / 1000 * self.rng.lognormvariate(0, self.sigma) if self.sigma else self.latency_ms / 1000
+            return latency, self.rng.random() < self.failure_rate
+
+    def generate(self, prompt, timeout):
+        latency, failed = self._draw()
+        if latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"stub LLM took longer than {timeout:.1f}s")
+        time.sleep(latency)
+        if failed:
+            raise RuntimeError('stub LLM injected failure')
+        return json.dumps(self.respond(prompt))
+
+    def stream(self, prompt, timeout, chunks=8):
+        """Yield the response in chunks spread evenly over the drawn latency; a failure happens mid-stream."""
+        latency, failed = self._draw()
+        text = json.dumps(self.respond(prompt))
+        size = -(-len(text) // chunks)
+        for i in range(chunks):
+            if latency * (i + 1) / chunks > timeout:
+                raise TimeoutError(f"stub LLM took longer than {timeout:.1f}s")
+            time.sleep(latency / chunks)
+            if failed and i == chunks // 2:
+                raise RuntimeError('stub LLM injected failure')
+            yield text[i * size:(i + 1) * size]
+
+    def respond(self, prompt):
+        """Return the JSON document the app expects for prompt."""
+        rng = random.Random(hashlib.sha256(prompt.encode('utf-8')).hexdigest())
+        graded = re.search(r'Evaluate these (\d+) coding solutions', prompt)
+        if graded:
+            return [round(rng.uniform(0.3, 1.0), 2) for _ in range(int(graded.group(1)))]
+        if '"reasoning"' in prompt and '"coding"' in prompt:
+            return {
+                'reasoning': [self._choice_question(rng, 'Reasoning', i, ['A', 'B', 'C', 'D']) for i in range(3)],
+                'aptitude': [self._choice_question(rng, 'Aptitude', i, [str(10 * n) for n in range(1, 5)]) for i in range(3)],
+                'coding': [dict(task, difficulty=difficulty)
+                           for task, difficulty in zip(rng.sample(STUB_CODING_TASKS, 2), ['easy', 'medium'])]
+            }
+        count = re.search(r'Generate exactly (\d+)', prompt)
+        points = re.search(r'"points": (\d+)', prompt)
+        return [dict(self._choice_question(rng, 'Technical', i, ['Option A', 'Option B', 'Option C', 'Option D']),
+                     points=int(points.group(1)) if points else 1)
+                for i in range(int(count.group(1)) if count else 10)]
+
+    def _choice_question(self, rng, kind, index, options):
+        return {'question': f"{kind} question {index + 1} (stub {rng.randrange(10 ** 6):06d})",
+                'options': options, 'correct_answer': rng.choice(options)}
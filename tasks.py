@@ -0,0 +1,57 @@
+import queue
+import threading
+
+
+class TaskQueue:
+    """Pool of daemon threads running background jobs, each inside a fresh context (e.g. app.app_context)."""
+
+    def __init__(self, workers=2, context=None, name='background-task'):
+        self.queue = queue.Queue()
+        self.context = context
+        self.pending = set()
+        self.lock = threading.Lock()
+        self.completed = 0
+        self.failed = 0
+        self.workers = workers
+        for i in range(workers):
+            threading.Thread(target=self._run, name=f"{name}-{i}", daemon=True).start()
+
+    def submit(self, key, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs) unless a job with the same key is still waiting or running.
+
+        Returns True if the job was queued.
+        """
+        with self.lock:
+            if key in self.pending:
+                return False
+            self.pending.add(key)
+        self.queue.put((key, fn, args, kwargs))
+        return True
+
+    def _run(self):
+        while True:
+            key, fn, args, kwargs = self.queue.get()
+            try:
+                if self.context is not None:
+                    with self.context():
+                        fn(*args, **kwargs)
+                else:
+                    fn(*args, **kwargs)
+                self.completed += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"❌ Background task {key} failed: {e}")
+            finally:
+                with self.lock:
+                    self.pending.discard(key)
+                self.queue.task_done()
+
+    def stats(self):
+        """Return queue depth and job counters."""
+        return {
+            'workers': self.workers,
+            'queued': self.queue.qsize(),
+            'pending': len(self.pending),
+            'completed': self.completed,
+            'failed': self.failed
+        }
@@ -268,7 +268,10 @@
           if (!data.notifications || data.notifications.length === 0) {
             dropdown.innerHTML = '<div class="notification-item" style="text-align: center; color: #666;">📭 No notifications yet</div>';
           } else {
-            dropdown.innerHTML = data.notifications.map(n => 
+            const markAll = data.unseen_count > 0 && data.latest_sent_on
+              ? `<div class="notification-item" style="text-align: right; color: #38bdf8;" onclick="markAllNotificationsSeen('${data.latest_sent_on}')">✓ Mark all as read</div>`
+              : '';
+            dropdown.innerHTML = markAll + data.notifications.map(n => 
               `<div class="notification-item ${n.seen ? '' : 'unseen'}" data-candidate-id="${n.candidate_id}" data-notification-id="${n.id}">
                 <div>
                   <strong>🎯 ${n.candidate_name}</strong> completed test<br>
@@ -315,10 +318,36 @@
         .catch(error => console.error('Error:', error));
     }
 
+    function markAllNotificationsSeen(upTo) {
+      fetch('/api/notifications/mark-seen', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({up_to: upTo})
+      })
+        .then(() => loadNotifications())
+        .catch(error => console.error('Error:', error));
+    }
+
+    function connectNotifications() {
+      // Conditional GETs keep the polling fallback cheap: an unchanged list comes back as 304.
+      if (!window.EventSource) {
+        setInterval(loadNotifications, 30000);
+        return;
+      }
+      const source = new EventSource('/api/notifications/stream');
+      source.addEventListener('notification', loadNotifications);
+      source.addEventListener('seen', loadNotifications);
+      source.onerror = function() {
+        if (source.readyState === EventSource.CLOSED) {
+          setInterval(loadNotifications, 30000);
+        }
+      };
+    }
+
     {% if session.get('user') %}
       document.addEventListener('DOMContentLoaded', function() {
         loadNotifications();
-        setInterval(loadNotifications, 30000);
+        connectNotifications();
       });
     {% endif %}
     
@@ -0,0 +1,43 @@
+"""Read-through cache checks for the in-process and host-shared stores.
+
+    python -m pytest test_cache.py
+"""
+import pytest
+
+from cache import LocalStore, SqliteStore, TTLCache
+
+
+@pytest.fixture(params=['local', 'sqlite'])
+def caches(request, tmp_path):
+    """Two caches as seen by two app processes; the local store is shared by one process only."""
+    if request.param == 'local':
+        store = LocalStore()
+        return TTLCache(store), TTLCache(store)
+    path = str(tmp_path / 'cache.db')
+    return TTLCache(SqliteStore(path)), TTLCache(SqliteStore(path))
+
+
+def test_invalidation_during_a_load_keeps_the_stale_value_out(caches):
+    reader, writer = caches
+    row = {'status': 'test_invited'}
+
+    def load():
+        # The old row has been read when a write lands and invalidates the key.
+        stale = dict(row)
+        row['status'] = 'test_completed'
+        writer.invalidate('candidate:1')
+        return stale
+
+    assert reader.get_or_load('candidate:1', load) == {'status': 'test_invited'}
+    assert reader.get('candidate:1') is None
+    assert reader.get_or_load('candidate:1', lambda: dict(row)) == {'status': 'test_completed'}
+    assert writer.get('candidate:1') == {'status': 'test_completed'}
+
+
+def test_invalidation_reaches_other_processes(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    first, second = TTLCache(SqliteStore(path)), TTLCache(SqliteStore(path))
+    first.set('candidate:1', {'status': 'test_invited'})
+    assert second.get('candidate:1') == {'status': 'test_invited'}
+    second.invalidate('candidate:1')
+    assert first.get('candidate:1') is None
@@ -4,7 +4,7 @@ DEBUG=True
 UPLOAD_FOLDER=uploads
 FLASK_ENV=development
 
-# Database Configuration
+# Database Configuration (DB_TYPE: mysql, mongodb or sqlite)
 DB_TYPE=mysql
 DB_HOST=localhost
 DB_USER=root
@@ -12,6 +12,9 @@ DB_PASSWORD=
 DB_NAME=ai_resume_db
 DB_PORT=3306
 
+# SQLite Configuration (single-node deployments and tests, no server needed)
+SQLITE_PATH=ai_resume.db
+
 # MongoDB Configuration (alternative)
 MONGO_URI=mongodb://localhost:27017/ai_resume_db
 
@@ -36,4 +39,102 @@ ADMIN_PASSWORD=project25resume
 # Test Configuration
 TOTAL_TEST_QUESTIONS=10
 POINTS_PER_QUESTION=10
-TOP_CANDIDATES=3
\ No newline at end of file
+TOP_CANDIDATES=3
+# Schema migrations (set False when deploys run `python migrations.py`)
+AUTO_MIGRATE=True
+
+# Bulk inserts (rows per multi-row INSERT / insert_many call)
+BULK_INSERT_CHUNK_SIZE=1000
+
+# Candidate/challenge read-through cache (leave CACHE_REDIS_URL empty for an in-process cache,
+# or for one shared through CACHE_SHARED_PATH when APP_WORKERS is above 1)
+CANDIDATE_CACHE_TTL=60
+CANDIDATE_CACHE_SIZE=1024
+CACHE_REDIS_URL=
+APP_WORKERS=1
+CACHE_SHARED_PATH=ai_resume_cache.db
+
+# Generated test question sets: reuse period (seconds), in-process cache size, variants per job description
+QUESTION_SET_TTL=604800
+QUESTION_SET_CACHE_SIZE=256
+QUESTION_SET_VARIANTS=3
+
+# AI scores of coding answers, reused for identical (question, code) pairs
+CODING_SCORE_CACHE_TTL=2592000
+CODING_SCORE_CACHE_SIZE=4096
+
+# Candidates shown per round/job group on /top-3-results (more load page by page)
+DASHBOARD_GROUP_SIZE=3
+# Job requisitions per /top-3-results page, newest first
+DASHBOARD_JOBS_PER_PAGE=10
+
+# HR notifications: MongoDB change stream (replica set only) and SSE keep-alive interval
+NOTIFICATION_CHANGE_STREAM=False
+SSE_HEARTBEAT_SECONDS=15
+
+# Retention (`python retention.py` from cron archives older rows; 0 keeps forever)
+NOTIFICATION_RETENTION_DAYS=90
+RESULT_RETENTION_DAYS=365
+RESUME_RETENTION_DAYS=180
+ARCHIVE_BATCH_SIZE=500
+
+# Rows fetched per chunk when streaming /export/candidates
+EXPORT_BATCH_SIZE=1000
+
+# Test submissions: local journal flushed to the database in the background
+SUBMISSION_JOURNAL=True
+SUBMISSION_JOURNAL_PATH=submission_journal.db
+SUBMISSION_FLUSH_INTERVAL=2
+SUBMISSION_FLUSH_BATCH_SIZE=100
+# Flushes a failing submission gets before it is parked in the journal
+SUBMISSION_MAX_ATTEMPTS=10
+
+# Threads that pre-generate assessments when candidates are invited or approved
+BACKGROUND_WORKERS=2
+
+# Gemini calls: deadline (seconds), retries, concurrent calls, circuit breaker failures/cool-down (seconds)
+LLM_TIMEOUT=20
+LLM_RETRIES=2
+LLM_MAX_CONCURRENCY=4
+LLM_BREAKER_THRESHOLD=5
+LLM_BREAKER_RESET=60
+
+# Coding answers run against test cases in limited subprocesses: workers, CPU seconds, memory (MB), wall timeout (seconds)
+SANDBOX_WORKERS=4
+SANDBOX_CPU_SECONDS=2
+SANDBOX_MEMORY_MB=256
+SANDBOX_TIMEOUT=5
+# Share of each tested coding answer's score given by Gemini's style review (0 disables it)
+CODING_STYLE_WEIGHT=0.2
+
+# Gemini quota: sustained calls per minute and burst, shared by app processes through this SQLite file (empty = per process)
+LLM_RATE_PER_MINUTE=60
+LLM_BURST=10
+LLM_RATE_LIMIT_PATH=llm_rate_limit.db
+
+# LLM backend: gemini, or stub for offline load tests (median latency ms, log-normal spread, failure rate, seed)
+LLM_PROVIDER=gemini
+LLM_STUB_LATENCY_MS=800
+LLM_STUB_LATENCY_SIGMA=0.5
+LLM_STUB_FAILURE_RATE=0
+LLM_STUB_SEED=0
+
+# Challenge bank: items per section below which Gemini tops it up, and Gemini calls per top-up
+CHALLENGE_BANK_MIN_ITEMS=50
+CHALLENGE_BANK_MAX_CALLS=5
+# Items per section generated from each job requisition's description, preferred in its candidates' sets
+CHALLENGE_BANK_ROLE_MIN_ITEMS=10
+
+# LLM metrics: calls per site kept for latency percentiles, and USD per 1000 input/output tokens for cost estimates
+LLM_METRICS_WINDOW=1000
+LLM_COST_PER_1K_INPUT_TOKENS=0.0003
+LLM_COST_PER_1K_OUTPUT_TOKENS=0.0025
+
+# Mail outbox: invitations are queued in this SQLite file and sent by workers reusing SMTP logins (batch size, seconds between polls, retry delay, attempts)
+MAIL_OUTBOX=True
+MAIL_OUTBOX_PATH=mail_outbox.db
+MAIL_WORKERS=2
+MAIL_BATCH_SIZE=50
+MAIL_SEND_INTERVAL=5
+MAIL_RETRY_AFTER=60
+MAIL_MAX_ATTEMPTS=5
@@ -0,0 +1,66 @@
+"""Top Candidates dashboard paging against a migrated SQLite database.
+
+    python -m pytest test_dashboard.py
+"""
+import pytest
+
+from dashboard import dashboard_groups, dashboard_page
+from migrations import connect_sqlite, run_migrations
+from repository import Repositories
+
+
+@pytest.fixture
+def repos(tmp_path):
+    conn = connect_sqlite(str(tmp_path / 'dashboard.db'))
+    run_migrations(conn, 'sqlite')
+    yield Repositories('sqlite', conn)
+    conn.close()
+
+
+def walk_group(repos, candidates, cursor, limit):
+    """Return the ids of a group's first page and every page after it."""
+    ids = [c['id'] for c in candidates]
+    while cursor:
+        page, cursor = dashboard_page(repos, cursor, limit)
+        ids.extend(c['id'] for c in page)
+    return ids
+
+
+def test_show_more_walks_every_candidate_once_across_ids_9_and_10(repos):
+    # Equal scores leave the id to order the group, so the ids run from one to two digits.
+    ids = repos.candidates.insert_many([{'name': f'Candidate {i}', 'status': 'test_completed', 'test_score': 80}
+                                        for i in range(10)])
+    rounds_data, rounds_meta, _ = dashboard_groups(repos, 3, 10)
+    group = rounds_data['First Round Completed']['General']
+    meta = rounds_meta['First Round Completed']['General']
+    assert [c['id'] for c in group] == sorted(ids, reverse=True)[:3]
+    assert meta['total'] == 10
+    assert walk_group(repos, group, meta['next_cursor'], 3) == sorted(ids, reverse=True)
+
+
+def test_merged_statuses_page_in_score_then_id_order(repos):
+    # 'pending' and 'test_invited' share the Test Invited round.
+    ids = repos.candidates.insert_many([{'name': f'Candidate {i}', 'status': ('pending', 'test_invited')[i % 2],
+                                         'test_score': (50, 70)[i % 3 == 0]} for i in range(14)])
+    rounds_data, rounds_meta, _ = dashboard_groups(repos, 4, 10)
+    group = rounds_data['Test Invited']['General']
+    meta = rounds_meta['Test Invited']['General']
+    expected = [c['id'] for c in sorted(repos.candidates.get_many(ids), key=lambda c: (c['test_score'], c['id']), reverse=True)]
+    assert meta['total'] == 14
+    assert walk_group(repos, group, meta['next_cursor'], 4) == expected
+
+
+def test_pages_through_requisitions_newest_first(repos):
+    job_ids = [repos.jobs.get_or_create(f'Job {i} description') for i in range(5)]
+    repos.candidates.insert_many([{'name': f'Candidate {i}', 'status': 'test_invited', 'job_id': job_ids[i % 5]}
+                                  for i in range(10)]
+                                 + [{'name': 'Unlinked', 'status': 'test_invited', 'job_id': None}])
+    pages = []
+    before = None
+    while True:
+        rounds_data, rounds_meta, before = dashboard_groups(repos, 3, 2, str(before) if before else None)
+        pages.append({meta['job_id']: meta['total'] for meta in rounds_meta['Test Invited'].values()})
+        if before is None:
+            break
+    # Candidates without a requisition are shown with the newest requisitions.
+    assert pages == [{job_ids[4]: 2, job_ids[3]: 2, None: 1}, {job_ids[2]: 2, job_ids[1]: 2}, {job_ids[0]: 2}]
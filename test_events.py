@@ -0,0 +1,39 @@
+"""Notification revalidation checks against a migrated SQLite database.
+
+    python -m pytest test_events.py
+"""
+from flask import Flask, jsonify
+from werkzeug.test import EnvironBuilder
+
+from events import conditional_response
+from migrations import connect_sqlite, run_migrations
+from repository import Repositories
+
+
+def test_returned_etag_revalidates_until_notifications_change(tmp_path):
+    conn = connect_sqlite(str(tmp_path / 'events.db'))
+    run_migrations(conn, 'sqlite')
+    repos = Repositories('sqlite', conn)
+    repos.notifications.insert({'candidate_id': '1', 'candidate_name': 'Candidate 1'})
+    app = Flask(__name__)
+    builds = []
+
+    def build():
+        builds.append(1)
+        return jsonify({'unseen_count': repos.notifications.unseen_count()})
+
+    def get(headers=None):
+        request = EnvironBuilder(path='/api/notifications', headers=headers).get_request()
+        with app.app_context():
+            return conditional_response(request, repos.notifications.version(), build)
+
+    first = get()
+    assert first.status_code == 200 and first.headers['ETag'].startswith('W/"')
+    revalidated = get({'If-None-Match': first.headers['ETag']})
+    assert revalidated.status_code == 304 and revalidated.headers['ETag'] == first.headers['ETag']
+    assert len(builds) == 1
+
+    repos.notifications.insert({'candidate_id': '2', 'candidate_name': 'Candidate 2'})
+    changed = get({'If-None-Match': first.headers['ETag']})
+    assert changed.status_code == 200 and changed.get_json() == {'unseen_count': 2}
+    conn.close()
@@ -1,7 +1,21 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
+from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, g, Response, stream_with_context
 from flask_mail import Mail, Message
 from werkzeug.utils import secure_filename
 from config import get_config
+from repository import Repositories, question_set_hash
+from cache import TTLCache, make_store
+from events import NotificationBroker, sse_stream, watch_mongo_notifications, conditional_response
+from export import csv_stream, parquet_stream
+from journal import SubmissionJournal, JournalFlusher
+from outbox import MailOutbox, OutboxSender
+from tasks import TaskQueue
+from llm import LLMClient, CircuitBreaker, LLMUnavailable, TokenBucket, SingleFlight, GeminiProvider, iter_json_objects
+from stub_llm import StubProvider
+from dashboard import dashboard_groups, dashboard_page
+from challenge_bank import FALLBACK_CHALLENGES, SET_SIZES, role_topic, challenge_prompt, parse_challenges, assemble_challenges, thin_sections, top_up
+from llm_metrics import LLMMetrics
+from sandbox import SandboxRunner
+from migrations import run_migrations, connect_sqlite
 import os
 import PyPDF2
 import docx
@@ -11,7 +25,7 @@ from sklearn.metrics.pairwise import cosine_similarity
 import matplotlib.pyplot as plt
 import mysql.connector
 from pymongo import MongoClient
-from datetime import datetime
+from datetime import datetime, timedelta
 import nltk
 from nltk.tokenize import word_tokenize
 from nltk.corpus import stopwords
@@ -20,6 +34,11 @@ import re
 import google.generativeai as genai
 import json
 import os
+import base64
+import threading
+import uuid
+import hashlib
+import random
 
 # ---------- Download NLTK data ----------
 try:
@@ -54,6 +73,52 @@ try:
 except Exception as e:
     print(f"❌ Error configuring Gemini: {e}")
 
+# Every Gemini call goes through one client: a per-call deadline, jittered retries,
+# at most LLM_MAX_CONCURRENCY calls at once, and a circuit breaker that sends
+# callers straight to their fallback content while Gemini is failing.
+app.config.setdefault('LLM_TIMEOUT', float(os.getenv('LLM_TIMEOUT', 20)))
+app.config.setdefault('LLM_RETRIES', int(os.getenv('LLM_RETRIES', 2)))
+app.config.setdefault('LLM_MAX_CONCURRENCY', int(os.getenv('LLM_MAX_CONCURRENCY', 4)))
+app.config.setdefault('LLM_BREAKER_THRESHOLD', int(os.getenv('LLM_BREAKER_THRESHOLD', 5)))
+app.config.setdefault('LLM_BREAKER_RESET', float(os.getenv('LLM_BREAKER_RESET', 60)))
+# Calls per minute and burst size kept under the API quota; the SQLite file shares the budget between
+# app processes on this host (set LLM_RATE_LIMIT_PATH empty for a per-process limit).
+app.config.setdefault('LLM_RATE_PER_MINUTE', float(os.getenv('LLM_RATE_PER_MINUTE', 60)))
+app.config.setdefault('LLM_BURST', int(os.getenv('LLM_BURST', 10)))
+app.config.setdefault('LLM_RATE_LIMIT_PATH', os.getenv('LLM_RATE_LIMIT_PATH', 'llm_rate_limit.db'))
+
+# LLM_PROVIDER=stub swaps Gemini for an offline stand-in with simulated latency and failures,
+# for load-testing the candidate flow without network access or API quota.
+app.config.setdefault('LLM_PROVIDER', os.getenv('LLM_PROVIDER', 'gemini'))
+app.config.setdefault('LLM_STUB_LATENCY_MS', float(os.getenv('LLM_STUB_LATENCY_MS', 800)))
+app.config.setdefault('LLM_STUB_LATENCY_SIGMA', float(os.getenv('LLM_STUB_LATENCY_SIGMA', 0.5)))
+app.config.setdefault('LLM_STUB_FAILURE_RATE', float(os.getenv('LLM_STUB_FAILURE_RATE', 0)))
+app.config.setdefault('LLM_STUB_SEED', int(os.getenv('LLM_STUB_SEED', 0)))
+# Calls per site kept for latency percentiles, and USD prices per 1000 tokens for cost estimates.
+app.config.setdefault('LLM_METRICS_WINDOW', int(os.getenv('LLM_METRICS_WINDOW', 1000)))
+app.config.setdefault('LLM_COST_PER_1K_INPUT_TOKENS', float(os.getenv('LLM_COST_PER_1K_INPUT_TOKENS', 0.0003)))
+app.config.setdefault('LLM_COST_PER_1K_OUTPUT_TOKENS', float(os.getenv('LLM_COST_PER_1K_OUTPUT_TOKENS', 0.0025)))
+
+def make_llm_provider():
+    """Return the configured LLM provider."""
+    if app.config['LLM_PROVIDER'] == 'stub':
+        print("🧪 Using the stub LLM provider")
+        return StubProvider(app.config['LLM_STUB_LATENCY_MS'], app.config['LLM_STUB_LATENCY_SIGMA'],
+                            app.config['LLM_STUB_FAILURE_RATE'], app.config['LLM_STUB_SEED'])
+    return GeminiProvider(app.config['GEMINI_MODEL'])
+
+# Latency, size, token and fallback statistics per call site, shown on /admin/llm-metrics.
+llm_metrics = LLMMetrics(app.config['LLM_METRICS_WINDOW'], app.config['LLM_COST_PER_1K_INPUT_TOKENS'],
+                         app.config['LLM_COST_PER_1K_OUTPUT_TOKENS'])
+
+llm = LLMClient(make_llm_provider(), app.config['LLM_TIMEOUT'], app.config['LLM_RETRIES'],
+                max_concurrency=app.config['LLM_MAX_CONCURRENCY'], metrics=llm_metrics,
+                breaker=CircuitBreaker(app.config['LLM_BREAKER_THRESHOLD'], app.config['LLM_BREAKER_RESET']),
+                limiter=TokenBucket(app.config['LLM_RATE_PER_MINUTE'] / 60, app.config['LLM_BURST'],
+                                    app.config['LLM_RATE_LIMIT_PATH']))
+# Identical question generations in flight (e.g. a cohort opening the same test) share one Gemini call.
+question_flights = SingleFlight()
+
 # ---------- Email Configuration ----------
 app.config.update({
     'MAIL_SERVER': app.config.get('MAIL_SERVER', 'smtp.gmail.com'),
@@ -66,6 +131,93 @@ app.config.update({
 })
 mail = Mail(app)
 
+# ---------- Database Settings ----------
+app.config.setdefault('AUTO_MIGRATE', os.getenv('AUTO_MIGRATE', 'True') == 'True')
+app.config.setdefault('SQLITE_PATH', os.getenv('SQLITE_PATH', 'ai_resume.db'))
+app.config.setdefault('BULK_INSERT_CHUNK_SIZE', int(os.getenv('BULK_INSERT_CHUNK_SIZE', 1000)))
+app.config.setdefault('DASHBOARD_GROUP_SIZE', int(os.getenv('DASHBOARD_GROUP_SIZE', 3)))
+# Job requisitions per Top Candidates page, newest first.
+app.config.setdefault('DASHBOARD_JOBS_PER_PAGE', int(os.getenv('DASHBOARD_JOBS_PER_PAGE', 10)))
+app.config.setdefault('EXPORT_BATCH_SIZE', int(os.getenv('EXPORT_BATCH_SIZE', 1000)))
+
+# ---------- Submission Journal Settings ----------
+# Test submissions are acknowledged once journaled locally and written to the database in the background.
+app.config.setdefault('SUBMISSION_JOURNAL', os.getenv('SUBMISSION_JOURNAL', 'True') == 'True')
+app.config.setdefault('SUBMISSION_JOURNAL_PATH', os.getenv('SUBMISSION_JOURNAL_PATH', 'submission_journal.db'))
+app.config.setdefault('SUBMISSION_FLUSH_INTERVAL', float(os.getenv('SUBMISSION_FLUSH_INTERVAL', 2)))
+app.config.setdefault('SUBMISSION_FLUSH_BATCH_SIZE', int(os.getenv('SUBMISSION_FLUSH_BATCH_SIZE', 100)))
+# Submissions that still fail after this many flushes are parked in the journal instead of retried forever.
+app.config.setdefault('SUBMISSION_MAX_ATTEMPTS', int(os.getenv('SUBMISSION_MAX_ATTEMPTS', 10)))
+
+# ---------- Mail Outbox Settings ----------
+# Invitations are queued locally and sent by worker threads that reuse one SMTP login per run of batches.
+app.config.setdefault('MAIL_OUTBOX', os.getenv('MAIL_OUTBOX', 'True') == 'True')
+app.config.setdefault('MAIL_OUTBOX_PATH', os.getenv('MAIL_OUTBOX_PATH', 'mail_outbox.db'))
+app.config.setdefault('MAIL_WORKERS', int(os.getenv('MAIL_WORKERS', 2)))
+app.config.setdefault('MAIL_BATCH_SIZE', int(os.getenv('MAIL_BATCH_SIZE', 50)))
+app.config.setdefault('MAIL_SEND_INTERVAL', float(os.getenv('MAIL_SEND_INTERVAL', 5)))
+app.config.setdefault('MAIL_RETRY_AFTER', int(os.getenv('MAIL_RETRY_AFTER', 60)))
+app.config.setdefault('MAIL_MAX_ATTEMPTS', int(os.getenv('MAIL_MAX_ATTEMPTS', 5)))
+
+# ---------- Background Task Settings ----------
+# Threads that generate assessments when candidates are invited, so no page waits on Gemini.
+app.config.setdefault('BACKGROUND_WORKERS', int(os.getenv('BACKGROUND_WORKERS', 2)))
+
+# ---------- Cache Settings ----------
+app.config.setdefault('CANDIDATE_CACHE_TTL', int(os.getenv('CANDIDATE_CACHE_TTL', 60)))
+app.config.setdefault('CANDIDATE_CACHE_SIZE', int(os.getenv('CANDIDATE_CACHE_SIZE', 1024)))
+app.config.setdefault('CACHE_REDIS_URL', os.getenv('CACHE_REDIS_URL'))
+# App processes serving requests (gunicorn sets WEB_CONCURRENCY). With more than one, candidate and
+# challenge entries live in this SQLite file unless Redis is configured, so every process sees invalidations.
+app.config.setdefault('APP_WORKERS', int(os.getenv('APP_WORKERS', os.getenv('WEB_CONCURRENCY', 1))))
+app.config.setdefault('CACHE_SHARED_PATH', os.getenv('CACHE_SHARED_PATH', 'ai_resume_cache.db'))
+# Generated question sets are reused for this long per job description, with this many variants rotated across candidates.
+app.config.setdefault('QUESTION_SET_TTL', int(os.getenv('QUESTION_SET_TTL', 7 * 24 * 3600)))
+app.config.setdefault('QUESTION_SET_CACHE_SIZE', int(os.getenv('QUESTION_SET_CACHE_SIZE', 256)))
+app.config.setdefault('QUESTION_SET_VARIANTS', int(os.getenv('QUESTION_SET_VARIANTS', 3)))
+# AI scores of coding answers, keyed by (question, code), so resubmissions and regrades are not re-sent.
+app.config.setdefault('CODING_SCORE_CACHE_TTL', int(os.getenv('CODING_SCORE_CACHE_TTL', 30 * 24 * 3600)))
+app.config.setdefault('CODING_SCORE_CACHE_SIZE', int(os.getenv('CODING_SCORE_CACHE_SIZE', 4096)))
+
+# ---------- Challenge Bank Settings ----------
+# Second round sets are sampled from the bank; sections below the minimum are topped up by Gemini in the background.
+app.config.setdefault('CHALLENGE_BANK_MIN_ITEMS', int(os.getenv('CHALLENGE_BANK_MIN_ITEMS', 50)))
+app.config.setdefault('CHALLENGE_BANK_MAX_CALLS', int(os.getenv('CHALLENGE_BANK_MAX_CALLS', 5)))
+# Items per section generated from each job requisition's description, preferred in its candidates' sets.
+app.config.setdefault('CHALLENGE_BANK_ROLE_MIN_ITEMS', int(os.getenv('CHALLENGE_BANK_ROLE_MIN_ITEMS', 10)))
+
+# ---------- Coding Sandbox Settings ----------
+# Coding answers are run against their test cases in limited subprocesses; Gemini only reviews style.
+app.config.setdefault('SANDBOX_WORKERS', int(os.getenv('SANDBOX_WORKERS', 4)))
+app.config.setdefault('SANDBOX_CPU_SECONDS', int(os.getenv('SANDBOX_CPU_SECONDS', 2)))
+app.config.setdefault('SANDBOX_MEMORY_MB', int(os.getenv('SANDBOX_MEMORY_MB', 256)))
+app.config.setdefault('SANDBOX_TIMEOUT', float(os.getenv('SANDBOX_TIMEOUT', 5)))
+app.config.setdefault('CODING_STYLE_WEIGHT', float(os.getenv('CODING_STYLE_WEIGHT', 0.2)))
+
+# ---------- Notification Settings ----------
+# With MongoDB on a replica set, a change stream delivers notifications written by any app process.
+app.config.setdefault('NOTIFICATION_CHANGE_STREAM', os.getenv('NOTIFICATION_CHANGE_STREAM', 'False') == 'True')
+app.config.setdefault('SSE_HEARTBEAT_SECONDS', int(os.getenv('SSE_HEARTBEAT_SECONDS', 15)))
+
+# Candidate and challenge lookups are read through these caches; every write
+# goes through the cached repositories, which invalidate the affected entry.
+shared_cache_path = app.config['CACHE_SHARED_PATH'] if app.config['APP_WORKERS'] > 1 else None
+candidate_cache = TTLCache(make_store(app.config['CANDIDATE_CACHE_SIZE'], app.config['CACHE_REDIS_URL'], shared_cache_path),
+                           app.config['CANDIDATE_CACHE_TTL'])
+challenge_cache = TTLCache(make_store(app.config['CANDIDATE_CACHE_SIZE'], app.config['CACHE_REDIS_URL'], shared_cache_path),
+                           app.config['CANDIDATE_CACHE_TTL'])
+# In front of the question_sets table, which keeps generated sets across restarts.
+question_cache = TTLCache(make_store(app.config['QUESTION_SET_CACHE_SIZE'], app.config['CACHE_REDIS_URL']),
+                          app.config['QUESTION_SET_TTL'])
+
+coding_score_cache = TTLCache(make_store(app.config['CODING_SCORE_CACHE_SIZE'], app.config['CACHE_REDIS_URL']),
+                              app.config['CODING_SCORE_CACHE_TTL'])
+
+background_tasks = TaskQueue(app.config['BACKGROUND_WORKERS'], app.app_context)
+
+code_sandbox = SandboxRunner(app.config['SANDBOX_WORKERS'], app.config['SANDBOX_CPU_SECONDS'],
+                             app.config['SANDBOX_MEMORY_MB'], app.config['SANDBOX_TIMEOUT'])
+
 def send_test_mail(candidate_email, candidate_id):
     test_link = f"http://localhost:5000/start_test/{candidate_id}"
 
@@ -94,8 +246,19 @@ Team HR
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
 # ---------- Database Connection ----------
+sqlite_connections = threading.local()
+
 def get_db_connection():
     """Get database connection with automatic fallback to MongoDB."""
+    if app.config['DB_TYPE'].lower() == 'sqlite':
+        # One connection per thread, kept open so its prepared statements are reused across requests.
+        if getattr(sqlite_connections, 'conn', None) is None:
+            try:
+                sqlite_connections.conn = connect_sqlite(app.config['SQLITE_PATH'])
+            except Exception as e:
+                print(f"❌ SQLite Error: {e}")
+                return None
+        return sqlite_connections.conn
     if app.config['DB_TYPE'].lower() == 'mongodb':
         try:
             client = MongoClient(app.config['MONGO_URI'])
@@ -129,300 +292,252 @@ def get_db_connection():
                 print(f"❌ MongoDB fallback failed: {mongo_e}")
                 return None
 
+def get_repos():
+    """Return the repositories for the current request, connecting on first use."""
+    if 'repos' not in g:
+        db = get_db_connection()
+        g.repos = Repositories(app.config['DB_TYPE'], db, app.config['BULK_INSERT_CHUNK_SIZE'],
+                               candidate_cache, challenge_cache) if db is not None else None
+    return g.repos
+
+@app.teardown_appcontext
+def close_repos(exception):
+    """Release the request's database connection."""
+    repos = g.pop('repos', None)
+    if repos is not None:
+        repos.close()
+
 def init_db():
-    """Initialize database with automatic fallback."""
+    """Apply pending schema migrations with automatic fallback."""
     db = get_db_connection()  # This will handle fallback automatically
     if db is None:
         print("❌ No database connection available")
         return
     
     try:
-        if app.config['DB_TYPE'].lower() == 'mongodb':
-            # MongoDB initialization
-            db.candidates.create_index("email")
-            db.candidates.create_index("name")
-            db.hr_notifications.create_index("candidate_id")
-            db.test_results.create_index("candidate_email")
-            db.admin_users.create_index("username", unique=True)
-            print("✓ MongoDB initialized successfully")
-        else:
-            # MySQL initialization
-            cursor = db.cursor()
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS resumes (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                filename VARCHAR(255),
-                match_percent FLOAT,
-                uploaded_on TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-            """)
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS candidates (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                name VARCHAR(255),
-                email VARCHAR(255),
-                match_percent FLOAT,
-                test_score FLOAT DEFAULT 0,
-                second_round_score FLOAT DEFAULT 0,
-                status VARCHAR(50) DEFAULT 'pending',
-                job_description LONGTEXT,
-                filename VARCHAR(255),
-                created_on TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-            """)
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS test_results (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                candidate_name VARCHAR(255),
-                candidate_email VARCHAR(255),
-                job_description LONGTEXT,
-                score FLOAT,
-                total_questions INT,
-                status VARCHAR(50),
-                created_on TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-            """)
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS hr_notifications (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                candidate_id VARCHAR(255),
-                candidate_name VARCHAR(255),
-                candidate_email VARCHAR(255),
-                test_score FLOAT,
-                match_percent FLOAT,
-                status VARCHAR(50) DEFAULT 'pending',
-                seen BOOLEAN DEFAULT FALSE,
-                sent_on TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-            """)
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS second_round_challenges (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                candidate_id VARCHAR(255),
-                challenges LONGTEXT,
-                created_on TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                status VARCHAR(50) DEFAULT 'pending'
-            )
-            """)
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS second_round_results (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                candidate_id VARCHAR(255),
-                reasoning_score INT,
-                aptitude_score INT,
-                coding_score FLOAT,
-                total_score FLOAT,
-                percentage FLOAT,
-                answers LONGTEXT,
-                submitted_on TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-            """)
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS admin_users (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                username VARCHAR(100) UNIQUE,
-                password VARCHAR(255),
-                created_on TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-            """)
-            cursor.close()
-            db.close()
-            print("✓ MySQL initialized successfully")
+        version = run_migrations(db, app.config['DB_TYPE'])
+        print(f"✓ Database schema at version {version}")
     except Exception as e:
-        print(f"❌ Database initialization error: {e}")
+        print(f"❌ Database migration error: {e}")
+    finally:
+        if app.config['DB_TYPE'].lower() == 'mysql':
+            db.close()
 
-# Initialize database on startup
-init_db()
+# Apply migrations on startup unless deploys run `python migrations.py` instead
+if app.config['AUTO_MIGRATE']:
+    init_db()
 
 # Create default admin user if not exists
 def create_default_admin():
-    db = get_db_connection()
-    if db is not None:
-        try:
-            if app.config['DB_TYPE'].lower() == 'mongodb':
-                count = db.admin_users.count_documents({})
-                if count == 0:
-                    db.admin_users.insert_one({
-                        'username': app.config['ADMIN_USERNAME'],
-                        'password': app.config['ADMIN_PASSWORD'],
-                        'created_on': datetime.now()
-                    })
-                    print("✓ Default admin user created")
-            else:
-                cursor = db.cursor()
-                cursor.execute("SELECT COUNT(*) FROM admin_users")
-                count = cursor.fetchone()[0]
-                if count == 0:
-                    cursor.execute("INSERT INTO admin_users (username, password) VALUES (%s, %s)", 
-                                  (app.config['ADMIN_USERNAME'], app.config['ADMIN_PASSWORD']))
+    with app.app_context():
+        repos = get_repos()
+        if repos is not None:
+            try:
+                if repos.admins.count() == 0:
+                    repos.admins.insert(app.config['ADMIN_USERNAME'], app.config['ADMIN_PASSWORD'])
                     print("✓ Default admin user created")
-                cursor.close()
-                db.close()
-        except Exception as e:
-            print(f"❌ Error creating admin user: {e}")
+            except Exception as e:
+                print(f"❌ Error creating admin user: {e}")
 
 create_default_admin()
 
+# ---------- HR Notification Events ----------
+notification_broker = NotificationBroker()
+
+def notification_event(notification):
+    """Build the SSE payload for a stored HR notification."""
+    return {
+        'type': 'notification',
+        'candidate_id': str(notification.get('candidate_id', '')),
+        'candidate_name': notification.get('candidate_name') or 'Unknown',
+        'test_score': notification.get('test_score'),
+        'combined_score': notification.get('combined_score'),
+        'status': notification.get('status', 'pending')
+    }
+
+def watching_change_stream():
+    return app.config['NOTIFICATION_CHANGE_STREAM'] and app.config['DB_TYPE'].lower() == 'mongodb'
+
+def publish_notification(notification):
+    """Push a new HR notification to open dashboards."""
+    # The change stream already publishes every insert, including this one.
+    if not watching_change_stream():
+        notification_broker.publish(notification_event(notification))
+
+if watching_change_stream():
+    change_stream_db = get_db_connection()
+    if change_stream_db is not None:
+        watch_mongo_notifications(change_stream_db.hr_notifications, notification_broker, notification_event)
+
 # ---------- Database Helper Functions ----------
 def save_results_to_db(results_df):
     """Save resume results to database."""
-    db = get_db_connection()
-    if db is None:
+    repos = get_repos()
+    if repos is None:
         return
     try:
-        if app.config['DB_TYPE'].lower() == 'mongodb':
-            resumes = []
-            for i, row in results_df.iterrows():
-                resumes.append({
-                    'filename': row['Resume'],
-                    'match_percent': float(row['Match %']),
-                    'uploaded_on': datetime.now()
-                })
-            if resumes:
-                result = db.resumes.insert_many(resumes)
-                print(f"✓ Saved {len(result.inserted_ids)} resumes to MongoDB")
-        else:
-            cursor = db.cursor()
-            for i, row in results_df.iterrows():
-                sql = "INSERT INTO resumes (filename, match_percent) VALUES (%s, %s)"
-                val = (row['Resume'], float(row['Match %']))
-                cursor.execute(sql, val)
-            cursor.close()
-            db.close()
+        resumes = [{'filename': filename, 'match_percent': float(match)}
+                   for filename, match in zip(results_df['Resume'], results_df['Match %'])]
+        saved = repos.resumes.insert_many(resumes)
+        print(f"✓ Saved {saved} resumes")
     except Exception as e:
         print(f"❌ Failed to save results: {e}")
 
-def save_candidate_to_db(name, email, match_percent, status='pending', job_description='', filename=''):
+def save_candidate_to_db(name, email, match_percent, status='pending', job_id=None, filename=''):
     """Save candidate information to database."""
-    db = get_db_connection()
-    if db is None:
+    repos = get_repos()
+    if repos is None:
         return None
     try:
-        if app.config['DB_TYPE'].lower() == 'mongodb':
-            candidate = {
-                'name': name,
-                'email': email,
-                'match_percent': float(match_percent),
-                'status': status,
-                'job_description': job_description,
-                'filename': filename,
-                'created_on': datetime.now()
-            }
-            result = db.candidates.insert_one(candidate)
-            return str(result.inserted_id)
-        else:
-            cursor = db.cursor()
-            try:
-                cursor.execute("ALTER TABLE candidates ADD COLUMN filename VARCHAR(255)")
-            except:
-                pass
-            sql = "INSERT INTO candidates (name, email, match_percent, status, job_description, filename) VALUES (%s, %s, %s, %s, %s, %s)"
-            val = (name, email, float(match_percent), status, job_description, filename)
-            cursor.execute(sql, val)
-            candidate_id = cursor.lastrowid
-            cursor.close()
-            db.close()
-            return candidate_id
+        return repos.candidates.insert({
+            'name': name,
+            'email': email,
+            'match_percent': float(match_percent),
+            'status': status,
+            'job_id': job_id,
+            'filename': filename
+        })
     except Exception as e:
         print(f"❌ Failed to save candidate: {e}")
         return None
 
-def save_test_result(name, email, job_desc, score, total, status):
-    """Save test results to database."""
-    db = get_db_connection()
-    if db is None:
-        return
+def save_candidates_to_db(candidates, status='pending'):
+    """Save many candidates in one batch and return their ids (None where saving failed)."""
+    repos = get_repos()
+    if repos is None:
+        return [None] * len(candidates)
     try:
-        if app.config['DB_TYPE'].lower() == 'mongodb':
-            test_result = {
-                'candidate_name': name,
-                'candidate_email': email,
-                'job_description': job_desc[:5000],
-                'score': float(score),
-                'total_questions': int(total),
-                'status': status,
-                'created_on': datetime.now()
-            }
-            db.test_results.insert_one(test_result)
-        else:
-            cursor = db.cursor()
-            sql = "INSERT INTO test_results (candidate_name, candidate_email, job_description, score, total_questions, status) VALUES (%s, %s, %s, %s, %s, %s)"
-            val = (name, email, job_desc[:5000], float(score), int(total), status)
-            cursor.execute(sql, val)
-            cursor.close()
-            db.close()
+        return repos.candidates.insert_many([{
+            'name': c['name'],
+            'email': c['email'],
+            'match_percent': float(c['match_percent']),
+            'status': status,
+            'job_id': c.get('job_id'),
+            'filename': c.get('filename', '')
+        } for c in candidates])
     except Exception as e:
-        print(f"❌ Failed to save test result: {e}")
+        print(f"❌ Failed to save candidates: {e}")
+        return [None] * len(candidates)
 
-def update_candidate_test_score(name, score):
-    """Update candidate test score."""
-    db = get_db_connection()
-    if db is None:
-        return None
+def save_test_result(repos, submission_id, candidate_id, name, email, job_id, score, total, status):
+    """Save test results to database."""
+    repos.test_results.insert({
+        'submission_id': submission_id,
+        'candidate_id': str(candidate_id) if candidate_id else None,
+        'candidate_name': name,
+        'candidate_email': email,
+        'job_id': job_id,
+        'score': float(score),
+        'total_questions': int(total),
+        'status': status
+    })
+
+def get_job_description(repos, job_id):
+    """Return the description of a job requisition, or '' if unknown."""
+    if repos is None or not job_id:
+        return ''
     try:
-        if app.config['DB_TYPE'].lower() == 'mongodb':
-            result = db.candidates.update_one(
-                {'name': name},
-                {'$set': {'test_score': float(score), 'status': 'test_completed'}}
-            )
-            candidate = db.candidates.find_one({'name': name})
-            return str(candidate['_id']) if candidate else None
-        else:
-            cursor = db.cursor()
-            cursor.execute("UPDATE candidates SET test_score = %s, status = %s WHERE name = %s", (float(score), 'test_completed', name))
-            cursor.execute("SELECT id FROM candidates WHERE name = %s", (name,))
-            result = cursor.fetchone()
-            candidate_id = result[0] if result else None
-            cursor.close()
-            db.close()
-            return candidate_id
+        job = repos.jobs.get(job_id)
+        return job.get('description', '') if job else ''
     except Exception as e:
-        print(f"❌ Failed to update test score: {e}")
-        return None
+        print(f"❌ Error fetching job requisition: {e}")
+        return ''
 
-def send_result_to_hr(candidate_id, name, email, score):
+def candidate_job_description(repos, candidate):
+    """Return a candidate's job description from its requisition."""
+    # MongoDB documents from before requisitions may still carry the text inline.
+    return get_job_description(repos, candidate.get('job_id')) or candidate.get('job_description') or ''
+
+def send_result_to_hr(repos, candidate_id, name, email, score):
     """Send test result notification to HR."""
-    db = get_db_connection()
-    if db is None:
+    notification = {
+        'candidate_id': str(candidate_id),
+        'candidate_name': name,
+        'candidate_email': email,
+        'test_score': float(score)
+    }
+    # The candidate's match_percent is copied in by the insert itself.
+    if repos.notifications.insert_for_candidate(notification) is None:
         return
-    try:
-        if app.config['DB_TYPE'].lower() == 'mongodb':
-            from bson import ObjectId
+    publish_notification(notification)
+    print(f"✓ HR notification sent for {name}")
+
+def apply_test_submission(repos, submission):
+    """Write a scored test submission to the database; repeating it has no further effect."""
+    if repos.test_results.has_submission(submission['submission_id']):
+        return
+    candidate_id = submission.get('candidate_id')
+    name = submission.get('candidate_name', '')
+    email = submission.get('candidate_email', '')
+    score = submission['score']
+    job_id = submission.get('job_id') or None
+
+    # Test pages opened from links that predate candidate ids only know the name.
+    if not candidate_id and name:
+        candidate = repos.candidates.find_by_name(name)
+        candidate_id = candidate['id'] if candidate else None
+        job_id = job_id or (candidate.get('job_id') if candidate else None)
+
+    # One primary-key write; the page already sent the candidate's job_id, so nothing is read back.
+    if candidate_id:
+        repos.candidates.update(candidate_id, {'test_score': float(score), 'status': 'test_completed'})
+        send_result_to_hr(repos, candidate_id, name, email, score)
+    # Saved last: the stored submission_id marks the submission as applied. If the
+    # process dies before this, the replay repeats at most the HR notification.
+    save_test_result(repos, submission['submission_id'], candidate_id, name, email, job_id, score, submission['total'], 'completed')
+
+def flush_test_submissions(batch):
+    """Apply journaled submissions over one database connection; return the failures by journal row id."""
+    with app.app_context():
+        repos = get_repos()
+        if repos is None:
+            return {row_id: 'Database not available' for row_id, _ in batch}
+        failures = {}
+        for row_id, submission in batch:
             try:
-                candidate = db.candidates.find_one({'_id': ObjectId(candidate_id)})
-            except:
-                candidate = db.candidates.find_one({'_id': candidate_id})
-            
-            match_percent = candidate.get('match_percent', 0) if candidate else 0
-            
-            notification = {
-                'candidate_id': candidate_id,
-                'candidate_name': name,
-                'candidate_email': email,
-                'test_score': float(score),
-                'match_percent': float(match_percent),
-                'status': 'pending',
-                'seen': False,
-                'sent_on': datetime.now()
-            }
-            db.hr_notifications.insert_one(notification)
-        else:
-            cursor = db.cursor()
-            cursor.execute("SELECT match_percent FROM candidates WHERE id = %s", (candidate_id,))
-            result = cursor.fetchone()
-            match_percent = result[0] if result else 0
-            
-            cursor.execute("INSERT INTO hr_notifications (candidate_id, candidate_name, candidate_email, test_score, match_percent) VALUES (%s, %s, %s, %s, %s)", 
-                          (candidate_id, name, email, float(score), float(match_percent)))
-            cursor.close()
-            db.close()
-        print(f"✓ HR notification sent for {name}")
+                apply_test_submission(repos, submission)
+            except Exception as e:
+                failures[row_id] = e
+        return failures
+
+submission_journal = None
+journal_flusher = None
+if app.config['SUBMISSION_JOURNAL']:
+    try:
+        submission_journal = SubmissionJournal(app.config['SUBMISSION_JOURNAL_PATH'])
+        journal_flusher = JournalFlusher(submission_journal, flush_test_submissions,
+                                         app.config['SUBMISSION_FLUSH_BATCH_SIZE'], app.config['SUBMISSION_FLUSH_INTERVAL'],
+                                         max_attempts=app.config['SUBMISSION_MAX_ATTEMPTS'])
+        journal_flusher.start()
+        print(f"✓ Submission journal at {app.config['SUBMISSION_JOURNAL_PATH']} ({submission_journal.pending_count()} to replay, "
+              f"{submission_journal.parked_count()} parked)")
+    except Exception as e:
+        print(f"❌ Submission journal unavailable, saving submissions directly: {e}")
+        submission_journal = None
+
+def build_outbox_message(row):
+    """Turn a queued outbox row back into a Flask-Mail message."""
+    return Message(subject=row['subject'], recipients=[row['recipient']], body=row['body'], html=row['html'])
+
+mail_outbox = None
+mail_sender = None
+if app.config['MAIL_OUTBOX']:
+    try:
+        mail_outbox = MailOutbox(app.config['MAIL_OUTBOX_PATH'])
+        mail_sender = OutboxSender(mail_outbox, mail.connect, build_outbox_message, app.app_context,
+                                   workers=app.config['MAIL_WORKERS'], batch_size=app.config['MAIL_BATCH_SIZE'],
+                                   interval=app.config['MAIL_SEND_INTERVAL'], retry_after=app.config['MAIL_RETRY_AFTER'],
+                                   max_attempts=app.config['MAIL_MAX_ATTEMPTS'])
+        mail_sender.start()
+        print(f"✓ Mail outbox at {app.config['MAIL_OUTBOX_PATH']} ({mail_outbox.pending_count()} to send)")
     except Exception as e:
-        print(f"❌ Failed to send HR notification: {e}")
+        print(f"❌ Mail outbox unavailable, sending invitations directly: {e}")
+        mail_outbox = None
+        mail_sender = None
 
 # ---------- Global Variables ----------
 selected_candidates = []
-job_descriptions_store = {}
+job_ids_store = {}
 
 # ---------- NLP Preprocessing Function ----------
 def preprocess_text(text):
@@ -460,13 +575,11 @@ def extract_text_from_file(filepath):
 # ---------- Generate Test Questions using Gemini ----------
 def generate_test_questions(job_description):
     """Generate test questions based on job description using Gemini AI."""
-    try:
-        print(f"🔍 Generating questions for job description: {job_description[:100]}...")
-        if not job_description or len(job_description.strip()) < 10:
-            return get_fallback_questions()
+    return request_ai_questions(job_description) or get_fallback_questions()
 
-        model = genai.GenerativeModel(app.config['GEMINI_MODEL'])
-        prompt = f"""
+def test_question_prompt(job_description):
+    """Return the Gemini prompt for a job description's test questions."""
+    return f"""
 Generate exactly {app.config['TOTAL_TEST_QUESTIONS']} technical interview questions for: {job_description[:500]}
 
 Return ONLY a JSON array:
@@ -480,9 +593,25 @@ Return ONLY a JSON array:
 ]
 """
 
+def requisition_tag(job_id):
+    """Key that LLM costs are totalled under for a job requisition, or None if the requisition is unknown."""
+    return f"job:{job_id}" if job_id else None
+
+def valid_test_question(question):
+    """Return True if a generated question can be shown as a four-option multiple choice question."""
+    return (isinstance(question, dict) and all(k in question for k in ['question', 'options', 'correct_answer']) and
+            isinstance(question['options'], list) and len(question['options']) == 4)
+
+def request_ai_questions(job_description, job_id=None):
+    """Ask Gemini for test questions; return None if it gives no usable set."""
+    try:
+        print(f"🔍 Generating questions for job description: {job_description[:100]}...")
+        if not job_description or len(job_description.strip()) < 10:
+            return None
+
         print("🤖 Calling Gemini API...")
-        response = model.generate_content(prompt)
-        text = response.text.strip()
+        text = llm.generate(test_question_prompt(job_description), site='test_questions',
+                            tag=requisition_tag(job_id)).strip()
         
         if text.startswith('```json'):
             text = text[7:]
@@ -495,15 +624,150 @@ Return ONLY a JSON array:
         if start >= 0 and end > start:
             questions = json.loads(text[start:end])
             if isinstance(questions, list) and len(questions) > 0:
-                valid_questions = [q for q in questions if 
-                    all(k in q for k in ['question', 'options', 'correct_answer']) and
-                    isinstance(q['options'], list) and len(q['options']) == 4]
+                valid_questions = [q for q in questions if valid_test_question(q)]
                 if len(valid_questions) >= app.config['TOTAL_TEST_QUESTIONS']:
                     return valid_questions[:app.config['TOTAL_TEST_QUESTIONS']]
-        return get_fallback_questions()
+        llm_metrics.parse_failure('test_questions')
+        llm_metrics.fallback('test_questions', 'unusable response')
+        return None
+    except LLMUnavailable as e:
+        print(f"⚠️ Gemini unavailable ({e}), using fallback questions")
+        llm_metrics.fallback('test_questions', 'llm unavailable')
+        return None
+    except json.JSONDecodeError as e:
+        print(f"❌ Error parsing generated questions: {e}")
+        llm_metrics.parse_failure('test_questions')
+        llm_metrics.fallback('test_questions', 'unusable response')
+        return None
     except Exception as e:
         print(f"❌ Error generating questions: {e}")
+        llm_metrics.fallback('test_questions', 'error')
+        return None
+
+def question_variant(candidate_key):
+    """Pick the question set variant for a candidate; the same candidate always gets the same one."""
+    variants = max(1, app.config['QUESTION_SET_VARIANTS'])
+    if not candidate_key:
+        return random.randrange(variants)
+    return int(hashlib.sha256(str(candidate_key).encode('utf-8')).hexdigest(), 16) % variants
+
+def cached_test_questions(repos, job_description, candidate_key=None, job_id=None):
+    """Return a stored question set for the job description, generating it only on a miss."""
+    if not job_description or len(job_description.strip()) < 10:
+        llm_metrics.fallback('test_questions', 'no job description')
         return get_fallback_questions()
+    set_hash = question_set_hash(job_description)
+    variant = question_variant(candidate_key)
+    key = f"questions:{set_hash}:{variant}"
+    questions = question_cache.get(key)
+    if questions is not None:
+        return questions
+
+    # A streamed generation that ended early hands its waiters no set.
+    return (question_flights.do(key, lambda: load_test_questions(repos, job_description, set_hash, variant, key, job_id))
+            or get_fallback_questions())
+
+def stored_test_questions(repos, set_hash, variant):
+    """Return the unexpired stored questions of a variant, or None."""
+    if repos is None:
+        return None
+    try:
+        stored = repos.question_sets.get(set_hash, variant)
+        if stored and stored['created_on'] > datetime.now() - timedelta(seconds=app.config['QUESTION_SET_TTL']):
+            return stored['questions']
+    except Exception as e:
+        print(f"❌ Error reading stored question set: {e}")
+    return None
+
+def save_test_questions(repos, set_hash, variant, key, questions):
+    """Store a generated question set in the database and the cache."""
+    if repos is not None:
+        try:
+            repos.question_sets.put(set_hash, variant, questions)
+        except Exception as e:
+            print(f"❌ Error storing question set: {e}")
+    question_cache.set(key, questions)
+
+def load_test_questions(repos, job_description, set_hash, variant, key, job_id=None):
+    """Read a question set from the database or generate and store it."""
+    questions = stored_test_questions(repos, set_hash, variant)
+    if questions is not None:
+        question_cache.set(key, questions)
+        return questions
+
+    questions = request_ai_questions(job_description, job_id)
+    if questions is None:
+        # Fallbacks are not cached, so the next request tries Gemini again.
+        return get_fallback_questions()
+    save_test_questions(repos, set_hash, variant, key, questions)
+    return questions
+
+def stream_test_questions(repos, job_description, candidate_key=None, job_id=None):
+    """Yield test questions one by one, each as soon as Gemini has generated it."""
+    if not job_description or len(job_description.strip()) < 10:
+        llm_metrics.fallback('test_questions_stream', 'no job description')
+        yield from get_fallback_questions()
+        return
+    set_hash = question_set_hash(job_description)
+    variant = question_variant(candidate_key)
+    key = f"questions:{set_hash}:{variant}"
+    total = app.config['TOTAL_TEST_QUESTIONS']
+    # Stored sets, and sets another request is already generating, are sent whole.
+    questions = question_cache.get(key) or stored_test_questions(repos, set_hash, variant)
+    flight = question_flights.begin(key) if questions is None else None
+    if questions is None and flight is None:
+        questions = cached_test_questions(repos, job_description, candidate_key, job_id)
+    if questions is not None:
+        question_cache.set(key, questions)
+        yield from questions
+        return
+
+    questions = []
+    complete = None
+    try:
+        stream = llm.stream(test_question_prompt(job_description), site='test_questions_stream',
+                            tag=requisition_tag(job_id))
+        for question in iter_json_objects(stream):
+            if not valid_test_question(question):
+                llm_metrics.parse_failure('test_questions_stream')
+                continue
+            questions.append(question)
+            yield question
+            if len(questions) == total:
+                break
+        if len(questions) == total:
+            complete = questions
+            save_test_questions(repos, set_hash, variant, key, questions)
+            return
+    except LLMUnavailable as e:
+        print(f"⚠️ Question stream ended early ({e})")
+    finally:
+        # Requests that waited on this generation get the set, or None if it ended short.
+        question_flights.finish(key, flight, complete)
+    # Short sets are completed from the fallback pool and not stored.
+    llm_metrics.fallback('test_questions_stream', 'short stream')
+    asked = {q['question'] for q in questions}
+    yield from [q for q in get_fallback_questions() if q['question'] not in asked][:total - len(questions)]
+
+def question_events(questions):
+    """Format streamed questions as Server-Sent Events, ending with a done event."""
+    try:
+        for question in questions:
+            yield f"event: question\ndata: {json.dumps(question)}\n\n"
+    except Exception as e:
+        print(f"❌ Error streaming questions: {e}")
+        yield f"event: error\ndata: {json.dumps({'message': 'Could not load questions'})}\n\n"
+    yield "event: done\ndata: {}\n\n"
+
+def pregenerate_test_questions(candidate_id, job_id):
+    """Generate and store the question set the candidate's test page will ask for."""
+    repos = get_repos()
+    cached_test_questions(repos, get_job_description(repos, job_id), candidate_id, job_id)
+
+def queue_test_questions(candidate_id, job_id):
+    """Prepare an invited candidate's first round questions in the background."""
+    if candidate_id and job_id:
+        background_tasks.submit(f"questions:{candidate_id}", pregenerate_test_questions, candidate_id, job_id)
 
 def get_fallback_questions():
     """Return randomized fallback questions when AI fails."""
@@ -624,26 +888,13 @@ def login():
         user = request.form.get('username', '').strip()
         password = request.form.get('password', '').strip()
         
-        db = get_db_connection()
-        if db is not None:
+        repos = get_repos()
+        if repos is not None:
             try:
-                if app.config['DB_TYPE'].lower() == 'mongodb':
-                    result = db.admin_users.find_one({'username': user, 'password': password})
-                    if result:
-                        session['user'] = user
-                        flash(f'Welcome {user}!', 'success')
-                        return redirect(url_for('index'))
-                else:
-                    cursor = db.cursor()
-                    cursor.execute("SELECT username FROM admin_users WHERE username = %s AND password = %s", (user, password))
-                    result = cursor.fetchone()
-                    cursor.close()
-                    db.close()
-                    
-                    if result:
-                        session['user'] = user
-                        flash(f'Welcome {user}!', 'success')
-                        return redirect(url_for('index'))
+                if repos.admins.authenticate(user, password):
+                    session['user'] = user
+                    flash(f'Welcome {user}!', 'success')
+                    return redirect(url_for('index'))
             except Exception as e:
                 print(f"❌ Login error: {e}")
         
@@ -665,7 +916,7 @@ def about():
 @app.route('/upload', methods=['POST'])
 def upload():
     """Upload and process resumes."""
-    global selected_candidates, job_descriptions_store
+    global selected_candidates, job_ids_store
     
     if 'user' not in session:
         flash('Please login first')
@@ -716,7 +967,13 @@ def upload():
     plt.close()
     
     save_results_to_db(results)
-    job_descriptions_store = {row[0].replace('_', ' '): job_description for row in results.values}
+    repos = get_repos()
+    try:
+        job_id = repos.jobs.get_or_create(job_description) if repos is not None else None
+    except Exception as e:
+        print(f"❌ Failed to save job requisition: {e}")
+        job_id = None
+    job_ids_store = {row[0].replace('_', ' '): job_id for row in results.values}
     
     print("✓ Processing complete")
     return render_template('result.html', tables=results.values, chart='result_chart.png')
@@ -744,8 +1001,9 @@ def send_email():
         return jsonify({'success': False, 'message': 'Candidate name is required'}), 400
 
     try:
-        job_desc = job_descriptions_store.get(filename.replace('_', ' '), '')
-        candidate_id = save_candidate_to_db(name, email, match, 'test_invited', job_desc, filename)
+        job_id = job_ids_store.get(filename.replace('_', ' '))
+        candidate_id = save_candidate_to_db(name, email, match, 'test_invited', job_id, filename)
+        queue_test_questions(candidate_id, job_id)
         
         test_link = f"http://localhost:5000/start_test/{candidate_id}" if candidate_id else f"http://localhost:5000/skill-test/{name.replace(' ', '_')}"
         
@@ -793,6 +1051,7 @@ def send_skill_test_emails():
     if not candidates:
         return jsonify({'success': False, 'message': 'No candidates provided'})
 
+    invitations = []
     for candidate in candidates:
         name = candidate.get('name', '').strip()
         filename = candidate.get('filename', '').strip()
@@ -805,16 +1064,31 @@ def send_skill_test_emails():
         if not name:
             continue
         
-        try:
-            job_desc = job_descriptions_store.get(filename.replace('_', ' '), '')
-            candidate_id = save_candidate_to_db(name, email, match, 'test_invited', job_desc, filename)
-            
-            test_link = f"http://localhost:5000/start_test/{candidate_id}" if candidate_id else f"http://localhost:5000/skill-test/{name.replace(' ', '_')}"
-            
-            msg = Message(
-                subject='🎯 First Round Assessment - Skill Test Invitation',
-                recipients=[email],
-                html=f"""
+        invitations.append({
+            'name': name,
+            'email': email,
+            'match_percent': match,
+            'job_id': job_ids_store.get(filename.replace('_', ' ')),
+            'filename': filename
+        })
+    
+    # Save the whole batch in one transaction before sending any email
+    candidate_ids = save_candidates_to_db(invitations, 'test_invited')
+    
+    for invitation, candidate_id in zip(invitations, candidate_ids):
+        queue_test_questions(candidate_id, invitation['job_id'])
+    
+    messages = []
+    for invitation, candidate_id in zip(invitations, candidate_ids):
+        name = invitation['name']
+        email = invitation['email']
+        match = invitation['match_percent']
+        test_link = f"http://localhost:5000/start_test/{candidate_id}" if candidate_id else f"http://localhost:5000/skill-test/{name.replace(' ', '_')}"
+        
+        messages.append({
+            'recipient': email,
+            'subject': '🎯 First Round Assessment - Skill Test Invitation',
+            'html': f"""
                 <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
                     <h2 style="color: #38bdf8;">🎯 First Round Assessment</h2>
                     <p>Dear {name},</p>
@@ -835,49 +1109,67 @@ def send_skill_test_emails():
                     
                     <p style="color: #666; font-size: 14px;">Good luck with your assessment!</p>
                 </div>
-                """
-            )
-            msg.body = f"Dear {name},\n\nCongratulations! Your resume matched {match}% with our job requirements.\n\nStart Test: {test_link}\n\nGood luck!\n\nTeam HR"
-            mail.send(msg)
+                """,
+            'body': f"Dear {name},\n\nCongratulations! Your resume matched {match}% with our job requirements.\n\nStart Test: {test_link}\n\nGood luck!\n\nTeam HR"
+        })
+    
+    # Queue the batch and return at once; the outbox workers deliver it over pooled SMTP sessions
+    batch_id = uuid.uuid4().hex
+    if mail_outbox is not None:
+        try:
+            mail_outbox.enqueue(batch_id, messages)
+            mail_sender.wake()
+            return jsonify({
+                'success': True,
+                'batch_id': batch_id,
+                'message': f'Invitations queued for {len(messages)} candidates',
+                'recipients': [{'email': m['recipient'], 'status': 'queued'} for m in messages]
+            })
         except Exception as e:
-            print(f"❌ Email error: {e}")
+            print(f"❌ Mail outbox error, sending invitations directly: {e}")
     
-    return jsonify({'success': True, 'message': f'Invitations sent to {len(candidates)} candidates'})
+    recipients = []
+    try:
+        with mail.connect() as connection:
+            for message in messages:
+                try:
+                    connection.send(build_outbox_message(message))
+                    recipients.append({'email': message['recipient'], 'status': 'sent'})
+                except Exception as e:
+                    print(f"❌ Email error: {e}")
+                    recipients.append({'email': message['recipient'], 'status': 'failed', 'error': str(e)})
+    except Exception as e:
+        print(f"❌ Email error: {e}")
+        attempted = {r['email'] for r in recipients}
+        recipients += [{'email': m['recipient'], 'status': 'failed', 'error': str(e)} for m in messages if m['recipient'] not in attempted]
+    
+    return jsonify({'success': True, 'batch_id': None, 'message': f'Invitations sent to {len(candidates)} candidates', 'recipients': recipients})
+
+@app.route('/api/email-batches/<batch_id>')
+def email_batch_status(batch_id):
+    """Delivery status of each invitation in a batch."""
+    if 'user' not in session:
+        return jsonify({'success': False}), 401
+    if mail_outbox is None:
+        return jsonify({'success': False, 'message': 'Mail outbox not available'}), 503
+    status = mail_outbox.batch_status(batch_id)
+    if status is None:
+        return jsonify({'success': False, 'message': 'Batch not found'}), 404
+    return jsonify(dict(status, success=True))
 
 @app.route('/start_test/<candidate_id>')
 def start_test(candidate_id):
     """Start test page for candidate by ID."""
-    db = get_db_connection()
-    if db is None:
+    repos = get_repos()
+    if repos is None:
         return "Database not available", 500
 
     try:
-        if app.config['DB_TYPE'].lower() == 'mongodb':
-            from bson import ObjectId
-            try:
-                candidate = db.candidates.find_one({'_id': ObjectId(candidate_id)})
-            except:
-                candidate = db.candidates.find_one({'_id': candidate_id})
-            
-            if not candidate:
-                return "Candidate not found", 404
-            
-            candidate_name = candidate.get('name', '')
-            candidate_email = candidate.get('email', '')
-            job_desc = candidate.get('job_description', '')
-        else:
-            cursor = db.cursor()
-            cursor.execute("SELECT name, email, job_description FROM candidates WHERE id = %s", (candidate_id,))
-            result = cursor.fetchone()
-            cursor.close()
-            db.close()
-            
-            if not result:
-                return "Candidate not found", 404
+        candidate = repos.candidates.get(candidate_id)
+        if not candidate:
+            return "Candidate not found", 404
 
-            candidate_name, candidate_email, job_desc = result
-        
-        return render_template('skill_test.html', candidate_name=candidate_name, candidate_email=candidate_email, job_description=job_desc)
+        return render_template('skill_test.html', candidate_id=candidate['id'], candidate_name=candidate.get('name', ''), candidate_email=candidate.get('email', ''), job_id=candidate.get('job_id') or '', job_description=candidate_job_description(repos, candidate))
     except Exception as e:
         print(f"❌ Error fetching candidate: {e}")
         return "Error loading test", 500
@@ -886,57 +1178,95 @@ def start_test(candidate_id):
 def skill_test(candidate_name):
     """Skill test page."""
     display_name = candidate_name.replace('_', ' ')
-    db = get_db_connection()
+    repos = get_repos()
     
     job_desc = ''
-    if db is not None:
+    candidate_id = ''
+    job_id = job_ids_store.get(display_name)
+    if repos is not None:
         try:
-            cursor = db.cursor()
-            cursor.execute("SELECT job_description FROM candidates WHERE name = %s", (candidate_name,))
-            result = cursor.fetchone()
-            job_desc = result[0] if result else ''
-            cursor.close()
-            db.close()
+            candidate = repos.candidates.find_by_name(display_name)
+            if candidate:
+                candidate_id = candidate['id']
+                job_id = candidate.get('job_id') or job_id
+                job_desc = candidate_job_description(repos, candidate)
         except Exception as e:
             print(f"❌ Error fetching job description: {e}")
     
     # If not found in database, try the global store (for testing purposes)
     if not job_desc:
-        job_desc = job_descriptions_store.get(display_name, '')
+        job_desc = get_job_description(repos, job_id)
     
     # If still not found, use a default job description for testing
     if not job_desc:
         job_desc = """We are looking for a skilled Python Developer with experience in web development using Flask, Django, and REST APIs. The ideal candidate should have strong knowledge of Python programming, database management (MySQL, PostgreSQL), and front-end technologies (HTML, CSS, JavaScript). Experience with machine learning libraries like scikit-learn and data visualization tools is a plus. Responsibilities include developing web applications, writing clean and efficient code, collaborating with cross-functional teams, and participating in code reviews."""
         print(f"📝 Using default job description for testing: {job_desc[:100]}...")
     
-    return render_template('skill_test.html', candidate_name=display_name, candidate_email='', job_description=job_desc)
+    return render_template('skill_test.html', candidate_id=candidate_id, candidate_name=display_name, candidate_email='', job_id=job_id or '', job_description=job_desc)
 
 @app.route('/api/get-test-questions', methods=['POST'])
 def get_test_questions():
     """API to get test questions."""
-    job_desc = request.json.get('job_description', '')
-    questions = generate_test_questions(job_desc)
+    # Pages send the requisition id; the description itself is only accepted from older pages.
+    repos = get_repos()
+    job_id = request.json.get('job_id')
+    job_desc = get_job_description(repos, job_id)
+    if not job_desc:
+        job_id = None
+        job_desc = request.json.get('job_description', '')
+    questions = cached_test_questions(repos, job_desc, request.json.get('candidate_id'), job_id)
     return jsonify({'questions': questions})
 
+@app.route('/api/stream-test-questions')
+def stream_test_questions_route():
+    """Stream test questions as Server-Sent Events as they are generated."""
+    repos = get_repos()
+    job_id = request.args.get('job_id')
+    job_desc = get_job_description(repos, job_id)
+    if not job_desc:
+        job_id = None
+        job_desc = request.args.get('job_description', '')
+    questions = stream_test_questions(repos, job_desc, request.args.get('candidate_id'), job_id)
+    return Response(stream_with_context(question_events(questions)), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.route('/api/submit-test-answers', methods=['POST'])
 def submit_test_answers():
     """API to submit and evaluate test answers."""
     data = request.json
-    name = data.get('candidate_name', '')
-    email = data.get('candidate_email', '')
-    job_desc = data.get('job_description', '')
     answers = data.get('answers', [])
-    
     score = sum(10 for ans in answers if evaluate_answer(ans['question'], ans['answer'], ans['correct']))
     
-    save_test_result(name, email, job_desc, score, len(answers), 'completed')
-    candidate_id = update_candidate_test_score(name, score)
+    # Pages send a per-attempt id so a retried POST is stored once.
+    submission_id = str(data.get('submission_id') or '')[:64] or uuid.uuid4().hex
+    submission = {
+        'submission_id': submission_id,
+        'candidate_id': data.get('candidate_id') or None,
+        'candidate_name': data.get('candidate_name', ''),
+        'candidate_email': data.get('candidate_email', ''),
+        'job_id': data.get('job_id') or None,
+        'score': score,
+        'total': len(answers)
+    }
+    response = jsonify({'success': True, 'score': score, 'total': len(answers) * 10, 'submission_id': submission_id})
     
-    # Send result to HR
-    if candidate_id:
-        send_result_to_hr(candidate_id, name, email, score)
+    if submission_journal is not None:
+        try:
+            submission_journal.append(submission_id, submission)
+            journal_flusher.wake()
+            return response
+        except Exception as e:
+            print(f"❌ Could not journal submission, saving directly: {e}")
     
-    return jsonify({'success': True, 'score': score, 'total': len(answers) * 10})
+    repos = get_repos()
+    if repos is not None:
+        try:
+            apply_test_submission(repos, submission)
+        except Exception as e:
+            print(f"❌ Failed to save test submission: {e}")
+    return response
 
 @app.route('/top-3-results')
 def top_3_results():
@@ -944,78 +1274,70 @@ def top_3_results():
     if 'user' not in session:
         return redirect(url_for('login'))
     
-    db = get_db_connection()
-    if db is None:
-        return render_template('top_3_results.html', rounds_data={})
+    repos = get_repos()
+    if repos is None:
+        return render_template('top_3_results.html', rounds_data={}, rounds_meta={})
     
     try:
-        rounds_data = {
-            'Test Invited': {},
-            'First Round Completed': {},
-            'Second Round Invited': {},
-            'Second Round Completed': {},
-            'HR Round Invited': {}
-        }
-        
-        if app.config['DB_TYPE'].lower() == 'mongodb':
-            candidates = list(db.candidates.find({}).sort('test_score', -1))
-            
-            for candidate in candidates:
-                status = candidate.get('status', '')
-                round_key = {
-                    'test_invited': 'Test Invited',
-                    'test_completed': 'First Round Completed',
-                    'second_round_invited': 'Second Round Invited',
-                    'second_round_completed': 'Second Round Completed',
-                    'hr_round_invited': 'HR Round Invited'
-                }.get(status, 'Test Invited')
-                
-                job_desc = candidate.get('job_description', 'General')[:40] + '...'
-                if job_desc not in rounds_data[round_key]:
-                    rounds_data[round_key][job_desc] = []
-                
-                rounds_data[round_key][job_desc].append({
-                    'id': str(candidate['_id']),
-                    'name': candidate.get('name', ''),
-                    'email': candidate.get('email', ''),
-                    'match_percent': candidate.get('match_percent', 0),
-                    'test_score': candidate.get('test_score', 0),
-                    'second_round_score': candidate.get('second_round_score', 0)
-                })
-        else:
-            cursor = db.cursor()
-            cursor.execute("SELECT id, name, email, match_percent, test_score, job_description, status, COALESCE(second_round_score, 0) FROM candidates ORDER BY test_score DESC")
-            results = cursor.fetchall()
-            cursor.close()
-            db.close()
-            
-            for row in results:
-                status = row[6]
-                round_key = {
-                    'test_invited': 'Test Invited',
-                    'test_completed': 'First Round Completed',
-                    'second_round_invited': 'Second Round Invited',
-                    'second_round_completed': 'Second Round Completed',
-                    'hr_round_invited': 'HR Round Invited'
-                }.get(status, 'Test Invited')
-                
-                job_desc = (row[5][:40] + '...') if row[5] else 'General'
-                if job_desc not in rounds_data[round_key]:
-                    rounds_data[round_key][job_desc] = []
-                
-                rounds_data[round_key][job_desc].append({
-                    'id': row[0],
-                    'name': row[1],
-                    'email': row[2],
-                    'match_percent': row[3],
-                    'test_score': row[4],
-                    'second_round_score': row[7] if len(row) > 7 else 0
-                })
-        
-        return render_template('top_3_results.html', rounds_data=rounds_data)
+        before = request.args.get('before') or None
+        rounds_data, rounds_meta, next_before = dashboard_groups(repos, app.config['DASHBOARD_GROUP_SIZE'],
+                                                                 app.config['DASHBOARD_JOBS_PER_PAGE'], before)
+        return render_template('top_3_results.html', rounds_data=rounds_data, rounds_meta=rounds_meta,
+                               before=before, next_before=next_before)
     except Exception as e:
         print(f"❌ Error: {e}")
-        return render_template('top_3_results.html', rounds_data={})
+        return render_template('top_3_results.html', rounds_data={}, rounds_meta={})
+
+@app.route('/api/top-3-results')
+def top_3_results_page():
+    """Get the next page of a dashboard group."""
+    if 'user' not in session:
+        return jsonify({'success': False}), 401
+    
+    repos = get_repos()
+    if repos is None:
+        return jsonify({'candidates': [], 'next_cursor': None})
+    
+    try:
+        limit = min(int(request.args.get('limit', app.config['DASHBOARD_GROUP_SIZE'])), 100)
+        candidates, next_cursor = dashboard_page(repos, request.args.get('cursor', ''), limit)
+        return jsonify({'candidates': candidates, 'next_cursor': next_cursor})
+    except Exception as e:
+        print(f"❌ Error loading dashboard page: {e}")
+        return jsonify({'candidates': [], 'next_cursor': None}), 400
+
+@app.route('/export/candidates')
+def export_candidates():
+    """Download candidates and scores as CSV or Parquet, filtered by job, status and date range."""
+    if 'user' not in session:
+        return redirect(url_for('login'))
+
+    repos = get_repos()
+    if repos is None:
+        return jsonify({'success': False, 'message': 'Database not available'}), 500
+
+    try:
+        since = datetime.strptime(request.args['from'], '%Y-%m-%d') if request.args.get('from') else None
+        # "to" is inclusive, so the range ends at the start of the next day.
+        until = datetime.strptime(request.args['to'], '%Y-%m-%d') + timedelta(days=1) if request.args.get('to') else None
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Dates must be YYYY-MM-DD'}), 400
+    statuses = [s for value in request.args.getlist('status') for s in value.split(',') if s]
+    batches = repos.candidates.export_batches(request.args.get('job_id') or None, statuses, since, until,
+                                              app.config['EXPORT_BATCH_SIZE'])
+
+    export_format = request.args.get('format', 'csv').lower()
+    filename = f"candidates-{datetime.now().strftime('%Y%m%d')}.{export_format}"
+    headers = {'Content-Disposition': f'attachment; filename={filename}'}
+    if export_format == 'parquet':
+        try:
+            stream = parquet_stream(batches)
+        except ImportError:
+            return jsonify({'success': False, 'message': 'Parquet export requires pyarrow'}), 400
+        return Response(stream_with_context(stream), mimetype='application/vnd.apache.parquet', headers=headers)
+    if export_format != 'csv':
+        return jsonify({'success': False, 'message': 'Format must be csv or parquet'}), 400
+    return Response(stream_with_context(csv_stream(batches)), mimetype='text/csv', headers=headers)
 
 def send_hr_round_email(name, email, match, score):
     """Send HR round invitation email."""
@@ -1032,131 +1354,73 @@ def send_hr_round_email(name, email, match, score):
     except Exception as e:
         print(f"❌ Email error: {e}")
 
-def generate_second_round_challenges(job_description, candidate_name):
-    """Generate reasoning, aptitude, and coding challenges using Gemini AI."""
-    import random
+def request_ai_challenges(topic, job_description='', job_id=None):
+    """Ask Gemini for a challenge set on topic and return its response text, or None if unavailable."""
     try:
-        model = genai.GenerativeModel(app.config['GEMINI_MODEL'])
-        
-        # Add randomization to get different questions each time
-        topics = ['algorithms', 'data structures', 'problem solving', 'system design', 'programming logic']
-        random_topic = random.choice(topics)
-        random_number = random.randint(1, 1000)
-        
-        prompt = f"""
-Create unique assessment questions #{random_number} focusing on {random_topic} for job: {job_description[:300]}
-
-Return valid JSON:
-{{
-  "reasoning": [
-    {{"question": "unique logic question", "options": ["A", "B", "C", "D"], "correct_answer": "A"}},
-    {{"question": "different reasoning question", "options": ["A", "B", "C", "D"], "correct_answer": "B"}},
-    {{"question": "another logic problem", "options": ["A", "B", "C", "D"], "correct_answer": "C"}}
-  ],
-  "aptitude": [
-    {{"question": "math problem 1", "options": ["10", "20", "30", "40"], "correct_answer": "20"}},
-    {{"question": "calculation question", "options": ["5", "15", "25", "35"], "correct_answer": "15"}},
-    {{"question": "numerical reasoning", "options": ["100", "200", "300", "400"], "correct_answer": "200"}}
-  ],
-  "coding": [
-    {{"question": "coding challenge 1", "sample_input": "input1", "expected_output": "output1", "difficulty": "easy"}},
-    {{"question": "programming task", "sample_input": "input2", "expected_output": "output2", "difficulty": "medium"}}
-  ]
-}}
-
-Make questions different from previous assessments.
-"""
-        
-        print("🔄 Calling Gemini API for second round challenges...")
-        print(f"📝 Using prompt: {prompt[:150]}...")
-        response = model.generate_content(prompt)
-        text = response.text.strip()
-        print(f"📝 Gemini response: {text[:200]}...")
-        
-        # Clean response - remove markdown formatting
-        text = text.replace('```json', '').replace('```', '').strip()
-        
-        # Find JSON boundaries
-        start = text.find('{')
-        end = text.rfind('}') + 1
-        
-        if start >= 0 and end > start:
-            json_text = text[start:end]
-            print(f"🔍 Extracted JSON: {json_text[:100]}...")
-            
-            try:
-                challenges = json.loads(json_text)
-                print(f"📊 Parsed challenges: {list(challenges.keys()) if isinstance(challenges, dict) else 'Invalid format'}")
-                
-                # Validate structure
-                if (isinstance(challenges, dict) and 
-                    all(k in challenges for k in ['reasoning', 'aptitude', 'coding']) and
-                    all(isinstance(challenges[k], list) for k in ['reasoning', 'aptitude', 'coding'])):
-                    
-                    # Validate each section has questions
-                    if (len(challenges['reasoning']) >= 1 and 
-                        len(challenges['aptitude']) >= 1 and 
-                        len(challenges['coding']) >= 1):
-                        print("✅ AI-generated challenges validated successfully")
-                        return challenges
-                    else:
-                        print("⚠️ Insufficient questions in AI response")
-                else:
-                    print("⚠️ Invalid challenge structure from AI")
-            except json.JSONDecodeError as je:
-                print(f"❌ JSON parsing error: {je}")
-                print(f"📝 Raw JSON text: {json_text[:200]}...")
-        else:
-            print("⚠️ No valid JSON found in AI response")
-        
-        print("⚠️ AI response validation failed, using fallback challenges")
-        return get_fallback_challenges()
+        print(f"🔄 Calling Gemini API for {topic} challenges...")
+        text = llm.generate(challenge_prompt(topic, job_description), site='challenge_bank', tag=requisition_tag(job_id))
+        if parse_challenges(text) is None:
+            llm_metrics.parse_failure('challenge_bank')
+        return text
+    except LLMUnavailable as e:
+        print(f"⚠️ Gemini unavailable ({e}), challenge bank not topped up")
+        return None
+
+def top_up_challenge_bank():
+    """Generate challenges for the bank's thin sections."""
+    repos = get_repos()
+    if repos is None:
+        print("❌ Database not available, challenge bank not topped up")
+        return
+    added = top_up(repos.challenge_bank, request_ai_challenges, app.config['CHALLENGE_BANK_MIN_ITEMS'],
+                   app.config['CHALLENGE_BANK_MAX_CALLS'])
+    print(f"✅ Challenge bank topped up with {added} items")
+
+def top_up_role_challenges(job_id, job_description):
+    """Generate challenges tailored to one job requisition until its pool reaches the role minimum."""
+    repos = get_repos()
+    if repos is None:
+        print("❌ Database not available, role challenges not generated")
+        return
+    topic = role_topic(job_id)
+    added = top_up(repos.challenge_bank, lambda _: request_ai_challenges('the skills this role requires', job_description, job_id),
+                   app.config['CHALLENGE_BANK_ROLE_MIN_ITEMS'], app.config['CHALLENGE_BANK_MAX_CALLS'], topic)
+    print(f"✅ Challenge bank topped up with {added} items for {topic}")
+
+def generate_second_round_challenges(job_description, candidate_name, job_id=None):
+    """Assemble a candidate's reasoning, aptitude, and coding challenges from the challenge bank.
+
+    Items generated for the candidate's job requisition come first; the general bank fills the rest.
+    """
+    repos = get_repos()
+    topic = role_topic(job_id) if job_id is not None and job_description else None
+    try:
+        challenges = assemble_challenges(repos.challenge_bank, topic=topic) if repos is not None else None
+        # Gemini fills the bank in the background; no candidate waits for it.
+        if repos is not None and thin_sections(repos.challenge_bank, app.config['CHALLENGE_BANK_MIN_ITEMS']):
+            background_tasks.submit('challenge-bank-top-up', top_up_challenge_bank)
+        if topic and repos is not None and thin_sections(repos.challenge_bank, app.config['CHALLENGE_BANK_ROLE_MIN_ITEMS'], topic):
+            background_tasks.submit(f'challenge-bank-top-up-{topic}', top_up_role_challenges, job_id, job_description)
+        if challenges is not None:
+            return challenges
+        print("📚 Challenge bank too small, using fallback challenges")
+        llm_metrics.fallback('challenge_bank', 'bank too small')
     except Exception as e:
-        print(f"❌ Error generating challenges: {e}")
-        import traceback
-        traceback.print_exc()
-        print("📚 Using fallback challenges")
-        return get_fallback_challenges()
+        print(f"❌ Error sampling challenge bank: {e}")
+        llm_metrics.fallback('challenge_bank', 'error')
+    return get_fallback_challenges()
 
 def get_fallback_challenges():
-    """Return randomized fallback challenges when AI fails."""
-    import random
-    
-    reasoning_pool = [
-        {"question": "If all roses are flowers and some flowers fade quickly, which conclusion is valid?", "options": ["All roses fade quickly", "Some roses may fade quickly", "No roses fade quickly", "All flowers are roses"], "correct_answer": "Some roses may fade quickly"},
-        {"question": "In a sequence 2, 6, 18, 54, what comes next?", "options": ["108", "162", "216", "270"], "correct_answer": "162"},
-        {"question": "If it takes 5 machines 5 minutes to make 5 widgets, how long for 100 machines to make 100 widgets?", "options": ["5 minutes", "20 minutes", "100 minutes", "500 minutes"], "correct_answer": "5 minutes"},
-        {"question": "All programmers drink coffee. John drinks coffee. Is John a programmer?", "options": ["Yes, definitely", "No, definitely not", "Cannot be determined", "Only on weekdays"], "correct_answer": "Cannot be determined"},
-        {"question": "If A > B and B > C, then:", "options": ["A = C", "A < C", "A > C", "Cannot determine"], "correct_answer": "A > C"}
-    ]
-    
-    aptitude_pool = [
-        {"question": "A train travels 60 km in 40 minutes. What is its speed in km/hr?", "options": ["90 km/hr", "100 km/hr", "120 km/hr", "150 km/hr"], "correct_answer": "90 km/hr"},
-        {"question": "If 20% of a number is 50, what is 75% of that number?", "options": ["150", "187.5", "200", "225"], "correct_answer": "187.5"},
-        {"question": "A rectangle has length 12cm and width 8cm. What is its area?", "options": ["96 sq cm", "40 sq cm", "20 sq cm", "48 sq cm"], "correct_answer": "96 sq cm"},
-        {"question": "If 3x + 5 = 20, what is x?", "options": ["3", "4", "5", "6"], "correct_answer": "5"},
-        {"question": "What is 15% of 200?", "options": ["25", "30", "35", "40"], "correct_answer": "30"}
-    ]
-    
-    coding_pool = [
-        {"question": "Write a function to find the maximum number in a list", "sample_input": "[3, 7, 2, 9, 1]", "expected_output": "9", "difficulty": "easy"},
-        {"question": "Write a function to check if a string is a palindrome", "sample_input": "'racecar'", "expected_output": "True", "difficulty": "medium"},
-        {"question": "Write a function to count vowels in a string", "sample_input": "'hello'", "expected_output": "2", "difficulty": "easy"},
-        {"question": "Write a function to find factorial of a number", "sample_input": "5", "expected_output": "120", "difficulty": "medium"},
-        {"question": "Write a function to remove duplicates from a list", "sample_input": "[1,2,2,3,3,4]", "expected_output": "[1,2,3,4]", "difficulty": "medium"}
-    ]
-    
-    return {
-        "reasoning": random.sample(reasoning_pool, 3),
-        "aptitude": random.sample(aptitude_pool, 3),
-        "coding": random.sample(coding_pool, 2)
-    }
+    """Return randomized fallback challenges when the challenge bank cannot be used."""
+    return {section: random.sample(FALLBACK_CHALLENGES[section], size) for section, size in SET_SIZES.items()}
 
-def send_second_round_email(candidate_id, name, email, job_description):
+def send_second_round_email(candidate_id, name, email, job_description, job_id=None):
     """Send second round email with AI-generated challenges."""
     try:
         print(f"📧 Preparing second round email for {name}")
-        challenges = generate_second_round_challenges(job_description, name)
+        challenges = generate_second_round_challenges(job_description, name, job_id)
+        # Stored before the email goes out, so the link always finds them.
+        store_second_round_challenges(candidate_id, challenges, job_id)
         second_round_link = f"http://localhost:5000/second-round/{candidate_id}"
         
         # Create HTML email with challenges preview
@@ -1205,9 +1469,6 @@ Good luck!
 Team HR"""
         
         mail.send(msg)
-        
-        # Store challenges in database for the test
-        store_second_round_challenges(candidate_id, challenges)
         print(f"✅ Second round email sent successfully to {name}")
         
         return True
@@ -1215,178 +1476,272 @@ Team HR"""
         print(f"❌ Error sending second round email: {e}")
         return False
 
-def evaluate_coding_answers(coding_answers):
-    """Evaluate coding answers using Gemini AI."""
-    if not coding_answers:
-        return 0
-    
-    total_score = 0
-    try:
-        model = genai.GenerativeModel(app.config['GEMINI_MODEL'])
-        
-        for answer in coding_answers:
-            question = answer.get('question', '')
-            code = answer.get('answer', '').strip()
-            
-            if not code:
-                continue
-                
-            prompt = f"""
-Evaluate this coding solution:
+def invite_to_second_round(candidate_id, name, email, job_description, job_id, previous_status):
+    """Generate challenges and send the second round email; undo the approval if it cannot be sent."""
+    if not send_second_round_email(candidate_id, name, email, job_description, job_id):
+        get_repos().candidates.update(candidate_id, {'status': previous_status})
+        print(f"❌ Second round invitation for {name} failed; status reset to {previous_status}")
+
+def coding_answer_key(question, code):
+    """Cache key for the score of one coding answer."""
+    return 'coding:' + hashlib.sha256(f"{question}\0{code}".encode('utf-8')).hexdigest()
+
+def grade_coding_batch(solutions, style_only=False):
+    """Score (question, code) pairs with one Gemini call; unreadable scores come back as None."""
+    listing = "\n\n".join(f"Solution {i + 1}:\nQuestion: {question}\nCode: {code}"
+                           for i, (question, code) in enumerate(solutions))
+    criteria = """- Readability and naming
+- Idiomatic use of the language
+- Structure and handling of edge cases
+
+Correctness has already been checked by running the code, so do not judge it.""" if style_only else """- Correctness of logic
+- Code quality
+- Completeness"""
+    prompt = f"""
+Evaluate these {len(solutions)} coding solutions:
 
-Question: {question}
-Code: {code}
+{listing}
 
-Rate from 0-1 based on:
-- Correctness of logic
-- Code quality
-- Completeness
+Rate each from 0-1 based on:
+{criteria}
 
-Respond with only a number between 0 and 1 (e.g., 0.8)
+Respond with only a JSON array of {len(solutions)} numbers between 0 and 1, in the same order (e.g., [0.8, 0.5])
 """
-            
-            response = model.generate_content(prompt)
-            score_text = response.text.strip()
-            
-            try:
-                score = float(score_text)
-                if 0 <= score <= 1:
-                    total_score += score
+    text = llm.generate(prompt, site='coding_style' if style_only else 'coding_grade').strip()
+    start = text.find('[')
+    end = text.rfind(']') + 1
+    scores = json.loads(text[start:end]) if start >= 0 and end > start else []
+    graded = []
+    for i in range(len(solutions)):
+        try:
+            score = float(scores[i])
+            graded.append(score if 0 <= score <= 1 else None)
+        except (IndexError, TypeError, ValueError):
+            graded.append(None)
+    return graded
+
+def ai_coding_scores(solutions, style_only=False):
+    """Return Gemini's score for each (question, code) pair, from the cache where possible."""
+    site = 'coding_style' if style_only else 'coding_grade'
+    keys = [('style:' if style_only else '') + coding_answer_key(question, code) for question, code in solutions]
+    scores = {}
+    pending = {}
+    for key, solution in zip(keys, solutions):
+        if key not in scores and key not in pending:
+            cached = coding_score_cache.get(key)
+            if cached is not None:
+                scores[key] = cached
+            else:
+                pending[key] = solution
+    
+    if pending:
+        try:
+            # All ungraded answers of the submission go to Gemini in one call.
+            for key, score in zip(pending, grade_coding_batch(list(pending.values()), style_only)):
+                if score is None:
+                    scores[key] = 0.5  # Default partial credit, not cached
+                    llm_metrics.parse_failure(site)
+                    llm_metrics.fallback(site, 'unreadable score')
                 else:
-                    total_score += 0.5  # Default partial credit
-            except:
-                total_score += 0.5  # Default partial credit if parsing fails
-                
+                    scores[key] = score
+                    coding_score_cache.set(key, score)
+        except Exception as e:
+            print(f"❌ Error evaluating code: {e}")
+            llm_metrics.fallback(site, 'llm unavailable' if isinstance(e, LLMUnavailable) else 'error')
+            # Fallback: give partial credit for non-empty answers
+            for key in pending:
+                scores[key] = 0.5
+    
+    return [scores[key] for key in keys]
+
+def coding_test_cases(answer, challenges):
+    """Return the (input, expected output) cases of the stored challenge a coding answer is for.
+
+    Test data posted with the answer is never used, so candidates cannot supply their own cases.
+    """
+    index = answer.get('questionIndex')
+    if not isinstance(index, int) or not 0 <= index < len(challenges):
+        return []
+    challenge = challenges[index]
+    if not isinstance(challenge, dict) or challenge.get('expected_output') in (None, ''):
+        return []
+    return [(challenge.get('sample_input', ''), challenge['expected_output'])]
+
+def evaluate_coding_answers(coding_answers, challenges=None):
+    """Evaluate coding answers by running them against their test cases, with Gemini reviewing style."""
+    if not coding_answers:
+        return 0
+    
+    answered = [(answer.get('question', ''), answer.get('answer', '').strip(), answer)
+                for answer in coding_answers if answer.get('answer', '').strip()]
+    if not answered:
+        return 0
+    
+    try:
+        test_scores = code_sandbox.grade_many([(code, coding_test_cases(answer, challenges or []))
+                                               for _, code, answer in answered])
     except Exception as e:
-        print(f"❌ Error evaluating code: {e}")
-        # Fallback: give partial credit for non-empty answers
-        total_score = sum(0.5 for ans in coding_answers if ans.get('answer', '').strip())
+        print(f"❌ Error running coding tests: {e}")
+        test_scores = [None] * len(answered)
+    
+    # Answers without runnable test cases are graded entirely by Gemini.
+    tested = [(question, code) for (question, code, _), passed in zip(answered, test_scores) if passed is not None]
+    untested = [(question, code) for (question, code, _), passed in zip(answered, test_scores) if passed is None]
+    style_weight = app.config['CODING_STYLE_WEIGHT']
+    style_scores = iter(ai_coding_scores(tested, style_only=True) if tested and style_weight > 0 else [])
+    ai_scores = iter(ai_coding_scores(untested) if untested else [])
     
-    return total_score
+    total = 0
+    for passed in test_scores:
+        if passed is None:
+            total += next(ai_scores)
+        elif style_weight > 0:
+            total += (1 - style_weight) * passed + style_weight * next(style_scores)
+        else:
+            total += passed
+    return total
 
-def store_second_round_challenges(candidate_id, challenges):
+def store_second_round_challenges(candidate_id, challenges, job_id=None):
     """Store second round challenges in database."""
-    db = get_db_connection()
-    if db is None:
+    repos = get_repos()
+    if repos is None:
         return
     
     try:
-        if app.config['DB_TYPE'].lower() == 'mongodb':
-            db.second_round_challenges.insert_one({
-                'candidate_id': candidate_id,
-                'challenges': challenges,
-                'created_on': datetime.now(),
-                'status': 'pending'
-            })
-        else:
-            cursor = db.cursor()
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS second_round_challenges (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    candidate_id VARCHAR(255),
-                    challenges LONGTEXT,
-                    created_on TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    status VARCHAR(50) DEFAULT 'pending'
-                )
-            """)
-            cursor.execute(
-                "INSERT INTO second_round_challenges (candidate_id, challenges) VALUES (%s, %s)",
-                (candidate_id, json.dumps(challenges))
-            )
-            cursor.close()
-            db.close()
+        repos.challenges.insert(str(candidate_id), challenges, job_id)
     except Exception as e:
         print(f"❌ Error storing challenges: {e}")
 
+def notifications_response(repos):
+    """Return the 20 most recent HR notifications and the unseen count as JSON."""
+    notifications = []
+    latest_sent_on = None
+    
+    for doc in repos.notifications.list_recent(20):
+        seen_value = bool(doc.get('seen')) if doc.get('seen') is not None else False
+        sent_on = doc.get('sent_on')
+        notifications.append({
+            'id': doc['id'],
+            'candidate_name': doc.get('candidate_name') or 'Unknown',
+            'test_score': int(doc.get('test_score') or 0),
+            'combined_score': float(doc['combined_score']) if doc.get('combined_score') is not None else None,
+            'sent_on': sent_on.strftime('%Y-%m-%d %H:%M') if sent_on else 'Unknown',
+            'candidate_id': str(doc.get('candidate_id', '')),
+            'seen': seen_value
+        })
+        if latest_sent_on is None and sent_on:
+            latest_sent_on = sent_on.isoformat()
+    
+    # Counted over every notification, not just the 20 listed.
+    return jsonify({
+        'notifications': notifications,
+        'unseen_count': repos.notifications.unseen_count(),
+        'latest_sent_on': latest_sent_on
+    })
+
 @app.route('/api/notifications')
 def get_notifications():
     """Get HR notifications."""
     if 'user' not in session:
         return jsonify({'notifications': [], 'unseen_count': 0})
     
-    db = get_db_connection()
-    if db is None:
+    repos = get_repos()
+    if repos is None:
         return jsonify({'notifications': [], 'unseen_count': 0})
     
     try:
-        notifications = []
-        unseen_count = 0
-        
-        if app.config['DB_TYPE'].lower() == 'mongodb':
-            docs = db.hr_notifications.find({'candidate_id': {'$ne': None}}).sort('sent_on', -1).limit(20)
-            for doc in docs:
-                seen_value = doc.get('seen', False)
-                notif = {
-                    'id': str(doc['_id']),
-                    'candidate_name': doc.get('candidate_name', 'Unknown'),
-                    'test_score': int(doc.get('test_score', 0)),
-                    'combined_score': float(doc.get('combined_score', 0)) if doc.get('combined_score', None) is not None else None,
-                    'sent_on': doc.get('sent_on', datetime.now()).strftime('%Y-%m-%d %H:%M'),
-                    'candidate_id': str(doc.get('candidate_id', '')),
-                    'seen': seen_value
-                }
-                notifications.append(notif)
-                if not seen_value:
-                    unseen_count += 1
-        else:
-            cursor = db.cursor()
-            cursor.execute("SELECT id, candidate_name, test_score, COALESCE(combined_score, 0), sent_on, candidate_id, COALESCE(seen, 0) FROM hr_notifications WHERE candidate_id IS NOT NULL ORDER BY sent_on DESC LIMIT 20")
-            for row in cursor.fetchall():
-                seen_value = bool(row[6]) if row[6] is not None else False
-                notif = {
-                    'id': row[0],
-                    'candidate_name': row[1] or 'Unknown',
-                    'test_score': int(row[2]) if row[2] is not None else 0,
-                    'combined_score': float(row[3]) if row[3] is not None else None,
-                    'sent_on': row[4].strftime('%Y-%m-%d %H:%M') if row[4] else 'Unknown',
-                    'candidate_id': row[5],
-                    'seen': seen_value
-                }
-                notifications.append(notif)
-                if not seen_value:
-                    unseen_count += 1
-            cursor.close()
-            db.close()
-        
-        return jsonify({'notifications': notifications, 'unseen_count': unseen_count})
+        # Nothing was added or marked seen by any worker since the client's copy: skip building the list.
+        return conditional_response(request, repos.notifications.version(), lambda: notifications_response(repos))
     except Exception as e:
         print(f"❌ Error fetching notifications: {e}")
         return jsonify({'notifications': [], 'unseen_count': 0})
 
+@app.route('/api/notifications/stream')
+def notification_stream():
+    """Stream HR notifications as Server-Sent Events."""
+    if 'user' not in session:
+        return jsonify({'success': False}), 401
+    
+    stream = stream_with_context(sse_stream(notification_broker, app.config['SSE_HEARTBEAT_SECONDS']))
+    return Response(stream, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.route('/api/notifications/mark-seen', methods=['POST'])
 def mark_notification_seen():
-    """Mark notification as seen."""
+    """Mark notifications as seen: one id, a list of ids, or everything sent up to a timestamp."""
     if 'user' not in session:
         return jsonify({'success': False})
     
-    notification_id = request.json.get('id')
-    db = get_db_connection()
-    if db is None:
+    data = request.json or {}
+    repos = get_repos()
+    if repos is None:
         return jsonify({'success': False})
     
     try:
-        if app.config['DB_TYPE'].lower() == 'mongodb':
-            from bson import ObjectId
-            try:
-                db.hr_notifications.update_one(
-                    {'_id': ObjectId(notification_id)},
-                    {'$set': {'seen': True}}
-                )
-            except:
-                db.hr_notifications.update_one(
-                    {'_id': notification_id},
-                    {'$set': {'seen': True}}
-                )
+        if data.get('up_to'):
+            up_to = datetime.fromisoformat(data['up_to'])
+            updated = repos.notifications.mark_seen_before(up_to)
+            notification_broker.publish({'type': 'seen', 'up_to': up_to.isoformat()})
         else:
-            cursor = db.cursor()
-            cursor.execute("UPDATE hr_notifications SET seen = TRUE WHERE id = %s", (notification_id,))
-            cursor.close()
-            db.close()
-        return jsonify({'success': True})
+            ids = [str(i) for i in data.get('ids', [])] or [str(data.get('id'))]
+            updated = repos.notifications.mark_seen_many(ids)
+            notification_broker.publish({'type': 'seen', 'ids': ids})
+        return jsonify({'success': True, 'updated': updated, 'unseen_count': repos.notifications.unseen_count()})
     except Exception as e:
         print(f"❌ Error marking notification as seen: {e}")
         return jsonify({'success': False})
 
+@app.route('/api/metrics')
+def get_metrics():
+    """Get cache hit ratios."""
+    if 'user' not in session:
+        return jsonify({'success': False}), 401
+
+    return jsonify({
+        'candidate_cache': candidate_cache.stats(),
+        'challenge_cache': challenge_cache.stats(),
+        'question_cache': question_cache.stats(),
+        'question_flights': question_flights.stats(),
+        'coding_score_cache': coding_score_cache.stats(),
+        'background_tasks': background_tasks.stats(),
+        'llm': llm.stats(),
+        'llm_calls': llm_metrics.summary(),
+        'submission_journal': {'pending': submission_journal.pending_count() if submission_journal else 0,
+                               'parked': submission_journal.parked_count() if submission_journal else 0},
+        'mail_outbox': mail_sender.stats() if mail_sender else None
+    })
+
+@app.route('/admin/llm-metrics')
+def llm_metrics_page():
+    """Show LLM latency percentiles, sizes, tokens, cost and fallbacks per call site."""
+    if 'user' not in session:
+        return redirect(url_for('login'))
+    
+    summary = llm_metrics.summary()
+    return render_template('llm_metrics.html', sites=summary['sites'], cost_by_tag=summary['cost_by_tag'],
+                           llm_stats=llm.stats())
+
+@app.route('/restore-archive/<candidate_id>', methods=['POST'])
+def restore_archive(candidate_id):
+    """Restore a candidate's archived notifications and results."""
+    if 'user' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    repos = get_repos()
+    if repos is None:
+        return jsonify({'success': False, 'message': 'Database not available'}), 500
+
+    try:
+        restored = repos.archive.restore_candidate(candidate_id)
+        print(f"✓ Restored archived records for candidate {candidate_id}: {restored}")
+        return jsonify({'success': True, 'restored': restored,
+                        'message': f"Restored {sum(restored.values())} archived records"})
+    except Exception as e:
+        print(f"❌ Error restoring archived records: {e}")
+        return jsonify({'success': False, 'message': 'Server error'}), 500
+
 @app.route('/candidate-details/<candidate_id>')
 def candidate_details(candidate_id):
     """Show candidate details page."""
@@ -1394,77 +1749,33 @@ def candidate_details(candidate_id):
     if 'user' not in session:
         return redirect(url_for('login'))
     
-    db = get_db_connection()
-    if db is None:
+    repos = get_repos()
+    if repos is None:
         print("Database not available")
         flash('Database not available')
         return redirect(url_for('index'))
     
     try:
-        if app.config['DB_TYPE'].lower() == 'mongodb':
-            print("Using MongoDB to fetch candidate")
-            from bson import ObjectId
-            try:
-                candidate = db.candidates.find_one({'_id': ObjectId(candidate_id)})
-                print(f"Found candidate with ObjectId: {candidate is not None}")
-            except Exception as e:
-                print(f"ObjectId failed, trying string: {e}")
-                candidate = db.candidates.find_one({'_id': candidate_id})
-                print(f"Found candidate with string ID: {candidate is not None}")
-            
-            if not candidate:
-                print("Candidate not found in MongoDB")
-                flash('Candidate not found')
-                return redirect(url_for('index'))
-            
-            test_result = db.test_results.find_one(
-                {'candidate_name': candidate.get('name')},
-                sort=[('created_on', -1)]
-            )
-            
-            candidate_data = {
-                'id': str(candidate['_id']),
-                'name': candidate.get('name', ''),
-                'email': candidate.get('email', ''),
-                'match_percent': candidate.get('match_percent', 0),
-                'test_score': candidate.get('test_score', 0),
-                'status': candidate.get('status', 'pending'),
-                'created_on': candidate.get('created_on', datetime.now()),
-                'filename': candidate.get('filename', candidate.get('name', '')),
-                'job_description': candidate.get('job_description', ''),
-                'second_round_score': candidate.get('second_round_score', 0),
-                'test_details': test_result
-            }
-            print(f"Candidate data prepared: {candidate_data['name']}")
-        else:
-            print("Using MySQL to fetch candidate")
-            cursor = db.cursor()
-            cursor.execute("SELECT name, email, match_percent, test_score, status, created_on, filename, job_description, second_round_score FROM candidates WHERE id = %s", (candidate_id,))
-            candidate = cursor.fetchone()
-            
-            if not candidate:
-                flash('Candidate not found')
-                return redirect(url_for('index'))
-            
-            cursor.execute("SELECT score, total_questions, created_on FROM test_results WHERE candidate_name = %s ORDER BY created_on DESC LIMIT 1", (candidate[0],))
-            test_result = cursor.fetchone()
-            
-            cursor.close()
-            db.close()
-            
-            candidate_data = {
-                'id': candidate_id,
-                'name': candidate[0],
-                'email': candidate[1],
-                'match_percent': candidate[2],
-                'test_score': candidate[3],
-                'status': candidate[4],
-                'created_on': candidate[5],
-                'filename': candidate[6] if len(candidate) > 6 else candidate[0],
-                'job_description': candidate[7] if len(candidate) > 7 else '',
-                'second_round_score': candidate[8] if len(candidate) > 8 else 0,
-                'test_details': test_result
-            }
+        candidate = repos.candidates.get(candidate_id)
+        if not candidate:
+            print("Candidate not found")
+            flash('Candidate not found')
+            return redirect(url_for('index'))
+        
+        candidate_data = {
+            'id': candidate['id'],
+            'name': candidate.get('name', ''),
+            'email': candidate.get('email', ''),
+            'match_percent': candidate.get('match_percent', 0),
+            'test_score': candidate.get('test_score', 0),
+            'status': candidate.get('status') or 'pending',
+            'created_on': candidate.get('created_on'),
+            'filename': candidate.get('filename') or candidate.get('name', ''),
+            'job_description': candidate_job_description(repos, candidate),
+            'second_round_score': candidate.get('second_round_score', 0),
+            'test_details': repos.test_results.latest_for_candidate(candidate['id'])
+        }
+        print(f"Candidate data prepared: {candidate_data['name']}")
         
         print("Rendering candidate details template")
         return render_template('candidate_details.html', candidate=candidate_data)
@@ -1495,52 +1806,24 @@ def approve_second_round(candidate_id):
     if 'user' not in session:
         return jsonify({'success': False, 'message': 'Unauthorized'}), 401
     
-    db = get_db_connection()
-    if db is None:
+    repos = get_repos()
+    if repos is None:
         return jsonify({'success': False, 'message': 'Database not available'}), 500
     
     try:
-        if app.config['DB_TYPE'].lower() == 'mongodb':
-            from bson import ObjectId
-            try:
-                candidate = db.candidates.find_one({'_id': ObjectId(candidate_id)})
-            except:
-                candidate = db.candidates.find_one({'_id': candidate_id})
-            
-            if not candidate:
-                return jsonify({'success': False, 'message': 'Candidate not found'}), 404
-            
-            # Update status
-            db.candidates.update_one(
-                {'_id': candidate['_id']},
-                {'$set': {'status': 'second_round_invited'}}
-            )
-            
-            name = candidate.get('name', '')
-            email = candidate.get('email', '')
-            job_desc = candidate.get('job_description', '')
-        else:
-            cursor = db.cursor()
-            cursor.execute("SELECT name, email, job_description FROM candidates WHERE id = %s", (candidate_id,))
-            result = cursor.fetchone()
-            
-            if not result:
-                return jsonify({'success': False, 'message': 'Candidate not found'}), 404
-            
-            name, email, job_desc = result
-            
-            # Update status
-            cursor.execute("UPDATE candidates SET status = 'second_round_invited' WHERE id = %s", (candidate_id,))
-            cursor.close()
-            db.close()
+        candidate = repos.candidates.get(candidate_id)
+        if not candidate:
+            return jsonify({'success': False, 'message': 'Candidate not found'}), 404
         
-        # Send second round email
-        success = send_second_round_email(candidate_id, name, email, job_desc)
+        repos.candidates.update(candidate_id, {'status': 'second_round_invited'})
+        name = candidate.get('name', '')
+        email = candidate.get('email', '')
+        job_desc = candidate_job_description(repos, candidate)
         
-        if success:
-            return jsonify({'success': True, 'message': f'Second round invitation sent to {name}'})
-        else:
-            return jsonify({'success': False, 'message': 'Failed to send email'}), 500
+        # Challenges are generated and emailed in the background
+        background_tasks.submit(f"second-round:{candidate_id}", invite_to_second_round, candidate_id, name, email,
+                                job_desc, candidate.get('job_id'), candidate.get('status'))
+        return jsonify({'success': True, 'message': f'Second round invitation for {name} is being sent'})
             
     except Exception as e:
         print(f"❌ Error approving second round: {e}")
@@ -1552,40 +1835,18 @@ def approve_hr_round(candidate_id):
     if 'user' not in session:
         return jsonify({'success': False, 'message': 'Unauthorized'}), 401
     
-    db = get_db_connection()
-    if db is None:
+    repos = get_repos()
+    if repos is None:
         return jsonify({'success': False, 'message': 'Database not available'}), 500
     
     try:
-        if app.config['DB_TYPE'].lower() == 'mongodb':
-            from bson import ObjectId
-            try:
-                candidate = db.candidates.find_one({'_id': ObjectId(candidate_id)})
-            except:
-                candidate = db.candidates.find_one({'_id': candidate_id})
-            
-            if not candidate:
-                return jsonify({'success': False, 'message': 'Candidate not found'}), 404
-            
-            db.candidates.update_one(
-                {'_id': candidate['_id']},
-                {'$set': {'status': 'hr_round_invited'}}
-            )
-            
-            name = candidate.get('name', '')
-            email = candidate.get('email', '')
-        else:
-            cursor = db.cursor()
-            cursor.execute("SELECT name, email FROM candidates WHERE id = %s", (candidate_id,))
-            result = cursor.fetchone()
-            
-            if not result:
-                return jsonify({'success': False, 'message': 'Candidate not found'}), 404
-            
-            name, email = result
-            cursor.execute("UPDATE candidates SET status = 'hr_round_invited' WHERE id = %s", (candidate_id,))
-            cursor.close()
-            db.close()
+        candidate = repos.candidates.get(candidate_id)
+        if not candidate:
+            return jsonify({'success': False, 'message': 'Candidate not found'}), 404
+        
+        repos.candidates.update(candidate_id, {'status': 'hr_round_invited'})
+        name = candidate.get('name', '')
+        email = candidate.get('email', '')
         
         # Send HR round email
         msg = Message(
@@ -1626,47 +1887,20 @@ HR Team"""
 @app.route('/second-round/<candidate_id>')
 def second_round_test(candidate_id):
     """Second round test page."""
-    db = get_db_connection()
-    if db is None:
+    repos = get_repos()
+    if repos is None:
         return "Database not available", 500
     
     try:
-        # Get candidate info
-        if app.config['DB_TYPE'].lower() == 'mongodb':
-            from bson import ObjectId
-            try:
-                candidate = db.candidates.find_one({'_id': ObjectId(candidate_id)})
-            except:
-                candidate = db.candidates.find_one({'_id': candidate_id})
-            
-            if not candidate:
-                return "Candidate not found", 404
-            
-            # Get challenges
-            challenges_doc = db.second_round_challenges.find_one({'candidate_id': candidate_id})
-            challenges = challenges_doc.get('challenges', get_fallback_challenges()) if challenges_doc else get_fallback_challenges()
-            
-            candidate_data = {
-                'name': candidate.get('name', ''),
-                'email': candidate.get('email', '')
-            }
-        else:
-            cursor = db.cursor()
-            cursor.execute("SELECT name, email FROM candidates WHERE id = %s", (candidate_id,))
-            result = cursor.fetchone()
-            
-            if not result:
-                return "Candidate not found", 404
-            
-            candidate_data = {'name': result[0], 'email': result[1]}
-            
-            # Get challenges
-            cursor.execute("SELECT challenges FROM second_round_challenges WHERE candidate_id = %s", (candidate_id,))
-            challenge_result = cursor.fetchone()
-            challenges = json.loads(challenge_result[0]) if challenge_result else get_fallback_challenges()
-            
-            cursor.close()
-            db.close()
+        candidate = repos.candidates.get(candidate_id)
+        if not candidate:
+            return "Candidate not found", 404
+        
+        challenges = repos.challenges.get_for_candidate(candidate_id) or get_fallback_challenges()
+        candidate_data = {
+            'name': candidate.get('name', ''),
+            'email': candidate.get('email', '')
+        }
         
         return render_template('second_round.html', 
                              candidate=candidate_data, 
@@ -1683,8 +1917,8 @@ def submit_second_round():
     candidate_id = data.get('candidate_id')
     answers = data.get('answers', {})
     
-    db = get_db_connection()
-    if db is None:
+    repos = get_repos()
+    if repos is None:
         return jsonify({'success': False, 'message': 'Database error'}), 500
     
     try:
@@ -1708,7 +1942,8 @@ def submit_second_round():
         # Calculate scores
         reasoning_score = sum(1 for ans in answers.get('reasoning', []) if ans.get('correct', False))
         aptitude_score = sum(1 for ans in answers.get('aptitude', []) if ans.get('correct', False))
-        coding_score = evaluate_coding_answers(answers.get('coding', []))
+        challenges = repos.challenges.get_for_candidate(candidate_id) or {}
+        coding_score = evaluate_coding_answers(answers.get('coding', []), challenges.get('coding', []))
         
         total_score = reasoning_score + aptitude_score + coding_score
         max_score = 3 + 3 + 2  # 3 reasoning + 3 aptitude + 2 coding
@@ -1718,99 +1953,32 @@ def submit_second_round():
         print(f"   Total: {total_score}/{max_score} ({percentage:.1f}%)\n")
         
         # Store results
-        if app.config['DB_TYPE'].lower() == 'mongodb':
-            db.second_round_results.insert_one({
-                'candidate_id': candidate_id,
-                'reasoning_score': reasoning_score,
-                'aptitude_score': aptitude_score,
-                'coding_score': coding_score,
-                'total_score': total_score,
-                'percentage': percentage,
-                'answers': answers,
-                'submitted_on': datetime.now()
-            })
-            
-            # Update candidate status and send HR notification
-            from bson import ObjectId
-            try:
-                candidate = db.candidates.find_one({'_id': ObjectId(candidate_id)})
-                db.candidates.update_one(
-                    {'_id': ObjectId(candidate_id)},
-                    {'$set': {'status': 'second_round_completed', 'second_round_score': percentage}}
-                )
-            except:
-                candidate = db.candidates.find_one({'_id': candidate_id})
-                db.candidates.update_one(
-                    {'_id': candidate_id},
-                    {'$set': {'status': 'second_round_completed', 'second_round_score': percentage}}
-                )
-            
-            # Send second round result to HR
-            if candidate:
-                db.hr_notifications.insert_one({
-                    'candidate_id': candidate_id,
-                    'candidate_name': candidate.get('name', ''),
-                    'candidate_email': candidate.get('email', ''),
-                    'test_score': percentage,
-                    'match_percent': candidate.get('match_percent', 0),
-                    'combined_score': (candidate.get('test_score', 0) + percentage) / 2.0,
-                    'status': 'second_round_completed',
-                    'seen': False,
-                    'sent_on': datetime.now()
-                })
-        else:
-            cursor = db.cursor()
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS second_round_results (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    candidate_id VARCHAR(255),
-                    reasoning_score INT,
-                    aptitude_score INT,
-                    coding_score INT,
-                    total_score INT,
-                    percentage FLOAT,
-                    answers LONGTEXT,
-                    submitted_on TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            cursor.execute("""
-                INSERT INTO second_round_results 
-                (candidate_id, reasoning_score, aptitude_score, coding_score, total_score, percentage, answers)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """, (candidate_id, reasoning_score, aptitude_score, coding_score, total_score, percentage, json.dumps(answers)))
-            
-            # Add columns if not exist
-            try:
-                cursor.execute("ALTER TABLE candidates ADD COLUMN second_round_score FLOAT DEFAULT 0")
-            except:
-                pass
-            try:
-                cursor.execute("ALTER TABLE hr_notifications MODIFY candidate_id VARCHAR(255)")
-            except:
-                pass
-            
-            cursor.execute("UPDATE candidates SET status = 'second_round_completed', second_round_score = %s WHERE id = %s", 
-                          (percentage, candidate_id))
-            
-            # Get candidate info for HR notification (include existing test_score)
-            cursor.execute("SELECT name, email, match_percent, COALESCE(test_score, 0) FROM candidates WHERE id = %s", (candidate_id,))
-            candidate = cursor.fetchone()
-            
-            if candidate:
-                # Ensure hr_notifications has combined_score column (ignore errors)
-                try:
-                    cursor.execute("ALTER TABLE hr_notifications ADD COLUMN combined_score FLOAT DEFAULT NULL")
-                except Exception:
-                    pass
-
-                round1_score = float(candidate[3]) if len(candidate) > 3 and candidate[3] is not None else 0.0
-                combined = (round1_score + float(percentage)) / 2.0
-                cursor.execute("INSERT INTO hr_notifications (candidate_id, candidate_name, candidate_email, test_score, match_percent, combined_score, status) VALUES (%s, %s, %s, %s, %s, %s, %s)", 
-                              (candidate_id, candidate[0], candidate[1], percentage, candidate[2], combined, 'second_round_completed'))
-            
-            cursor.close()
-            db.close()
+        repos.test_results.insert_second_round({
+            'candidate_id': candidate_id,
+            'reasoning_score': reasoning_score,
+            'aptitude_score': aptitude_score,
+            'coding_score': coding_score,
+            'total_score': total_score,
+            'percentage': percentage,
+            'answers': answers
+        })
+        
+        # Update candidate status and send second round result to HR
+        candidate = repos.candidates.get(candidate_id)
+        if candidate:
+            repos.candidates.update(candidate_id, {'status': 'second_round_completed', 'second_round_score': percentage})
+            round1_score = float(candidate.get('test_score') or 0)
+            notification = {
+                'candidate_id': str(candidate_id),
+                'candidate_name': candidate.get('name', ''),
+                'candidate_email': candidate.get('email', ''),
+                'test_score': percentage,
+                'match_percent': candidate.get('match_percent', 0),
+                'combined_score': (round1_score + float(percentage)) / 2.0,
+                'status': 'second_round_completed'
+            }
+            repos.notifications.insert(notification)
+            publish_notification(notification)
         
         return jsonify({
             'success': True,
@@ -1828,54 +1996,26 @@ def submit_second_round():
 @app.route('/second-round-result/<candidate_id>')
 def second_round_result(candidate_id):
     """Show second round results."""
-    db = get_db_connection()
-    if db is None:
+    repos = get_repos()
+    if repos is None:
         return render_template('second_round_result.html', candidate={'name': '', 'email': '', 'percentage': 0, 'reasoning_score': 0, 'aptitude_score': 0, 'coding_score': 0, 'total_score': 0, 'test_score': 0})
     
     candidate_data = None
     try:
-        if app.config['DB_TYPE'].lower() == 'mongodb':
-            from bson import ObjectId
-            try:
-                candidate = db.candidates.find_one({'_id': ObjectId(candidate_id)})
-            except:
-                candidate = db.candidates.find_one({'_id': candidate_id})
-            
-            result = db.second_round_results.find_one({'candidate_id': candidate_id})
-            
-            if candidate and result:
-                candidate_data = {
-                    'name': candidate.get('name', ''),
-                    'email': candidate.get('email', ''),
-                    'reasoning_score': result.get('reasoning_score', 0),
-                    'aptitude_score': result.get('aptitude_score', 0),
-                    'coding_score': result.get('coding_score', 0),
-                    'total_score': result.get('total_score', 0),
-                    'percentage': result.get('percentage', 0),
-                    'test_score': candidate.get('test_score', 0)
-                }
-        else:
-            cursor = db.cursor()
-            cursor.execute("SELECT name, email, test_score FROM candidates WHERE id = %s", (candidate_id,))
-            candidate = cursor.fetchone()
-            
-            cursor.execute("SELECT reasoning_score, aptitude_score, coding_score, total_score, percentage FROM second_round_results WHERE candidate_id = %s", (candidate_id,))
-            result = cursor.fetchone()
-            
-            cursor.close()
-            db.close()
-            
-            if candidate and result:
-                candidate_data = {
-                    'name': candidate[0],
-                    'email': candidate[1],
-                    'reasoning_score': result[0],
-                    'aptitude_score': result[1],
-                    'coding_score': result[2],
-                    'total_score': result[3],
-                    'percentage': result[4],
-                    'test_score': candidate[2] if len(candidate) > 2 else 0
-                }
+        candidate = repos.candidates.get(candidate_id)
+        result = repos.test_results.get_second_round(candidate_id)
+        
+        if candidate and result:
+            candidate_data = {
+                'name': candidate.get('name', ''),
+                'email': candidate.get('email', ''),
+                'reasoning_score': result.get('reasoning_score', 0),
+                'aptitude_score': result.get('aptitude_score', 0),
+                'coding_score': result.get('coding_score', 0),
+                'total_score': result.get('total_score', 0),
+                'percentage': result.get('percentage', 0),
+                'test_score': candidate.get('test_score', 0)
+            }
         
         if not candidate_data:
             print(f"⚠️ No candidate data found for ID: {candidate_id}")
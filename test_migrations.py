@@ -0,0 +1,30 @@
+"""Schema migration checks against SQLite.
+
+    python -m pytest test_migrations.py
+"""
+import migrations
+from migrations import LATEST_VERSION, MIGRATIONS, connect_sqlite, run_migrations
+
+
+def test_migrations_can_be_rerun_after_a_partial_failure(tmp_path):
+    conn = connect_sqlite(str(tmp_path / 'schema.db'))
+    assert run_migrations(conn, 'sqlite') == LATEST_VERSION
+    # MySQL keeps the DDL of a migration that failed part way without recording its version;
+    # forgetting every version replays each migration over the schema it already built.
+    conn.execute("DELETE FROM schema_version")
+    assert run_migrations(conn, 'sqlite') == LATEST_VERSION
+    versions = [row[0] for row in conn.execute("SELECT version FROM schema_version ORDER BY version")]
+    assert versions == [migration['version'] for migration in MIGRATIONS]
+    conn.close()
+
+
+def test_databases_past_the_dashboard_migrations_get_the_job_group_index(tmp_path, monkeypatch):
+    conn = connect_sqlite(str(tmp_path / 'released.db'))
+    monkeypatch.setattr(migrations, 'MIGRATIONS', MIGRATIONS[:7])
+    assert run_migrations(conn, 'sqlite') == 7
+    monkeypatch.setattr(migrations, 'MIGRATIONS', MIGRATIONS)
+    assert run_migrations(conn, 'sqlite') == LATEST_VERSION
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'candidates'")}
+    assert 'idx_candidates_job_groups' in indexes
+    assert not indexes & {'idx_candidates_dashboard', 'idx_candidates_job_dashboard'}
+    conn.close()
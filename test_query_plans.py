@@ -0,0 +1,46 @@
+"""EXPLAIN checks of every repository query against a migrated SQLite database.
+
+    python -m pytest test_query_plans.py
+"""
+import pytest
+
+from explain_queries import SQL_CHECKS, _check_coverage, check_query_plans
+from migrations import LATEST_VERSION, connect_sqlite, run_migrations
+from repository import Repositories
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = connect_sqlite(str(tmp_path / 'plans.db'))
+    assert run_migrations(conn, 'sqlite') == LATEST_VERSION
+    yield conn
+    conn.close()
+
+
+def test_every_repository_query_has_a_plan_check():
+    assert _check_coverage() == []
+
+
+def test_sqlite_queries_are_served_by_indexes(conn):
+    assert check_query_plans(conn, 'sqlite') == []
+
+
+def test_sqlite_queries_are_served_by_indexes_with_data(conn):
+    repos = Repositories('sqlite', conn)
+    job_id = repos.jobs.get_or_create('Python developer with Flask and SQL experience')
+    repos.candidates.insert_many([{'name': f'Candidate {i}', 'email': f'c{i}@example.com', 'match_percent': i,
+                                   'status': 'test_invited', 'job_id': job_id} for i in range(50)])
+    repos.notifications.insert({'candidate_id': '1', 'candidate_name': 'Candidate 1'})
+    assert check_query_plans(conn, 'sqlite') == []
+
+
+def test_missing_index_is_reported(conn):
+    conn.execute("DROP INDEX idx_challenge_bank_pool")
+    failures = check_query_plans(conn, 'sqlite')
+    assert any(failure.startswith('challenge_bank.sample:') for failure in failures)
+
+
+def test_checks_name_real_repository_methods():
+    repos = Repositories('sqlite', None)
+    for repo, method, _ in SQL_CHECKS:
+        assert callable(getattr(getattr(repos, repo), method, None)), f"{repo}.{method}"
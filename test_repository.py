@@ -0,0 +1,36 @@
+"""Repository checks against a migrated SQLite database.
+
+    python -m pytest test_repository.py
+"""
+import pytest
+
+from migrations import connect_sqlite, run_migrations
+from repository import Repositories
+
+
+@pytest.fixture
+def repos(tmp_path):
+    conn = connect_sqlite(str(tmp_path / 'repository.db'))
+    run_migrations(conn, 'sqlite')
+    yield Repositories('sqlite', conn, chunk_size=4)
+    conn.close()
+
+
+def test_insert_many_returns_the_id_of_each_row_in_order(repos):
+    # Another writer's row between the batches shows the ids need not be consecutive.
+    first = repos.candidates.insert_many([{'name': f'First {i}', 'status': 'test_invited'} for i in range(6)])
+    other = repos.candidates.insert({'name': 'Other', 'status': 'test_invited'})
+    second = repos.candidates.insert_many([{'name': f'Second {i}', 'status': 'test_invited'} for i in range(10)])
+    assert other not in first + second
+    assert [repos.candidates.get(i)['name'] for i in first] == [f'First {i}' for i in range(6)]
+    assert [repos.candidates.get(i)['name'] for i in second] == [f'Second {i}' for i in range(10)]
+
+
+def test_notification_for_candidate_copies_match_percent_in_the_insert(repos):
+    candidate_id = repos.candidates.insert({'name': 'Scored', 'status': 'test_invited', 'match_percent': 72.5})
+    repos.candidates.update(candidate_id, {'test_score': 40.0, 'status': 'test_completed'})
+    notification_id = repos.notifications.insert_for_candidate({'candidate_id': str(candidate_id), 'candidate_name': 'Scored'})
+    row = repos.notifications._fetchone("SELECT match_percent FROM hr_notifications WHERE id = %s", (notification_id,))
+    assert row['match_percent'] == 72.5
+    assert repos.candidates.get(candidate_id)['status'] == 'test_completed'
+    assert repos.notifications.insert_for_candidate({'candidate_id': str(candidate_id + 100), 'candidate_name': 'Gone'}) is None